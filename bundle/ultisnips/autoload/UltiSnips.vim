@@ -188,6 +188,64 @@ function! UltiSnips#TrackChange() abort
     py3 UltiSnips_Manager._track_change()
 endfunction
 
+" The lines changed in the buffer with the active snippets, as a list of
+" [first, old end, new end] with 0-based line numbers and exclusive ends.
+" This file is sourced again for every buffer, so keep them.
+let s:changes = get(s:, 'changes', [])
+" [buffer number, listener id] while Vim's listener_add() reports changes.
+let s:listener = get(s:, 'listener', [])
+let s:nvim_attach_count = get(s:, 'nvim_attach_count', 0)
+
+function! s:on_changes(bufnr, start, end, added, changes) abort
+    for change in a:changes
+        call add(s:changes, [change.lnum - 1, change.end - 1, change.end - 1 + change.added])
+    endfor
+endfunction
+
+function! UltiSnips#TrackChanges() abort
+    call UltiSnips#StopTrackingChanges()
+    let s:changes = []
+    if has('nvim') && exists('*nvim_buf_attach')
+        " Returning true from on_lines detaches, once tracking was stopped or
+        " restarted.
+        let s:nvim_attach_count += 1
+        return luaeval('(function()'
+                    \ . ' _G._ultisnips_tracking = _A[2]; _G._ultisnips_changes = {};'
+                    \ . ' return vim.api.nvim_buf_attach(_A[1], false, {on_lines ='
+                    \ . ' function(_, _, _, first, old_end, new_end)'
+                    \ . ' if _G._ultisnips_tracking ~= _A[2] then return true end;'
+                    \ . ' table.insert(_G._ultisnips_changes, {first, old_end, new_end}) end})'
+                    \ . ' and 1 or 0 end)()', [bufnr('%'), s:nvim_attach_count])
+    elseif exists('*listener_add')
+        let s:listener = [bufnr('%'), listener_add(function('s:on_changes'))]
+        return 1
+    endif
+    return 0
+endfunction
+
+function! UltiSnips#StopTrackingChanges() abort
+    if has('nvim') && exists('*nvim_buf_attach')
+        call luaeval('(function() _G._ultisnips_tracking = nil end)()')
+    elseif !empty(s:listener)
+        call listener_remove(s:listener[1])
+        let s:listener = []
+    endif
+    let s:changes = []
+endfunction
+
+function! UltiSnips#FlushChanges() abort
+    if has('nvim') && exists('*nvim_buf_attach')
+        return luaeval('(function() local changes = _G._ultisnips_changes or {};'
+                    \ . ' _G._ultisnips_changes = {}; return changes end)()')
+    endif
+    if !empty(s:listener)
+        call listener_flush(s:listener[0])
+    endif
+    let changes = s:changes
+    let s:changes = []
+    return changes
+endfunction
+
 function! UltiSnips#RefreshSnippets() abort
     py3 UltiSnips_Manager._refresh_snippets()
 endfunction
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+"""Times the work done for each typed character in a buffer whose filetype
+has 20000 snippets, 200 of which have the 'A' option, and counts the round
+trips to Vim it takes."""
+
+import time
+
+import vim
+
+from UltiSnips import UltiSnips_Manager, vim_helper
+
+NUM_SNIPPETS = 20000
+TEXT = "the quick brown fox jumps over the lazy dog, " * 20
+
+
+def main():
+    for i in range(NUM_SNIPPETS):
+        options = "A" if i % 100 == 0 else ""
+        UltiSnips_Manager.add_snippet(
+            "t%i" % i, "body", "", options, "bench_autotrigger"
+        )
+    vim.command("set filetype=bench_autotrigger")
+    vim.command("set virtualedit=onemore")
+
+    vim_helper.reset_round_trip_stats()
+    start = time.perf_counter()
+    for i, char in enumerate(TEXT):
+        vim.current.buffer[0] = TEXT[: i + 1]
+        vim.current.window.cursor = (1, i + 1)
+        # What InsertCharPre records before TextChangedI is triggered.
+        UltiSnips_Manager._last_change = (char, vim.current.window.cursor)
+        UltiSnips_Manager._track_change()
+    elapsed = time.perf_counter() - start
+    print(
+        "%i keystrokes in %.3f s, %.1f us per keystroke"
+        % (len(TEXT), elapsed, elapsed / len(TEXT) * 1e6)
+    )
+    calls, round_trips = vim_helper.round_trip_stats()["_track_change"]
+    print("%.1f round trips to Vim per keystroke" % (round_trips / calls))
+
+
+main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+"""Times diffing the text of a snippet before and after typical big edits,
+for texts of up to 100000 characters."""
+
+import random
+import time
+
+from UltiSnips.diff import diff
+
+SIZES = (1000, 10000, 100000)
+REPEATS = 3
+
+
+def _text(size, rng):
+    words = ["for", "item", "in", "range", "(", ")", ":", " ", "\n", "    "]
+    parts = []
+    length = 0
+    while length < size:
+        parts.append(rng.choice(words))
+        length += len(parts[-1])
+    return "".join(parts)[:size]
+
+
+def _scattered_edits(text, rng, count):
+    chars = list(text)
+    for _ in range(count):
+        position = rng.randrange(len(chars))
+        if rng.random() < 0.5:
+            del chars[position]
+        else:
+            chars.insert(position, "x")
+    return "".join(chars)
+
+
+def _cases(size):
+    rng = random.Random(size)
+    text = _text(size, rng)
+    middle = size // 2
+    return [
+        ("paste", text[:middle], text[:middle] + text + text[middle:]),
+        ("deletion", text, text[: middle // 2] + text[middle + middle // 2 :]),
+        ("100 scattered edits", text, _scattered_edits(text, rng, 100)),
+        ("replacement", text, _text(size, rng)),
+    ]
+
+
+def _best_time(a, b):
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        diff(a, b)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    for size in SIZES:
+        for name, a, b in _cases(size):
+            print("%6i chars, %-20s %.4f s" % (size, name + ":", _best_time(a, b)))
+
+
+main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+"""Expands a snippet with 200 tabstops and their mirrors, types into its
+first tabstop and jumps through all tabstops. Prints the time taken, the memory
+held by the text objects and how many Positions were created."""
+
+from collections import namedtuple
+import time
+import tracemalloc
+
+import vim  # pylint:disable=import-error
+
+from UltiSnips import vim_helper
+from UltiSnips.position import JumpDirection, Position
+from UltiSnips.snippet.definition import UltiSnipsSnippetDefinition
+
+NUM_TABSTOPS = 200
+NUM_KEYSTROKES = 50
+REPEATS = 3
+VALUE = "\n".join("${%i:value%i} = $%i" % (i, i, i) for i in range(1, NUM_TABSTOPS + 1))
+
+_VisualContent = namedtuple("_VisualContent", ["text", "mode", "placeholder"])
+
+
+def _expand():
+    vim.current.buffer[:] = [""]
+    definition = UltiSnipsSnippetDefinition(0, "", VALUE, "", "", {}, "", None, {})
+    return definition.launch(
+        "", _VisualContent("", "", None), None, Position(0, 0), Position(0, 0)
+    )
+
+
+def _type(snippet_instance):
+    tabstop = snippet_instance._tabstops[1]  # pylint:disable=protected-access
+    for _ in range(NUM_KEYSTROKES):
+        line, col = tabstop.end.line, tabstop.end.col
+        text = vim.current.buffer[line]
+        vim.current.buffer[line] = text[:col] + "x" + text[col:]
+        snippet_instance.replay_user_edits([("I", line, col, "x")], tabstop)
+        snippet_instance.update_textobjects(vim_helper.buf)
+
+
+def _jump(snippet_instance):
+    for direction, count in (
+        (JumpDirection.FORWARD, NUM_TABSTOPS),
+        (JumpDirection.BACKWARD, NUM_TABSTOPS - 1),
+    ):
+        for _ in range(count):
+            snippet_instance.has_next_tab(direction)
+            snippet_instance.select_next_tab(direction)
+
+
+def _best_time(func, prepare=lambda: None):
+    best = float("inf")
+    for _ in range(REPEATS):
+        argument = prepare()
+        start = time.perf_counter()
+        func(argument)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _count_positions(func):
+    init = Position.__init__
+    count = 0
+
+    def counting_init(self, line, col):
+        nonlocal count
+        count += 1
+        init(self, line, col)
+
+    Position.__init__ = counting_init
+    try:
+        func()
+    finally:
+        Position.__init__ = init
+    return count
+
+
+def _memory_of_expansion():
+    tracemalloc.start()
+    try:
+        snippet_instance = _expand()
+        return tracemalloc.get_traced_memory()[0], snippet_instance
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    expand_time = _best_time(lambda _: _expand())
+    type_time = _best_time(_type, _expand)
+    jump_time = _best_time(_jump, _expand)
+    memory, _ = _memory_of_expansion()
+    expand_positions = _count_positions(_expand)
+    snippet_instance = _expand()
+    type_positions = _count_positions(lambda: _type(snippet_instance))
+    print(
+        "Expanding %i tabstops: %.1f ms, %i KiB held, %i Positions created"
+        % (NUM_TABSTOPS, expand_time * 1000, memory / 1024, expand_positions)
+    )
+    print(
+        "Typing %i characters:  %.1f ms, %i Positions created"
+        % (NUM_KEYSTROKES, type_time * 1000, type_positions)
+    )
+    print("Jumping through them:  %.1f ms" % (jump_time * 1000))
+
+
+main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+"""Times expanding the same anonymous snippet with python code many times, once
+with a cache that keeps no definitions and once with the default cache."""
+
+import time
+
+import vim  # pylint:disable=import-error
+
+from UltiSnips import UltiSnips_Manager
+from UltiSnips.snippet.definition import AnonymousSnippetCache
+
+NUM_EXPANSIONS = 1000
+REPEATS = 3
+VALUE = "${1:name} = `!p snip.rv = t[1].upper()`$0"
+
+
+def _expand():
+    for _ in range(NUM_EXPANSIONS):
+        vim.current.buffer[:] = [""]
+        vim.current.window.cursor = (1, 0)
+        UltiSnips_Manager.expand_anon(VALUE)
+        UltiSnips_Manager._leaving_buffer()  # pylint:disable=protected-access
+
+
+def _best_time(func):
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    for name, cache in (
+        ("uncached", AnonymousSnippetCache(max_size=0)),
+        ("cached", AnonymousSnippetCache()),
+    ):
+        UltiSnips_Manager._anonymous_snippets = cache  # pylint:disable=protected-access
+        elapsed = _best_time(_expand)
+        print(
+            "%-9s %i expansions in %.3f s, %r"
+            % (name + ":", NUM_EXPANSIONS, elapsed, cache)
+        )
+
+
+main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+"""Times expanding a snippet without tabstops, which needs no text objects,
+and the same snippet with one tabstop."""
+
+import time
+
+import vim  # pylint:disable=import-error
+
+from UltiSnips import UltiSnips_Manager
+
+NUM_EXPANSIONS = 1000
+REPEATS = 3
+SNIPPETS = [
+    ("static", "#include <stdio.h>$0"),
+    ("tabstop", "#include <${1:stdio}.h>$0"),
+]
+
+
+def _expand(trigger):
+    for _ in range(NUM_EXPANSIONS):
+        vim.current.buffer[:] = [trigger]
+        vim.current.window.cursor = (1, len(trigger))
+        UltiSnips_Manager.expand()
+        UltiSnips_Manager._leaving_buffer()  # pylint:disable=protected-access
+
+
+def _best_time(func):
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    for trigger, value in SNIPPETS:
+        UltiSnips_Manager.add_snippet(trigger, value, "", "b", "bench_static")
+    vim.command("set filetype=bench_static")
+    for trigger, _ in SNIPPETS:
+        elapsed = _best_time(lambda: _expand(trigger))
+        print(
+            "%-8s %i expansions in %.3f s, %.1f us per expansion"
+            % (trigger + ":", NUM_EXPANSIONS, elapsed, elapsed / NUM_EXPANSIONS * 1e6)
+        )
+
+
+main()
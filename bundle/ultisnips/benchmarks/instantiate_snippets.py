@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+"""Times creating the text objects of a code heavy snippet many times, once
+tokenizing its text for every expansion and once from the tokens kept from
+the first expansion."""
+
+from collections import namedtuple
+import time
+
+from UltiSnips.position import Position
+from UltiSnips.snippet.parsing.ulti_snips import parse_and_instantiate
+from UltiSnips.text_objects import SnippetInstance
+
+NUM_EXPANSIONS = 2000
+REPEATS = 3
+INDENT = "    "
+TEXT = "\n".join(
+    [
+        "def ${1:function}(${2:self}${3:, ${4:arg}}):",
+        '    """${5:Docstring for $1.}"""',
+        "    `!p snip.rv = t[4].upper()` = ${6:None}",
+        "    for ${7:item} in ${8:items}:",
+        "        ${9:${VISUAL:pass}}",
+        "    return ${10:${1/(\\w+)/\\u$1/g}}",
+        "$0",
+    ]
+).replace("\n", "\n" + INDENT)
+
+_VisualContent = namedtuple("_VisualContent", ["text", "mode"])
+
+
+def _instantiate(templates):
+    for i in range(NUM_EXPANSIONS):
+        start = Position(i, len(INDENT))
+        snippet_instance = SnippetInstance(
+            None,
+            None,
+            TEXT,
+            start,
+            Position(i, len(INDENT)),
+            _VisualContent("", ""),
+            last_re=None,
+            globals={},
+            context=None,
+        )
+        parse_and_instantiate(snippet_instance, TEXT, INDENT, templates)
+
+
+def _best_time(func):
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    tokenize_time = _best_time(lambda: _instantiate(None))
+    template_time = _best_time(lambda: _instantiate({}))
+    print(
+        "Tokenizing every time: %i expansions in %.3f s"
+        % (NUM_EXPANSIONS, tokenize_time)
+    )
+    print(
+        "Tokenizing once:       %i expansions in %.3f s"
+        % (NUM_EXPANSIONS, template_time)
+    )
+
+
+main()
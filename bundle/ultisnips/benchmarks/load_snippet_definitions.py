@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+"""Times creating the snippet definitions for a synthetic filetype with 10000
+snippets, a fifth of which have a context and another fifth a pre_expand
+action, and reports the memory they use."""
+
+import time
+import tracemalloc
+
+from UltiSnips.snippet.source.file import ulti_snips
+
+NUM_SNIPPETS = 10000
+
+
+def _ultisnips_file():
+    parts = ["global !p\ndef helper(x):\n    return x\nendglobal\n"]
+    for i in range(NUM_SNIPPETS):
+        kind = i % 5
+        if kind == 1:
+            parts.append('context "snip.line > %i"\n' % i)
+        elif kind == 2:
+            parts.append("pre_expand \"snip.buffer[snip.line] = '%i'\"\n" % i)
+        options = ["", "b", "w", "r", "iA"][kind]
+        trigger = '"t%i(\\d+)"' % i if options == "r" else "t%i" % i
+        parts.append(
+            'snippet %s "Description %i" %s\n'
+            "body ${1:x} `!p snip.rv = helper(%i)` $0\n"
+            "endsnippet\n" % (trigger, i, options, i)
+        )
+    return "".join(parts)
+
+
+def main():
+    events = list(ulti_snips._parse_snippets_file(_ultisnips_file(), "bench"))
+    tracemalloc.start()
+    start = time.perf_counter()
+    definitions = list(ulti_snips._create_snippets(events, "bench"))
+    elapsed = time.perf_counter() - start
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        "%i definitions in %.3f s using %.1f MiB"
+        % (
+            sum(1 for event, _ in definitions if event == "snippet"),
+            elapsed,
+            memory / 2**20,
+        )
+    )
+
+
+main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+"""Times looking up snippets in a dictionary with 20000 snippets, both for
+expanding a trigger and for listing the snippets that could match a partial
+trigger."""
+
+import time
+
+from UltiSnips.snippet.definition import UltiSnipsSnippetDefinition
+from UltiSnips.snippet.source.snippet_dictionary import SnippetDictionary
+
+NUM_SNIPPETS = 20000
+NUM_LOOKUPS = 100
+
+
+def _dictionary():
+    dictionary = SnippetDictionary()
+    for i in range(NUM_SNIPPETS):
+        options = ["", "b", "i", "", "w", "A", "", "b", "i", "r"][i % 10]
+        trigger = "t%i(\\d+)" % i if options == "r" else "t%i" % i
+        dictionary.add_snippet(
+            UltiSnipsSnippetDefinition(
+                0, trigger, "body", "", options, {}, "bench", None, {}
+            )
+        )
+    return dictionary
+
+
+def _time(dictionary, lines, potentially, autotrigger_only=False):
+    start = time.perf_counter()
+    found = 0
+    for line in lines:
+        found += len(
+            dictionary.get_matching_snippets(line, potentially, autotrigger_only, "")
+        )
+    return time.perf_counter() - start, found
+
+
+def main():
+    dictionary = _dictionary()
+    lines = ["    t%i" % (i * 197 % NUM_SNIPPETS) for i in range(NUM_LOOKUPS)]
+    for name, potentially, autotrigger_only in (
+        ("matches", False, False),
+        ("autotrigger", False, True),
+        ("could_match", True, False),
+    ):
+        elapsed, found = _time(dictionary, lines, potentially, autotrigger_only)
+        print(
+            "%-12s %i lookups in %.3f s, %i snippets found"
+            % (name, len(lines), elapsed, found)
+        )
+
+
+main()
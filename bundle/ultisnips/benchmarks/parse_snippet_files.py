@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+"""Times parsing synthetic UltiSnips and snipMate files with 50000 snippets
+each, and an UltiSnips file with few, but very long snippets."""
+
+import time
+
+from UltiSnips.snippet.source.file import snipmate, ulti_snips
+
+NUM_SNIPPETS = 50000
+NUM_LONG_SNIPPETS = 100
+LONG_SNIPPET_LINES = 5000
+REPEATS = 3
+
+
+def _ultisnips_file():
+    parts = ["priority -10\n", "global !p\ndef helper(x):\n    return x\nendglobal\n"]
+    for i in range(NUM_SNIPPETS):
+        parts.append(
+            'snippet trig%i "Description %i" b\n'
+            "for (${1:i} = 0; $1 < ${2:n}; ++$1) {\n"
+            "\t${3:body}\n"
+            "\t`!p snip.rv = helper(t[1])`\n"
+            "}\n"
+            "$0\n"
+            "endsnippet\n\n" % (i, i)
+        )
+    return "".join(parts)
+
+
+def _long_ultisnips_file():
+    body = "x = ${1:value} + 1\n" * LONG_SNIPPET_LINES
+    return "".join(
+        'snippet long%i "Long"\n%sendsnippet\n' % (i, body)
+        for i in range(NUM_LONG_SNIPPETS)
+    )
+
+
+def _snipmate_file():
+    parts = ["extends c\n"]
+    for i in range(NUM_SNIPPETS):
+        parts.append(
+            "snippet trig%i Description %i\n"
+            "\tfor (${1:i} = 0; $1 < ${2:n}; ++$1) {\n"
+            "\t\t${3:body}\n"
+            "\t}\n"
+            "\n" % (i, i)
+        )
+    return "".join(parts)
+
+
+def _best_time(func):
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    ultisnips_data = _ultisnips_file()
+    snipmate_data = _snipmate_file()
+    long_data = _long_ultisnips_file()
+    ultisnips_time = _best_time(
+        lambda: list(ulti_snips._parse_snippets_file(ultisnips_data, "bench"))
+    )
+    snipmate_time = _best_time(
+        lambda: list(snipmate._parse_snippets_file(snipmate_data, "bench"))
+    )
+    long_time = _best_time(
+        lambda: list(ulti_snips._parse_snippets_file(long_data, "bench"))
+    )
+    print(
+        "UltiSnips: %i snippets (%i KiB) in %.3f s"
+        % (NUM_SNIPPETS, len(ultisnips_data) // 1024, ultisnips_time)
+    )
+    print(
+        "snipMate:  %i snippets (%i KiB) in %.3f s"
+        % (NUM_SNIPPETS, len(snipmate_data) // 1024, snipmate_time)
+    )
+    print(
+        "UltiSnips: %i snippets with %i lines in %.3f s"
+        % (NUM_LONG_SNIPPETS, LONG_SNIPPET_LINES, long_time)
+    )
+
+
+main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+"""Times tokenizing a long snippet that is mostly code and plain text, and a
+long snippet that is mostly tabstops and mirrors."""
+
+import time
+
+from UltiSnips.position import Position
+from UltiSnips.snippet.parsing.lexer import (
+    tokenize,
+    EscapeCharToken,
+    VisualToken,
+    TransformationToken,
+    ChoicesToken,
+    TabStopToken,
+    MirrorToken,
+    PythonCodeToken,
+    VimLCodeToken,
+    ShellCodeToken,
+)
+
+NUM_LINES = 5000
+REPEATS = 3
+INDENT = "    "
+ALLOWED_TOKENS = [
+    EscapeCharToken,
+    VisualToken,
+    TransformationToken,
+    ChoicesToken,
+    TabStopToken,
+    MirrorToken,
+    PythonCodeToken,
+    VimLCodeToken,
+    ShellCodeToken,
+]
+
+CODE_TEXT = (
+    "`!p\n"
+    + "".join(
+        INDENT + "snip.rv += str(%i) + ' \\` plain text of line %i'\n" % (i, i)
+        for i in range(NUM_LINES)
+    )
+    + "`\n"
+    + "Some plain text without any tokens, just to be read. \\$ \\{\\}\n" * NUM_LINES
+)
+TABSTOP_TEXT = "${1:name} = ${2:${3:value} + $1} ${1/a/b/g}\n" * NUM_LINES
+
+
+def _best_time(text):
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        tokens = list(tokenize(text, INDENT, Position(0, 0), ALLOWED_TOKENS))
+        best = min(best, time.perf_counter() - start)
+    return best, len(tokens)
+
+
+def main():
+    for name, text in (("code", CODE_TEXT), ("tabstops", TABSTOP_TEXT)):
+        duration, num_tokens = _best_time(text)
+        print(
+            "Tokenizing %s: %i chars, %i tokens in %.3f s"
+            % (name, len(text), num_tokens, duration)
+        )
+
+
+main()
@@ -4,19 +4,27 @@
 """Commands to compare text objects and to guess how to transform from one to
 another."""
 
-from collections import defaultdict
-import sys
-
 from UltiSnips import vim_helper
 from UltiSnips.position import Position
 
 
+def _split_line(buf, line):
+    """Splits buf[line] in place if an insertion put newlines into it."""
+    if line < 0:
+        line += len(buf)
+    if "\n" in buf[line]:
+        buf[line : line + 1] = buf[line].split("\n")
+
+
 def is_complete_edit(initial_line, original, wanted, cmds):
     """Returns true if 'original' is changed to 'wanted' with the edit commands
     in 'cmds'.
 
     Initial line is to change the line numbers in 'cmds'.
 
+    The commands are applied to a copy of the list of lines, only splitting
+    and joining the lines they change.
+
     """
     buf = original[:]
     for cmd in cmds:
@@ -33,8 +41,10 @@ def is_complete_edit(initial_line, original, wanted, cmds):
                     del buf[line]
         elif ctype == "I":
             buf[line] = buf[line][:col] + char + buf[line][col:]
-        buf = "\n".join(buf).split("\n")
-    return len(buf) == len(wanted) and all(j == k for j, k in zip(buf, wanted))
+            _split_line(buf, line)
+        if not buf:
+            buf.append("")
+    return buf == list(wanted)
 
 
 def guess_edit(initial_line, last_text, current_text, vim_state):
@@ -68,11 +78,14 @@ def guess_edit(initial_line, last_text, current_text, vim_state):
         if is_complete_edit(initial_line, last_text, current_text, es):
             return True, es
     if ppos.mode == "v":  # Maybe selectmode?
-        sv = list(map(int, vim_helper.eval("""getpos("'<")""")))
+        sv, ev, selection = vim_helper.eval_all(
+            ["""getpos("'<")""", """getpos("'>")""", "&selection"]
+        )
+        sv = list(map(int, sv))
         sv = Position(sv[1] - 1, sv[2] - 1)
-        ev = list(map(int, vim_helper.eval("""getpos("'>")""")))
+        ev = list(map(int, ev))
         ev = Position(ev[1] - 1, ev[2] - 1)
-        if "exclusive" in vim_helper.eval("&selection"):
+        if "exclusive" in selection:
             ppos.col -= 1  # We want to be inclusive, sorry.
             ev.col -= 1
         es = []
@@ -155,112 +168,232 @@ def guess_edit(initial_line, last_text, current_text, vim_state):
     return False, None
 
 
+# Edits are only searched for up to this distance. Beyond it, the text that
+# differs is deleted and inserted as a whole.
+_MAX_EDIT_DISTANCE = 500
+
+
+def common_prefix_length(a, b, x=0, y=0):
+    """Length of the common prefix of the strings or lists a[x:] and b[y:]."""
+    if x >= len(a) or y >= len(b) or a[x] != b[y]:
+        return 0
+    # Compare slices of growing length first, they are compared much faster
+    # than single items in Python. Only the items after the common prefix
+    # found so far are compared.
+    low, high = 1, 2
+    while a[x + low : x + high] == b[y + low : y + high]:
+        if x + high >= len(a) or y + high >= len(b):
+            return min(len(a) - x, len(b) - y)
+        low, high = high, high * 2
+    high = min(high - 1, len(a) - x, len(b) - y)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[x + low : x + middle] == b[y + low : y + middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def _edits(a, b):
+    """Returns the shortest list of ('D', x, y) and ('I', x, y) edits, that
+    delete a[x] or insert b[y], using Myers' O(ND) algorithm. Returns None if
+    there are more than _MAX_EDIT_DISTANCE edits."""
+    max_distance = min(len(a) + len(b), _MAX_EDIT_DISTANCE)
+    if abs(len(a) - len(b)) > max_distance:
+        return None
+    # furthest[offset + k] is the furthest x reached on the diagonal k = x - y.
+    offset = max_distance + 1
+    furthest = [0] * (2 * offset + 1)
+    trace = []
+    for distance in range(max_distance + 1):
+        for k in range(-distance, distance + 1, 2):
+            if k == -distance or (
+                k != distance and furthest[offset + k - 1] < furthest[offset + k + 1]
+            ):
+                x = furthest[offset + k + 1]
+            else:
+                x = furthest[offset + k - 1] + 1
+            x += common_prefix_length(a, b, x, x - k)
+            furthest[offset + k] = x
+            if x >= len(a) and x - k >= len(b):
+                return _backtrack(trace, len(a), len(b))
+        trace.append(furthest[offset - distance : offset + distance + 1 : 2])
+    return None
+
+
+def _backtrack(trace, x, y):
+    """Follows the furthest reaching paths in 'trace' back from 'x', 'y' and
+    returns the edits on the way. trace[d][i] is the furthest x reached with d
+    edits on the diagonal 2 * i - d."""
+    edits = []
+    for distance in range(len(trace), 0, -1):
+        previous = trace[distance - 1]
+        k = x - y
+        if k == -distance or (
+            k != distance
+            and previous[(k + distance - 2) // 2] < previous[(k + distance) // 2]
+        ):
+            x = previous[(k + distance) // 2]
+            y = x - k - 1
+            edits.append(("I", x, y))
+        else:
+            x = previous[(k + distance - 2) // 2]
+            y = x - k + 1
+            edits.append(("D", x, y))
+    edits.reverse()
+    return edits
+
+
+def _changes(a, b):
+    """Returns the parts of 'a' and 'b' that differ as a list of [a_start,
+    a_end, b_start, b_end]. The text between two changes is the same in 'a'
+    and 'b'."""
+    prefix = common_prefix_length(a, b)
+    suffix = min(common_prefix_length(a[::-1], b[::-1]), min(len(a), len(b)) - prefix)
+    a_end, b_end = len(a) - suffix, len(b) - suffix
+    if prefix == a_end and prefix == b_end:
+        return []
+    if prefix == a_end or prefix == b_end:
+        return [[prefix, a_end, prefix, b_end]]
+    edits = _edits(a[prefix:a_end], b[prefix:b_end])
+    if edits is None:
+        return [[prefix, a_end, prefix, b_end]]
+
+    changes = []
+    for ctype, x, y in edits:
+        x += prefix
+        y += prefix
+        if changes and changes[-1][1] == x and changes[-1][3] == y:
+            change = changes[-1]
+        else:
+            change = [x, x, y, y]
+            changes.append(change)
+        if ctype == "D":
+            change[1] += 1
+        else:
+            change[3] += 1
+    return changes
+
+
+def _move_to_front(a, b, change, start):
+    """Moves 'change' as far to the front as the text allows, but not before
+    'start', if it only deletes or only inserts text. If the text spans
+    lines, it is moved back until it ends at the end of a line, if possible."""
+    a_start, a_end, b_start, b_end = change
+    if a_start == a_end:
+        text, first, last = b, b_start, b_end
+    elif b_start == b_end:
+        text, first, last = a, a_start, a_end
+    else:
+        return
+    shift = 0
+    while a_start - shift > start and text[first - shift - 1] == text[last - shift - 1]:
+        shift += 1
+    # Text spanning lines reads best if it ends at the end of a line.
+    if "\n" in text[first - shift : last - shift]:
+        for better_shift in range(shift, -1, -1):
+            if text[last - better_shift - 1] == "\n":
+                shift = better_shift
+                break
+    change[:] = [a_start - shift, a_end - shift, b_start - shift, b_end - shift]
+
+
+def _size(change):
+    """Number of characters a change deletes or inserts, whichever is more."""
+    return max(change[1] - change[0], change[3] - change[2])
+
+
+def _can_merge(a, b, before, change):
+    """True if 'change' can be merged into the change 'before' it. Changes
+    that touch are merged. Otherwise 'before' has to delete text, the text
+    between them must not be longer than either change and they must not be
+    joined across a line break."""
+    if before[1] == change[0]:
+        return True
+    if before[0] == before[1]:
+        return False
+    between = change[0] - before[1]
+    if between > _size(before) or between > _size(change):
+        return False
+    if "\n" in a[before[1] - 1 : change[0]]:
+        return False
+    if before[2] != before[3] and b[before[3] - 1] == "\n":
+        return False
+    if change[0] != change[1] and a[change[0]] == "\n":
+        return False
+    return change[2] == change[3] or b[change[2]] != "\n"
+
+
+def _tidy_up(a, b, changes):
+    """Moves changes to the front and merges changes where _can_merge()
+    allows it."""
+    tidied = []
+    for change in changes:
+        tidied.append(change)
+        while True:
+            _move_to_front(a, b, change, tidied[-2][1] if len(tidied) > 1 else 0)
+            if len(tidied) == 1:
+                break
+            before = tidied[-2]
+            if not _can_merge(a, b, before, change):
+                break
+            tidied.pop()
+            before[1], before[3] = change[1], change[3]
+            change = before
+    return tidied
+
+
 def diff(a, b, sline=0):
     """
-    Return a list of deletions and insertions that will turn 'a' into 'b'. This
-    is done by traversing an implicit edit graph and searching for the shortest
-    route. The basic idea is as follows:
-
-        - Matching a character is free as long as there was no
-          deletion/insertion before. Then, matching will be seen as delete +
-          insert [1].
-        - Deleting one character has the same cost everywhere. Each additional
-          character costs only have of the first deletion.
-        - Insertion is cheaper the earlier it happens. The first character is
-          more expensive that any later [2].
-
-    [1] This is that world -> aolsa will be "D" world + "I" aolsa instead of
-        "D" w , "D" rld, "I" a, "I" lsa
-    [2] This is that "hello\n\n" -> "hello\n\n\n" will insert a newline after
+    Return a list of deletions and insertions that will turn 'a' into 'b'.
+
+    The shortest edit script is found with Myers' O(ND) diff algorithm and
+    then changed to read more like what a user would do:
+
+        - Insertions and deletions that could happen at several places happen
+          as early as possible [1], but end at the end of a line if they span
+          lines.
+        - A change is merged into a change before it that deletes text if
+          the text between them is not longer than either of them and they
+          are not joined across a line break. The text in between is then
+          deleted and inserted again [2].
+        - Deleted text of a change is deleted before the new text is inserted
+          and consecutive characters are deleted or inserted together, up to
+          the end of the line.
+
+    If more than _MAX_EDIT_DISTANCE characters would have to be deleted and
+    inserted, all text between the common start and end is replaced instead.
+
+    [1] This is that "hello\n\n" -> "hello\n\n\n" will insert a newline after
         hello and not after \n
+    [2] This is that world -> aolsa will be "D" world + "I" aolsa instead of
+        "D" w , "D" rld, "I" a, "I" lsa
     """
-    d = defaultdict(list)  # pylint:disable=invalid-name
-    seen = defaultdict(lambda: sys.maxsize)
-
-    d[0] = [(0, 0, sline, 0, ())]
-    cost = 0
-    deletion_cost = len(a) + len(b)
-    insertion_cost = len(a) + len(b)
-    while True:
-        while len(d[cost]):
-            x, y, line, col, what = d[cost].pop()
-
-            if a[x:] == b[y:]:
-                return what
-
-            if x < len(a) and y < len(b) and a[x] == b[y]:
-                ncol = col + 1
-                nline = line
-                if a[x] == "\n":
-                    ncol = 0
-                    nline += 1
-                lcost = cost + 1
-                if (
-                    what
-                    and what[-1][0] == "D"
-                    and what[-1][1] == line
-                    and what[-1][2] == col
-                    and a[x] != "\n"
-                ):
-                    # Matching directly after a deletion should be as costly as
-                    # DELETE + INSERT + a bit
-                    lcost = (deletion_cost + insertion_cost) * 1.5
-                if seen[x + 1, y + 1] > lcost:
-                    d[lcost].append((x + 1, y + 1, nline, ncol, what))
-                    seen[x + 1, y + 1] = lcost
-            if y < len(b):  # INSERT
-                ncol = col + 1
-                nline = line
-                if b[y] == "\n":
-                    ncol = 0
-                    nline += 1
-                if (
-                    what
-                    and what[-1][0] == "I"
-                    and what[-1][1] == nline
-                    and what[-1][2] + len(what[-1][-1]) == col
-                    and b[y] != "\n"
-                    and seen[x, y + 1] > cost + (insertion_cost + ncol) // 2
-                ):
-                    seen[x, y + 1] = cost + (insertion_cost + ncol) // 2
-                    d[cost + (insertion_cost + ncol) // 2].append(
-                        (
-                            x,
-                            y + 1,
-                            line,
-                            ncol,
-                            what[:-1]
-                            + (("I", what[-1][1], what[-1][2], what[-1][-1] + b[y]),),
-                        )
-                    )
-                elif seen[x, y + 1] > cost + insertion_cost + ncol:
-                    seen[x, y + 1] = cost + insertion_cost + ncol
-                    d[cost + ncol + insertion_cost].append(
-                        (x, y + 1, nline, ncol, what + (("I", line, col, b[y]),))
-                    )
-            if x < len(a):  # DELETE
-                if (
-                    what
-                    and what[-1][0] == "D"
-                    and what[-1][1] == line
-                    and what[-1][2] == col
-                    and a[x] != "\n"
-                    and what[-1][-1] != "\n"
-                    and seen[x + 1, y] > cost + deletion_cost // 2
-                ):
-                    seen[x + 1, y] = cost + deletion_cost // 2
-                    d[cost + deletion_cost // 2].append(
-                        (
-                            x + 1,
-                            y,
-                            line,
-                            col,
-                            what[:-1] + (("D", line, col, what[-1][-1] + a[x]),),
-                        )
-                    )
-                elif seen[x + 1, y] > cost + deletion_cost:
-                    seen[x + 1, y] = cost + deletion_cost
-                    d[cost + deletion_cost].append(
-                        (x + 1, y, line, col, what + (("D", line, col, a[x]),))
-                    )
-        cost += 1
+    changes = _tidy_up(a, b, _changes(a, b))
+
+    cmds = []
+    line, col, position = sline, 0, 0
+    for a_start, a_end, b_start, b_end in changes:
+        newlines = b.count("\n", position, b_start)
+        if newlines:
+            line += newlines
+            col = b_start - b.rfind("\n", position, b_start) - 1
+        else:
+            col += b_start - position
+        position = b_end
+
+        for i, text in enumerate(a[a_start:a_end].split("\n")):
+            if i:
+                cmds.append(("D", line, col, "\n"))
+            if text:
+                cmds.append(("D", line, col, text))
+        for i, text in enumerate(b[b_start:b_end].split("\n")):
+            if i:
+                cmds.append(("I", line, col, "\n"))
+                line += 1
+                col = 0
+            if text:
+                cmds.append(("I", line, col, text))
+                col += len(text)
+    return tuple(cmds)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+"""Reports the lines the user changed in a buffer.
+
+Vim's listener_add() and Neovim's nvim_buf_attach() call back for every
+change of a buffer. The changes are collected in Vim by the functions in
+autoload/UltiSnips.vim. Where neither is available, the changes have to be
+found by comparing the text of the snippet with a copy of it.
+"""
+
+from UltiSnips import vim_helper
+
+
+def merge_changes(changes):
+    """Merges the line changes in 'changes' into one that covers all of them.
+
+    Each change is a (first, old_end, new_end) tuple: the lines from 'first'
+    to 'old_end' were replaced by the lines from 'first' to 'new_end'. Line
+    numbers start at 0 and refer to the buffer after the changes before it.
+    Returns None if there are no changes.
+    """
+    merged = None
+    for first, old_end, new_end in changes:
+        if merged is None:
+            merged = (first, old_end, new_end)
+            continue
+        merged_first, merged_old_end, merged_new_end = merged
+        # Lines after both changes move by the same amount in old and new
+        # line numbers, so the merged change ends where the later of them
+        # ends.
+        end = max(merged_new_end, old_end)
+        merged = (
+            min(merged_first, first),
+            merged_old_end + end - merged_new_end,
+            end + new_end - old_end,
+        )
+    return merged
+
+
+class EditSource:
+    """Collects the changes to the buffer of the active snippets, if Vim can
+    report them."""
+
+    def __init__(self):
+        self._tracking = False
+
+    @property
+    def tracking(self):
+        """True if changes to the current buffer are collected."""
+        return self._tracking
+
+    def start(self):
+        """Starts collecting the changes to the current buffer."""
+        self._tracking = vim_helper.eval("UltiSnips#TrackChanges()") == "1"
+
+    def stop(self):
+        """Stops collecting changes."""
+        if self._tracking:
+            vim_helper.command("call UltiSnips#StopTrackingChanges()")
+            self._tracking = False
+
+    def changed_lines(self):
+        """Returns the merged change of all lines changed since the last call,
+        see merge_changes().
+
+        Returns None if changes are not collected or nothing changed. Check
+        'tracking' to tell the two apart.
+        """
+        if not self._tracking:
+            return None
+        changes = vim_helper.eval("UltiSnips#FlushChanges()")
+        return merge_changes(
+            tuple(int(number) for number in change) for change in changes
+        )
@@ -14,11 +14,16 @@ class IndentUtil:
 
     def reset(self):
         """Gets the spacing properties from Vim."""
-        self.shiftwidth = int(
-            vim_helper.eval("exists('*shiftwidth') ? shiftwidth() : &shiftwidth")
+        shiftwidth, expandtab, tabstop = vim_helper.eval_all(
+            [
+                "exists('*shiftwidth') ? shiftwidth() : &shiftwidth",
+                "&expandtab",
+                "&tabstop",
+            ]
         )
-        self._expandtab = vim_helper.eval("&expandtab") == "1"
-        self._tabstop = int(vim_helper.eval("&tabstop"))
+        self.shiftwidth = int(shiftwidth)
+        self._expandtab = expandtab == "1"
+        self._tabstop = int(tabstop)
 
     def ntabs_to_proper_indent(self, ntabs):
         """Convert 'ntabs' number of tabs to the proper indent prefix."""
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+"""Vim's notion of words, without asking Vim.
+
+Whether a character is a keyword character depends on the 'iskeyword' option
+of the buffer for characters below 256 and on fixed character classes for all
+others. Vim starts a word (what \\< matches) at a character if its class is 2
+or more and differs from the class of the character before it. Composing
+characters belong to the character before them, so a word never starts at
+one.
+"""
+
+from bisect import bisect_right
+import unicodedata
+
+# All characters from 0x100 on whose class is not 2, as "first-last:class" in
+# hex. Taken from Vim's charclass(), emoji are class 3.
+_CLASS_TABLE = """
+37e:1 387:1 55a-55f:1 589:1 5be:1 5c0:1 5c3:1 5f3-5f4:1 60c:1 61b:1 61f:1
+66a-66d:1 6d4:1 700-70d:1 964-965:1 970:1 df4:1 e4f:1 e5a-e5b:1 f04-f12:1
+f3a-f3d:1 f85:1 104a-104f:1 10fb:1 1361-1368:1 166d-166e:1 1680:0
+169b-169c:1 16eb-16ed:1 1735-1736:1 17d4-17dc:1 1800-180a:1 2000-200b:0
+200c-2027:1 2028-2029:0 202a-202e:1 202f:0 2030-203b:1 203c:3 203d-2048:1
+2049:3 204a-205e:1 205f:0 2060-2121:1 2122:3 2123-2138:1 2139:3 213a-2193:1
+2194-2199:3 219a-21a8:1 21a9-21aa:3 21ab-2319:1 231a-231b:3 231c-2327:1
+2328:3 2329-23ce:1 23cf:3 23d0-23e8:1 23e9-23f3:3 23f4-23f7:1 23f8-23fa:3
+23fb-24c1:1 24c2:3 24c3-25a9:1 25aa-25ab:3 25ac-25b5:1 25b6:3 25b7-25bf:1
+25c0:3 25c1-25fa:1 25fb-25fe:3 25ff:1 2600-2604:3 2605-260d:1 260e:3
+260f-2610:1 2611:3 2612-2613:1 2614-2615:3 2616-2617:1 2618:3 2619-261c:1
+261d:3 261e-261f:1 2620:3 2621:1 2622-2623:3 2624-2625:1 2626:3 2627-2629:1
+262a:3 262b-262d:1 262e-262f:3 2630-2637:1 2638-263a:3 263b-263f:1 2640:3
+2641:1 2642:3 2643-2647:1 2648-2653:3 2654-265e:1 265f-2660:3 2661-2662:1
+2663:3 2664:1 2665-2666:3 2667:1 2668:3 2669-267a:1 267b:3 267c-267d:1
+267e-267f:3 2680-2691:1 2692-2697:3 2698:1 2699:3 269a:1 269b-269c:3
+269d-269f:1 26a0-26a1:3 26a2-26a6:1 26a7:3 26a8-26a9:1 26aa-26ab:3
+26ac-26af:1 26b0-26b1:3 26b2-26bc:1 26bd-26be:3 26bf-26c3:1 26c4-26c5:3
+26c6-26c7:1 26c8:3 26c9-26cd:1 26ce-26cf:3 26d0:1 26d1:3 26d2:1 26d3-26d4:3
+26d5-26e8:1 26e9-26ea:3 26eb-26ef:1 26f0-26f5:3 26f6:1 26f7-26fa:3
+26fb-26fc:1 26fd:3 26fe-2701:1 2702:3 2703-2704:1 2705:3 2706-2707:1
+2708-270d:3 270e:1 270f:3 2710-2711:1 2712:3 2713:1 2714:3 2715:1 2716:3
+2717-271c:1 271d:3 271e-2720:1 2721:3 2722-2727:1 2728:3 2729-2732:1
+2733-2734:3 2735-2743:1 2744:3 2745-2746:1 2747:3 2748-274b:1 274c:3 274d:1
+274e:3 274f-2752:1 2753-2755:3 2756:1 2757:3 2758-2762:1 2763-2764:3
+2765-2794:1 2795-2797:3 2798-27a0:1 27a1:3 27a2-27af:1 27b0:3 27b1-27be:1
+27bf:3 27c0-27ff:1 2800-28ff:2800 2900-2933:1 2934-2935:3 2936-2998:1
+29d8-29db:1 29fc-29fd:1 2b05-2b07:3 2b1b-2b1c:3 2b50:3 2b55:3 2e00-2e7f:1
+3000:0 3001-3020:1 3030:3 303d:3 3040-309f:3040 30a0-30ff:30a0 3297:3
+3299:3 3300-9fff:4e00 ac00-d7a3:ac00 f900-faff:4e00 fd3e-fd3f:1 fe30-fe6b:1
+ff00-ff0f:1 ff1a-ff20:1 ff3b-ff40:1 ff5b-ff65:1 1d000-1d24f:1 1d400-1d7ff:1
+1f000-1f003:1 1f004:3 1f005-1f0ce:1 1f0cf:3 1f0d0-1f16f:1 1f170-1f171:3
+1f172-1f17d:1 1f17e-1f17f:3 1f180-1f18d:1 1f18e:3 1f18f-1f190:1
+1f191-1f19a:3 1f19b-1f1e5:1 1f1e6-1f1ff:3 1f200:1 1f201-1f202:3
+1f203-1f219:1 1f21a:3 1f21b-1f22e:1 1f22f:3 1f230-1f231:1 1f232-1f23a:3
+1f23b-1f24f:1 1f250-1f251:3 1f252-1f2ff:1 1f300-1f321:3 1f322-1f323:1
+1f324-1f393:3 1f394-1f395:1 1f396-1f397:3 1f398:1 1f399-1f39b:3
+1f39c-1f39d:1 1f39e-1f3f0:3 1f3f1-1f3f2:1 1f3f3-1f3f5:3 1f3f6:1
+1f3f7-1f4fd:3 1f4fe:1 1f4ff-1f53d:3 1f53e-1f548:1 1f549-1f54e:3 1f54f:1
+1f550-1f567:3 1f568-1f56e:1 1f56f-1f570:3 1f571-1f572:1 1f573-1f57a:3
+1f57b-1f586:1 1f587:3 1f588-1f589:1 1f58a-1f58d:3 1f58e-1f58f:1 1f590:3
+1f591-1f594:1 1f595-1f596:3 1f597-1f5a3:1 1f5a4-1f5a5:3 1f5a6-1f5a7:1
+1f5a8:3 1f5a9-1f5b0:1 1f5b1-1f5b2:3 1f5b3-1f5bb:1 1f5bc:3 1f5bd-1f5c1:1
+1f5c2-1f5c4:3 1f5c5-1f5d0:1 1f5d1-1f5d3:3 1f5d4-1f5db:1 1f5dc-1f5de:3
+1f5df-1f5e0:1 1f5e1:3 1f5e2:1 1f5e3:3 1f5e4-1f5e7:1 1f5e8:3 1f5e9-1f5ee:1
+1f5ef:3 1f5f0-1f5f2:1 1f5f3:3 1f5f4-1f5f9:1 1f5fa-1f64f:3 1f650-1f67f:1
+1f680-1f6c5:3 1f6c6-1f6ca:1 1f6cb-1f6d2:3 1f6d3-1f6d4:1 1f6d5-1f6d7:3
+1f6d8-1f6db:1 1f6dc-1f6e5:3 1f6e6-1f6e8:1 1f6e9:3 1f6ea:1 1f6eb-1f6ec:3
+1f6ed-1f6ef:1 1f6f0:3 1f6f1-1f6f2:1 1f6f3-1f6fc:3 1f6fd-1f7df:1
+1f7e0-1f7eb:3 1f7ec-1f7ef:1 1f7f0:3 1f7f1-1f90b:1 1f90c-1f93a:3 1f93b:1
+1f93c-1f945:3 1f946:1 1f947-1f9ff:3 1fa70-1fa7c:3 1fa80-1fa88:3
+1fa90-1fabd:3 1fabf-1fac5:3 1face-1fadb:3 1fae0-1fae8:3 1faf0-1faf8:3
+20000-2a6df:4e00 2a700-2b81f:4e00 2f800-2fa1f:4e00
+"""
+
+
+def _parse_class_table(table):
+    starts, ends, classes = [], [], []
+    for entry in table.split():
+        chars, char_class = entry.split(":")
+        first, _, last = chars.partition("-")
+        starts.append(int(first, 16))
+        ends.append(int(last or first, 16))
+        classes.append(int(char_class, 16))
+    return starts, ends, classes
+
+
+_CLASS_STARTS, _CLASS_ENDS, _CLASSES = _parse_class_table(_CLASS_TABLE)
+
+_BLANKS = frozenset(" \t\0\xa0")
+
+
+def _is_alpha(c):
+    """Vim's idea of a letter for the '@' in 'iskeyword'."""
+    char = chr(c)
+    return char.lower() != char or char.upper() != char or c == 0xDF
+
+
+def _parse_char(value, pos):
+    """Parses a decimal number or a character in 'iskeyword'."""
+    end = pos
+    while end < len(value) and value[end] in "0123456789":
+        end += 1
+    if end > pos:
+        return int(value[pos:end]), end
+    return ord(value[pos]), pos + 1
+
+
+def parse_iskeyword(value):
+    """Returns the set of keyword characters below 256 for the 'iskeyword'
+    option 'value'. Parts that Vim would reject are ignored."""
+    keyword = set()
+    pos = 0
+    while pos < len(value):
+        exclude = False
+        if value[pos] == "^" and pos + 1 < len(value):
+            exclude = True
+            pos += 1
+        first, pos = _parse_char(value, pos)
+        last = None
+        if pos + 1 < len(value) and value[pos] == "-":
+            last, pos = _parse_char(value, pos + 1)
+        only_alpha = False
+        if last is None:
+            if first == ord("@"):
+                only_alpha = True
+                first, last = 1, 255
+            else:
+                last = first
+        if 0 < first <= last < 256 and (pos == len(value) or value[pos] == ","):
+            chars = range(first, last + 1)
+            if only_alpha:
+                chars = filter(_is_alpha, chars)
+            if exclude:
+                keyword.difference_update(chars)
+            else:
+                keyword.update(chars)
+        # Continue after the next comma, like Vim skipping to the next part.
+        comma = value.find(",", pos)
+        if comma == -1:
+            break
+        pos = comma + 1
+        while pos < len(value) and value[pos] == " ":
+            pos += 1
+    return frozenset(keyword)
+
+
+def is_composing(char):
+    """True if 'char' is combined with the character before it."""
+    return unicodedata.category(char) in ("Mn", "Me")
+
+
+class KeywordChars:
+    """Word boundaries as Vim sees them for one value of 'iskeyword'."""
+
+    def __init__(self, iskeyword):
+        self.iskeyword = iskeyword
+        self._keyword = parse_iskeyword(iskeyword)
+
+    def char_class(self, char):
+        """The class of 'char' like Vim's charclass(): 0 for blanks, 1 for
+        punctuation, 2 for keyword characters and more for others."""
+        c = ord(char)
+        if c < 0x100:
+            if char in _BLANKS:
+                return 0
+            return 2 if c in self._keyword else 1
+        index = bisect_right(_CLASS_STARTS, c) - 1
+        if index >= 0 and c <= _CLASS_ENDS[index]:
+            return _CLASSES[index]
+        return 2
+
+    def is_word_start(self, text, index):
+        """True if \\< matches before 'text[index]'."""
+        if not 0 <= index < len(text) or is_composing(text[index]):
+            return False
+        char_class = self.char_class(text[index])
+        if char_class < 2:
+            return False
+        if index == 0:
+            return True
+        # Composing characters take the class of the character they are on.
+        index -= 1
+        while index > 0 and is_composing(text[index]):
+            index -= 1
+        return self.char_class(text[index]) != char_class
+
+    def last_word_start(self, text):
+        """The index of the last word start in 'text' after its first
+        character, or 0 if there is none. 'text[index:]' is what Vim's
+        substitute(text, '\\v^.+<(.+)', '\\1', '') returns."""
+        for index in range(len(text) - 1, 0, -1):
+            if self.is_word_start(text, index):
+                return index
+        return 0
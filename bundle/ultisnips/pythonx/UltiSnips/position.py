@@ -13,6 +13,9 @@ class Position:
     """Represents a Position in a text file: (0 based line index, 0 based column
     index) and provides methods for moving them around."""
 
+    # Positions are created and compared all the time, so keep them small.
+    __slots__ = ("line", "col")
+
     def __init__(self, line, col):
         self.line = line
         self.col = col
@@ -20,7 +23,7 @@ class Position:
     def move(self, pivot, delta):
         """'pivot' is the position of the first changed character, 'delta' is
         how text after it moved."""
-        if self < pivot:
+        if self.line < pivot.line or (self.line == pivot.line and self.col < pivot.col):
             return
         if delta.line == 0:
             if self.line == pivot.line:
@@ -53,16 +56,20 @@ class Position:
         return Position(self.line - pos.line, self.col - pos.col)
 
     def __eq__(self, other):
-        return (self.line, self.col) == (other.line, other.col)
+        return self.line == other.line and self.col == other.col
 
     def __ne__(self, other):
-        return (self.line, self.col) != (other.line, other.col)
+        return self.line != other.line or self.col != other.col
 
     def __lt__(self, other):
-        return (self.line, self.col) < (other.line, other.col)
+        return self.line < other.line or (
+            self.line == other.line and self.col < other.col
+        )
 
     def __le__(self, other):
-        return (self.line, self.col) <= (other.line, other.col)
+        return self.line < other.line or (
+            self.line == other.line and self.col <= other.col
+        )
 
     def __repr__(self):
         return "(%i,%i)" % (self.line, self.col)
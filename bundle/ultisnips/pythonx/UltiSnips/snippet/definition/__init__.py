@@ -2,3 +2,4 @@
 
 from UltiSnips.snippet.definition.ulti_snips import UltiSnipsSnippetDefinition
 from UltiSnips.snippet.definition.snipmate import SnipMateSnippetDefinition
+from UltiSnips.snippet.definition.anonymous_cache import AnonymousSnippetCache
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+"""In memory cache of the definitions of anonymous snippets.
+
+Snippet actions and plugins tend to expand the same few anonymous snippets over
+and over again. A definition keeps the tokens of its text and its compiled
+code, so reusing it saves tokenizing and compiling them for every expansion.
+"""
+
+from collections import OrderedDict
+
+from UltiSnips.snippet.definition.ulti_snips import UltiSnipsSnippetDefinition
+
+# The cache keeps at most this many definitions by default.
+MAX_ANONYMOUS_SNIPPETS = 64
+
+
+class AnonymousSnippetCache:
+    """See module docstring. The least recently used definition is dropped
+    once there are more than 'max_size'."""
+
+    def __init__(self, max_size=MAX_ANONYMOUS_SNIPPETS):
+        self._max_size = max_size
+        self._definitions = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self):
+        """Fraction of lookups that could be served from the cache."""
+        total = self.hits + self.misses
+        if not total:
+            return 0.0
+        return self.hits / total
+
+    def __len__(self):
+        return len(self._definitions)
+
+    def __repr__(self):
+        return (
+            "AnonymousSnippetCache(size=%i, max_size=%i, hits=%i, misses=%i, "
+            "hit_rate=%.2f)"
+            % (
+                len(self._definitions),
+                self._max_size,
+                self.hits,
+                self.misses,
+                self.hit_rate,
+            )
+        )
+
+    def definition_for(self, value, trigger, description, options, context, actions):
+        """Returns a definition of the anonymous snippet with the given
+        arguments, see SnippetManager.expand_anon(). A cached definition has
+        forgotten its last match, so it expands like a new one."""
+        key = (
+            value,
+            trigger,
+            description,
+            options,
+            context,
+            tuple(sorted(actions.items())) if actions else None,
+        )
+        try:
+            definition = self._definitions.get(key)
+        except TypeError:
+            # Something in the key cannot be hashed, do not cache it.
+            self.misses += 1
+            return self._new_definition(*key[:5], actions)
+        if definition is not None:
+            self.hits += 1
+            self._definitions.move_to_end(key)
+            definition.forget_match()
+            return definition
+
+        self.misses += 1
+        definition = self._new_definition(*key[:5], actions)
+        self._definitions[key] = definition
+        if len(self._definitions) > self._max_size:
+            self._definitions.popitem(last=False)
+        return definition
+
+    @staticmethod
+    def _new_definition(value, trigger, description, options, context, actions):
+        return UltiSnipsSnippetDefinition(
+            0, trigger, value, description, options, {}, "", context, actions
+        )
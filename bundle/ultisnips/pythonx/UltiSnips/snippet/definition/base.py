@@ -12,12 +12,31 @@ from UltiSnips import vim_helper
 from UltiSnips.error import PebkacError
 from UltiSnips.indent_util import IndentUtil
 from UltiSnips.position import Position
-from UltiSnips.text import escape
 from UltiSnips.text_objects import SnippetInstance
-from UltiSnips.text_objects.python_code import SnippetUtilForAction, cached_compile
+from UltiSnips.text_objects.python_code import (
+    SnippetUtilForAction,
+    cached_compile,
+    exec_globals,
+)
 
 __WHITESPACE_SPLIT = re.compile(r"\s")
 
+# Inline flags that apply to the whole pattern. They change the meaning of a
+# pattern that is embedded into another one.
+_GLOBAL_FLAGS = re.compile(r"\(\?[aiLmsux]+\)")
+
+
+def end_anchored(pattern):
+    """Compiles the regular expression 'pattern' so that it only matches at
+    the end of the text. Returns None if this would change the meaning of
+    'pattern' or it is invalid."""
+    if _GLOBAL_FLAGS.search(pattern):
+        return None
+    try:
+        return re.compile(r"(?:%s)\Z" % pattern)
+    except re.error:
+        return None
+
 
 class _SnippetUtilCursor:
     def __init__(self, cursor):
@@ -100,29 +119,30 @@ class SnippetDefinition:
         self._value = value
         self._description = description
         self._opts = options
-        self._matched = ""
+        # None until the first call to matches() or could_match(), see
+        # _match_own_trigger().
+        self._matched = None
         self._last_re = None
+        self._trigger_re = None
+        self._trigger_end_re = None
         self._globals = globals
-        self._compiled_globals = None
+        self._globals_code = None
         self._location = location
 
-        # Make sure that we actually match our trigger in case we are
-        # immediately expanded. At this point we don't take into
-        # account a any context code
-        self._context_code = None
-        self.matches(self._trigger)
-
+        # Most snippets are never expanded, so all code is only compiled when
+        # it is needed for the first time.
         self._context_code = context
-        if context:
-            self._compiled_context_code = cached_compile(
-                "snip.context = " + context, "<context-code>", "exec"
-            )
+        self._compiled_context_code = None
         self._context = None
         self._actions = actions or {}
-        self._compiled_actions = {
-            action: cached_compile(source, "<action-code>", "exec")
-            for action, source in self._actions.items()
-        }
+        self._compiled_actions = {}
+
+        # The tokens of the text of this snippet, see tokenize_snippet_text().
+        # Created when the snippet is expanded for the first time.
+        self._templates = None
+        # False once the snippet turned out not to be static, see
+        # static_text().
+        self._static = None
 
     def __repr__(self):
         return "_SnippetDefinition(%r,%s,%s,%s)" % (
@@ -132,13 +152,42 @@ class SnippetDefinition:
             self._opts,
         )
 
+    def forget_match(self):
+        """Forgets the last match and the context that came with it, so that
+        this snippet expands as if it had never been matched."""
+        self._matched = None
+        self._last_re = None
+        self._context = None
+
+    def _match_own_trigger(self):
+        """Make sure that we actually match our trigger in case we are
+        immediately expanded without a call to matches(). At this point we
+        don't take into account any context code."""
+        if self._matched is not None:
+            return
+        context_code, self._context_code = self._context_code, None
+        try:
+            self.matches(self._trigger)
+        finally:
+            self._context_code = context_code
+
     def _re_match(self, trigger):
         """Test if the current regex trigger matches `trigger`.
 
         If so, set _last_re and _matched.
 
         """
-        for match in re.finditer(self._trigger, trigger):
+        if self._trigger_re is None:
+            self._trigger_re = re.compile(self._trigger)
+            self._trigger_end_re = end_anchored(self._trigger)
+        # Only a match that ends with 'trigger' counts. Most of the time
+        # there is none, which the anchored pattern finds out without
+        # creating a match object for every match on the way.
+        if self._trigger_end_re is not None and not self._trigger_end_re.search(
+            trigger
+        ):
+            return False
+        for match in self._trigger_re.finditer(trigger):
             if match.end() != len(trigger):
                 continue
             else:
@@ -166,11 +215,18 @@ class SnippetDefinition:
             locals["visual_text"] = visual_content.text
             locals["last_placeholder"] = visual_content.placeholder
 
+        if self._compiled_context_code is None:
+            self._compiled_context_code = cached_compile(
+                "snip.context = " + self._context_code, "<context-code>", "exec"
+            )
         return self._eval_code(
-            "snip.context = " + self._context_code, locals, self._compiled_context_code
+            "snip.context = " + self._context_code,
+            self._last_re,
+            locals,
+            self._compiled_context_code,
         ).context
 
-    def _eval_code(self, code, additional_locals={}, compiled_code=None):
+    def _eval_code(self, code, last_re, additional_locals={}, compiled_code=None):
         current = vim.current
 
         locals = {
@@ -185,27 +241,20 @@ class SnippetDefinition:
 
         snip = SnippetUtilForAction(locals)
 
+        if self._globals_code is None:
+            self._join_globals()
         try:
-            if self._compiled_globals is None:
-                self._precompile_globals()
-            glob = {"snip": snip, "match": self._last_re}
-            exec(self._compiled_globals, glob)
+            glob = {"snip": snip, "match": last_re}
+            exec_globals(self._globals_code, glob)
             exec(compiled_code or code, glob)
         except Exception as e:
-            code = "\n".join(
-                [
-                    "import re, os, vim, string, random",
-                    "\n".join(self._globals.get("!p", [])).replace("\r\n", "\n"),
-                    code,
-                ]
-            )
-            self._make_debug_exception(e, code)
+            self._make_debug_exception(e, self._globals_code + "\n" + code)
             raise
 
         return snip
 
     def _execute_action(
-        self, action, context, additional_locals={}, compiled_action=None
+        self, action, context, last_re, additional_locals={}, compiled_action=None
     ):
         mark_to_use = "`"
         with vim_helper.save_mark(mark_to_use):
@@ -217,7 +266,7 @@ class SnippetDefinition:
 
             locals.update(additional_locals)
 
-            snip = self._eval_code(action, locals, compiled_action)
+            snip = self._eval_code(action, last_re, locals, compiled_action)
 
             if snip.cursor.is_set():
                 vim_helper.buf.cursor = Position(
@@ -269,18 +318,23 @@ class SnippetDefinition:
 
         e.snippet_code = code
 
-    def _precompile_globals(self):
-        self._compiled_globals = cached_compile(
-            "\n".join(
-                [
-                    "import re, os, vim, string, random",
-                    "\n".join(self._globals.get("!p", [])).replace("\r\n", "\n"),
-                ]
-            ),
-            "<global-snippets>",
-            "exec",
+    def _join_globals(self):
+        self._globals_code = "\n".join(
+            [
+                "import re, os, vim, string, random",
+                "\n".join(self._globals.get("!p", [])).replace("\r\n", "\n"),
+            ]
         )
 
+    def _compiled_action(self, action):
+        """Returns the compiled code of 'action'."""
+        compiled = self._compiled_actions.get(action)
+        if compiled is None:
+            compiled = self._compiled_actions[action] = cached_compile(
+                self._actions[action], "<action-code>", "exec"
+            )
+        return compiled
+
     def has_option(self, opt):
         """Check if the named option is set."""
         return opt in self._opts
@@ -305,6 +359,7 @@ class SnippetDefinition:
     def matched(self):
         """The last text that matched this snippet in match() or
         could_match()."""
+        self._match_own_trigger()
         return self._matched
 
     @property
@@ -317,8 +372,9 @@ class SnippetDefinition:
         """The matched context."""
         return self._context
 
-    def matches(self, before, visual_content=None):
-        """Returns True if this snippet matches 'before'."""
+    def matches(self, before, visual_content=None, keyword_chars=None):
+        """Returns True if this snippet matches 'before'. 'keyword_chars' is the
+        KeywordChars of the current buffer, looked up when not given."""
         # If user supplies both "w" and "i", it should perhaps be an
         # error, but if permitted it seems that "w" should take precedence
         # (since matching at word boundary and within a word == matching at word
@@ -341,8 +397,10 @@ class SnippetDefinition:
             match = words_suffix == self._trigger
             if match and words_prefix:
                 # Require a word boundary between prefix and suffix.
-                boundary_chars = escape(words_prefix[-1:] + words_suffix[:1], r"\"")
-                match = vim_helper.eval('"%s" =~# "\\\\v.<."' % boundary_chars) != "0"
+                boundary_chars = words_prefix[-1:] + words_suffix[:1]
+                if keyword_chars is None:
+                    keyword_chars = vim_helper.keyword_chars()
+                match = keyword_chars.is_word_start(boundary_chars, 1)
         elif "i" in self._opts:
             match = words.endswith(self._trigger)
         else:
@@ -367,8 +425,9 @@ class SnippetDefinition:
 
         return match
 
-    def could_match(self, before):
-        """Return True if this snippet could match the (partial) 'before'."""
+    def could_match(self, before, keyword_chars=None):
+        """Return True if this snippet could match the (partial) 'before'. See
+        matches() for 'keyword_chars'."""
         self._matched = ""
 
         # List all on whitespace.
@@ -384,10 +443,9 @@ class SnippetDefinition:
             match = self._re_match(before)
         elif "w" in self._opts:
             # Trim non-empty prefix up to word boundary, if present.
-            qwords = escape(words, r"\"")
-            words_suffix = vim_helper.eval(
-                'substitute("%s", "\\\\v^.+<(.+)", "\\\\1", "")' % qwords
-            )
+            if keyword_chars is None:
+                keyword_chars = vim_helper.keyword_chars()
+            words_suffix = words[keyword_chars.last_word_start(words) :]
             match = self._trigger.startswith(words_suffix)
             self._matched = words_suffix
 
@@ -427,8 +485,9 @@ class SnippetDefinition:
             snip = self._execute_action(
                 self._actions["pre_expand"],
                 self._context,
+                self._last_re,
                 locals,
-                self._compiled_actions["pre_expand"],
+                self._compiled_action("pre_expand"),
             )
             self._context = snip.context
             return snip.cursor.is_set()
@@ -446,8 +505,9 @@ class SnippetDefinition:
             snip = self._execute_action(
                 self._actions["post_expand"],
                 snippets_stack[-1].context,
+                snippets_stack[-1].last_re,
                 locals,
-                self._compiled_actions["post_expand"],
+                self._compiled_action("post_expand"),
             )
 
             snippets_stack[-1].context = snip.context
@@ -475,8 +535,9 @@ class SnippetDefinition:
             snip = self._execute_action(
                 self._actions["post_jump"],
                 current_snippet.context,
+                current_snippet.last_re,
                 locals,
-                self._compiled_actions["post_jump"],
+                self._compiled_action("post_jump"),
             )
 
             current_snippet.context = snip.context
@@ -485,13 +546,15 @@ class SnippetDefinition:
         else:
             return False
 
-    def launch(self, text_before, visual_content, parent, start, end):
-        """Launch this snippet, overwriting the text 'start' to 'end' and
-        keeping the 'text_before' on the launch line.
-
-        'Parent' is the parent snippet instance if any.
+    def parse_static_text(self, initial_text, indent):
+        """Returns the 'initial_text' of this snippet without its $0 and the
+        position of the $0 if the snippet has no text objects besides a $0
+        without placeholder text. Returns None otherwise."""
+        return None
 
-        """
+    def _initial_text(self, text_before):
+        """Returns the text of this snippet indented for the 'text_before' on
+        the launch line and the indent of that line."""
         indent = self._INDENT.match(text_before).group(0)
         lines = (self._value + "\n").splitlines()
         ind_util = IndentUtil()
@@ -511,10 +574,53 @@ class SnippetDefinition:
             if "m" in self._opts:
                 result_line = result_line.rstrip()
             initial_text.append(result_line)
-        initial_text = "\n".join(initial_text)
+        return "\n".join(initial_text), indent
+
+    def static_text(self, text_before):
+        """Returns the text of this snippet for the 'text_before' on the launch
+        line without its $0 and the position of the $0 in that text, if the
+        snippet is static: it has no actions and no text objects besides a $0
+        without placeholder text. Returns None otherwise.
+
+        Static snippets can be expanded with launch_static().
+
+        """
+        if self._actions or self._static is False:
+            return None
+        self._match_own_trigger()
+        if self._templates is None:
+            self._templates = {}
+        static_text = self.parse_static_text(*self._initial_text(text_before))
+        self._static = static_text is not None
+        return static_text
+
+    def launch_static(self, static_text, start, end):
+        """Launch this snippet from the 'static_text' returned by static_text(),
+        overwriting the text 'start' to 'end'. Returns the position of the $0
+        in the buffer.
+
+        No SnippetInstance is created, so nothing is left to track.
+
+        """
+        text, final_tabstop = static_text
+        lines = text.split("\n")
+        lines[0] = vim_helper.buf[start.line][: start.col] + lines[0]
+        lines[-1] += vim_helper.buf[end.line][end.col :]
+        vim_helper.buf[start.line : end.line + 1] = lines
+        if final_tabstop.line == 0:
+            return Position(start.line, start.col + final_tabstop.col)
+        return Position(start.line + final_tabstop.line, final_tabstop.col)
+
+    def launch(self, text_before, visual_content, parent, start, end):
+        """Launch this snippet, overwriting the text 'start' to 'end' and
+        keeping the 'text_before' on the launch line.
+
+        'Parent' is the parent snippet instance if any.
+
+        """
+        self._match_own_trigger()
+        initial_text, indent = self._initial_text(text_before)
 
-        if self._compiled_globals is None:
-            self._precompile_globals()
         snippet_instance = SnippetInstance(
             self,
             parent,
@@ -525,8 +631,9 @@ class SnippetDefinition:
             last_re=self._last_re,
             globals=self._globals,
             context=self._context,
-            _compiled_globals=self._compiled_globals,
         )
+        if self._templates is None:
+            self._templates = {}
         self.instantiate(snippet_instance, initial_text, indent)
         snippet_instance.replace_initial_text(vim_helper.buf)
         snippet_instance.update_textobjects(vim_helper.buf)
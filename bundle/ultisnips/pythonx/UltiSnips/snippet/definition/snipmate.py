@@ -27,4 +27,4 @@ class SnipMateSnippetDefinition(SnippetDefinition):
         )
 
     def instantiate(self, snippet_instance, initial_text, indent):
-        parse_and_instantiate(snippet_instance, initial_text, indent)
+        parse_and_instantiate(snippet_instance, initial_text, indent, self._templates)
@@ -4,11 +4,19 @@
 """A UltiSnips snippet after parsing."""
 
 from UltiSnips.snippet.definition.base import SnippetDefinition
-from UltiSnips.snippet.parsing.ulti_snips import parse_and_instantiate
+from UltiSnips.snippet.parsing.ulti_snips import (
+    parse_and_instantiate,
+    parse_static_text,
+)
 
 
 class UltiSnipsSnippetDefinition(SnippetDefinition):
     """See module doc."""
 
     def instantiate(self, snippet_instance, initial_text, indent):
-        return parse_and_instantiate(snippet_instance, initial_text, indent)
+        return parse_and_instantiate(
+            snippet_instance, initial_text, indent, self._templates
+        )
+
+    def parse_static_text(self, initial_text, indent):
+        return parse_static_text(initial_text, indent, self._templates)
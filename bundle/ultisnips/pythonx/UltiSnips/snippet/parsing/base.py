@@ -3,6 +3,8 @@
 
 """Common functionality of the snippet parsing codes."""
 
+import copy
+
 from UltiSnips.position import Position
 from UltiSnips.snippet.parsing.lexer import tokenize, TabStopToken
 from UltiSnips.text_objects import TabStop
@@ -25,6 +27,91 @@ def resolve_ambiguity(all_tokens, seen_ts):
                 Mirror(parent, seen_ts[token.number], token)
 
 
+# A definition keeps at most this many templates, one per indent and text.
+_MAX_TEMPLATES = 16
+
+
+def _tokenize_template(
+    text, indent, allowed_tokens_in_text, allowed_tokens_in_tabstops
+):
+    """Tokenizes 'text' as if it started at (0, 0), including the placeholder
+    text of tabstops. Returns a list of (parent, token) in the order the text
+    objects have to be created, where 'parent' is the index of the
+    TabStopToken containing 'token' or None."""
+    template = []
+
+    def _do_tokenize(parent, text, start, allowed_tokens):
+        """Recursive function that actually tokenizes."""
+        for token in tokenize(text, indent, start, allowed_tokens):
+            template.append((parent, token))
+            if isinstance(token, TabStopToken):
+                _do_tokenize(
+                    len(template) - 1,
+                    token.initial_text,
+                    token.start,
+                    allowed_tokens_in_tabstops,
+                )
+
+    _do_tokenize(None, text, Position(0, 0), allowed_tokens_in_text)
+    return template
+
+
+def _moved(pos, offset):
+    """Returns 'pos' relative to (0, 0) as a new position relative to
+    'offset'."""
+    if pos.line == 0:
+        return Position(offset.line, offset.col + pos.col)
+    return Position(offset.line + pos.line, pos.col)
+
+
+def get_template(
+    text, indent, allowed_tokens_in_text, allowed_tokens_in_tabstops, templates=None
+):
+    """Returns the tokens of 'text' for 'indent' as (parent, token) tuples, see
+    _tokenize_template().
+
+    If 'templates' is a dict, the tokens are looked up in and kept in it.
+
+    """
+    key = (text, indent)
+    template = templates.get(key) if templates is not None else None
+    if template is None:
+        template = _tokenize_template(
+            text, indent, allowed_tokens_in_text, allowed_tokens_in_tabstops
+        )
+        if templates is not None:
+            if len(templates) >= _MAX_TEMPLATES:
+                templates.clear()
+            templates[key] = template
+    return template
+
+
+def split_static_text(text, template):
+    """Returns 'text' without its $0 and the position of the $0 in the
+    returned text if the 'template' of 'text' has no tokens besides a $0
+    without placeholder text. The position is the end of the text if there is
+    no $0. Returns None if there are other tokens.
+
+    """
+    # Tokens inside an empty placeholder text can only be its end.
+    *tokens, end_of_text = (token for parent, token in template if parent is None)
+    if not tokens:
+        return text, end_of_text.end
+    if len(tokens) > 1:
+        return None
+    token = tokens[0]
+    if (
+        not isinstance(token, (TabStopToken, MirrorToken))
+        or token.number != 0
+        or token.initial_text
+    ):
+        return None
+    lines = text.split("\n")
+    start = sum(len(line) + 1 for line in lines[: token.start.line]) + token.start.col
+    end = sum(len(line) + 1 for line in lines[: token.end.line]) + token.end.col
+    return text[:start] + text[end:], token.start
+
+
 def tokenize_snippet_text(
     snippet_instance,
     text,
@@ -32,6 +119,7 @@ def tokenize_snippet_text(
     allowed_tokens_in_text,
     allowed_tokens_in_tabstops,
     token_to_textobject,
+    templates=None,
 ):
     """Turns 'text' into a stream of tokens and creates the text objects from
     those tokens that are mentioned in 'token_to_textobject' assuming the
@@ -41,29 +129,39 @@ def tokenize_snippet_text(
     in 'text' while 'allowed_tokens_in_tabstops' are the tokens that
     will be recognized in TabStop placeholder text.
 
+    If 'templates' is a dict, the tokens are kept in it and only the
+    positions of the tokens are computed again the next time the same 'text'
+    is instantiated with the same 'indent'.
+
     """
+    template = get_template(
+        text, indent, allowed_tokens_in_text, allowed_tokens_in_tabstops, templates
+    )
+
     seen_ts = {}
     all_tokens = []
-
-    def _do_parse(parent, text, allowed_tokens):
-        """Recursive function that actually creates the objects."""
-        tokens = list(tokenize(text, indent, parent.start, allowed_tokens))
-        for token in tokens:
-            all_tokens.append((parent, token))
-            if isinstance(token, TabStopToken):
-                ts = TabStop(parent, token)
-                seen_ts[token.number] = ts
-                _do_parse(ts, token.initial_text, allowed_tokens_in_tabstops)
-            else:
-                klass = token_to_textobject.get(token.__class__, None)
-                if klass is not None:
-                    text_object = klass(parent, token)
-
-                    # TabStop has some subclasses (e.g. Choices)
-                    if isinstance(text_object, TabStop):
-                        seen_ts[text_object.number] = text_object
-
-    _do_parse(snippet_instance, text, allowed_tokens_in_text)
+    text_objects = []
+    offset = snippet_instance.start
+    for parent_idx, template_token in template:
+        # Text objects take ownership of the positions of their token.
+        token = copy.copy(template_token)
+        token.start = _moved(template_token.start, offset)
+        token.end = _moved(template_token.end, offset)
+        parent = snippet_instance if parent_idx is None else text_objects[parent_idx]
+        all_tokens.append((parent, token))
+        text_object = None
+        if isinstance(token, TabStopToken):
+            text_object = TabStop(parent, token)
+            seen_ts[token.number] = text_object
+        else:
+            klass = token_to_textobject.get(token.__class__, None)
+            if klass is not None:
+                text_object = klass(parent, token)
+
+                # TabStop has some subclasses (e.g. Choices)
+                if isinstance(text_object, TabStop):
+                    seen_ts[text_object.number] = text_object
+        text_objects.append(text_object)
     return all_tokens, seen_ts
 
 
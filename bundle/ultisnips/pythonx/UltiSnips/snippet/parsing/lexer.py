@@ -4,7 +4,7 @@
 """Not really a lexer in the classical sense, but code to convert snippet
 definitions into logical units called Tokens."""
 
-import string
+from functools import lru_cache
 import re
 
 from UltiSnips.error import PebkacError
@@ -32,7 +32,7 @@ class _TextIterator:
             raise StopIteration
 
         rv = self._text[self._idx]
-        if self._text[self._idx] in ("\n", "\r\n"):
+        if rv == "\n":
             self._line += 1
             self._col = 0
         else:
@@ -49,20 +49,46 @@ class _TextIterator:
         except IndexError:
             return None
 
+    def advance_to(self, idx):
+        """Consumes the text up to the index 'idx', or all of it if 'idx' is
+        None, and returns it."""
+        rv = self._text[self._idx : idx]
+        newlines = rv.count("\n")
+        if newlines:
+            self._line += newlines
+            self._col = len(rv) - rv.rfind("\n") - 1
+        else:
+            self._col += len(rv)
+        self._idx += len(rv)
+        return rv
+
+    def search(self, regex):
+        """Returns the next match of the compiled 'regex' in the remaining
+        text or None."""
+        return regex.search(self._text, self._idx)
+
     @property
     def pos(self):
         """Current position in the text."""
         return Position(self._line, self._col)
 
 
+_NUMBER = re.compile(r"[0-9]*")
+_BRACES = re.compile(r"\\[\\{}]|([{}])")
+
+
+@lru_cache(maxsize=None)
+def _unescaped_chars(chars):
+    """Matches an escaped or an unescaped char of 'chars'. Only the latter has
+    a group."""
+    chars = re.escape(chars)
+    return re.compile(r"\\[%s]|([%s])" % (chars, chars))
+
+
 def _parse_number(stream):
     """Expects the stream to contain a number next, returns the number without
     consuming any more bytes."""
-    rv = ""
-    while stream.peek() and stream.peek() in string.digits:
-        rv += next(stream)
-
-    return int(rv)
+    return int(stream.advance_to(stream.search(_NUMBER).end()))
 
 
 def _parse_till_closing_brace(stream):
@@ -72,21 +98,20 @@ def _parse_till_closing_brace(stream):
 
     Will also consume the closing }, but not return it
     """
-    rv = ""
     in_braces = 1
-    while True:
-        if EscapeCharToken.starts_here(stream, "\\{}"):
-            rv += next(stream) + next(stream)
-        else:
-            char = next(stream)
-            if char == "{":
-                in_braces += 1
-            elif char == "}":
-                in_braces -= 1
+    match = stream.search(_BRACES)
+    while match is not None:
+        if match.group(1) == "{":
+            in_braces += 1
+        elif match.group(1) == "}":
+            in_braces -= 1
             if in_braces == 0:
-                break
-            rv += char
-    return rv
+                rv = stream.advance_to(match.start())
+                next(stream)
+                return rv
+        match = _BRACES.search(match.string, match.end())
+    stream.advance_to(None)
+    raise StopIteration
 
 
 def _parse_till_unescaped_char(stream, chars):
@@ -96,24 +121,24 @@ def _parse_till_unescaped_char(stream, chars):
     Will also consume the closing char, but and return it as second
     return value
     """
-    rv = ""
-    while True:
-        escaped = False
-        for char in chars:
-            if EscapeCharToken.starts_here(stream, char):
-                rv += next(stream) + next(stream)
-                escaped = True
-        if not escaped:
-            char = next(stream)
-            if char in chars:
-                break
-            rv += char
-    return rv, char
+    regex = _unescaped_chars(chars)
+    match = stream.search(regex)
+    while match is not None and match.group(1) is None:
+        match = regex.search(match.string, match.end())
+    if match is None:
+        stream.advance_to(None)
+        raise StopIteration
+    rv = stream.advance_to(match.start())
+    return rv, next(stream)
 
 
 class Token:
     """Represents a Token as parsed from a snippet definition."""
 
+    # A regular expression without groups that matches where a token of this
+    # type starts.
+    START = None
+
     def __init__(self, gen, indent):
         self.initial_text = ""
         self.start = gen.pos
@@ -128,13 +153,7 @@ class Token:
 class TabStopToken(Token):
     """${1:blub}"""
 
-    CHECK = re.compile(r"^\${\d+[:}]")
-
-    @classmethod
-    def starts_here(cls, stream):
-        """Returns true if this token starts at the current position in
-        'stream'."""
-        return cls.CHECK.match(stream.peek(10)) is not None
+    START = r"\$\{\d{1,7}[:}]"
 
     def _parse(self, stream, indent):
         next(stream)  # $
@@ -158,13 +177,7 @@ class TabStopToken(Token):
 class VisualToken(Token):
     """${VISUAL}"""
 
-    CHECK = re.compile(r"^\${VISUAL[:}/]")
-
-    @classmethod
-    def starts_here(cls, stream):
-        """Returns true if this token starts at the current position in
-        'stream'."""
-        return cls.CHECK.match(stream.peek(10)) is not None
+    START = r"\$\{VISUAL[:}/]"
 
     def _parse(self, stream, indent):
         for _ in range(8):  # ${VISUAL
@@ -196,13 +209,7 @@ class VisualToken(Token):
 class TransformationToken(Token):
     """${1/match/replace/options}"""
 
-    CHECK = re.compile(r"^\${\d+\/")
-
-    @classmethod
-    def starts_here(cls, stream):
-        """Returns true if this token starts at the current position in
-        'stream'."""
-        return cls.CHECK.match(stream.peek(10)) is not None
+    START = r"\$\{\d{1,7}/"
 
     def _parse(self, stream, indent):
         next(stream)  # $
@@ -229,13 +236,7 @@ class TransformationToken(Token):
 class MirrorToken(Token):
     """$1."""
 
-    CHECK = re.compile(r"^\$\d+")
-
-    @classmethod
-    def starts_here(cls, stream):
-        """Returns true if this token starts at the current position in
-        'stream'."""
-        return cls.CHECK.match(stream.peek(10)) is not None
+    START = r"\$\d"
 
     def _parse(self, stream, indent):
         next(stream)  # $
@@ -251,13 +252,7 @@ class ChoicesToken(Token):
          so its content will not be parsed recursively.
     """
 
-    CHECK = re.compile(r"^\${\d+\|")
-
-    @classmethod
-    def starts_here(cls, stream):
-        """Returns true if this token starts at the current position in
-        'stream'."""
-        return cls.CHECK.match(stream.peek(10)) is not None
+    START = r"\$\{\d{1,7}\|"
 
     def _parse(self, stream, indent):
         next(stream)  # $
@@ -311,13 +306,7 @@ class ChoicesToken(Token):
 class EscapeCharToken(Token):
     """\\n."""
 
-    @classmethod
-    def starts_here(cls, stream, chars=r"{}\$`"):
-        """Returns true if this token starts at the current position in
-        'stream'."""
-        cs = stream.peek(2)
-        if len(cs) == 2 and cs[0] == "\\" and cs[1] in chars:
-            return True
+    START = r"\\[{}\\$`]"
 
     def _parse(self, stream, indent):
         next(stream)  # \
@@ -330,11 +319,7 @@ class EscapeCharToken(Token):
 class ShellCodeToken(Token):
     """`echo "hi"`"""
 
-    @classmethod
-    def starts_here(cls, stream):
-        """Returns true if this token starts at the current position in
-        'stream'."""
-        return stream.peek(1) == "`"
+    START = r"`"
 
     def _parse(self, stream, indent):
         next(stream)  # `
@@ -347,13 +332,7 @@ class ShellCodeToken(Token):
 class PythonCodeToken(Token):
     """`!p snip.rv = "Hi"`"""
 
-    CHECK = re.compile(r"^`!p\s")
-
-    @classmethod
-    def starts_here(cls, stream):
-        """Returns true if this token starts at the current position in
-        'stream'."""
-        return cls.CHECK.match(stream.peek(4)) is not None
+    START = r"`!p\s"
 
     def _parse(self, stream, indent):
         for _ in range(3):
@@ -379,13 +358,7 @@ class PythonCodeToken(Token):
 class VimLCodeToken(Token):
     """`!v g:hi`"""
 
-    CHECK = re.compile(r"^`!v\s")
-
-    @classmethod
-    def starts_here(cls, stream):
-        """Returns true if this token starts at the current position in
-        'stream'."""
-        return cls.CHECK.match(stream.peek(4)) is not None
+    START = r"`!v\s"
 
     def _parse(self, stream, indent):
         for _ in range(4):
@@ -403,20 +376,29 @@ class EndOfTextToken(Token):
         return "EndOfText(%r)" % self.end
 
 
+@lru_cache(maxsize=None)
+def _token_starts(allowed_tokens):
+    """Matches the start of any of 'allowed_tokens'. The number of the group
+    that matched is one more than the index of the token in 'allowed_tokens'.
+    If several tokens start at the same place, the first one wins."""
+    return re.compile("|".join("(%s)" % token.START for token in allowed_tokens))
+
+
 def tokenize(text, indent, offset, allowed_tokens):
     """Returns an iterator of tokens of 'text'['offset':] which is assumed to
     have 'indent' as the whitespace of the begging of the lines. Only
     'allowed_tokens' are considered to be valid tokens."""
+    allowed_tokens = tuple(allowed_tokens)
+    token_starts = _token_starts(allowed_tokens)
     stream = _TextIterator(text, offset)
     try:
         while True:
-            done_something = False
-            for token in allowed_tokens:
-                if token.starts_here(stream):
-                    yield token(stream, indent)
-                    done_something = True
-                    break
-            if not done_something:
-                next(stream)
+            match = stream.search(token_starts)
+            if match is None:
+                stream.advance_to(None)
+                break
+            stream.advance_to(match.start())
+            yield allowed_tokens[match.lastindex - 1](stream, indent)
     except StopIteration:
-        yield EndOfTextToken(stream, indent)
+        pass
+    yield EndOfTextToken(stream, indent)
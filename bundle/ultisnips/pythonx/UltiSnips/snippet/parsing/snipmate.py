@@ -39,12 +39,13 @@ __ALLOWED_TOKENS_IN_TABSTOPS = [
 ]
 
 
-def parse_and_instantiate(parent_to, text, indent):
+def parse_and_instantiate(parent_to, text, indent, templates=None):
     """Parses a snippet definition in snipMate format from 'text' assuming the
     current 'indent'.
 
     Will instantiate all the objects and link them as children to
-    parent_to. Will also put the initial text into Vim.
+    parent_to. Will also put the initial text into Vim. 'templates' is
+    passed on to tokenize_snippet_text().
 
     """
     all_tokens, seen_ts = tokenize_snippet_text(
@@ -54,6 +55,7 @@ def parse_and_instantiate(parent_to, text, indent):
         __ALLOWED_TOKENS,
         __ALLOWED_TOKENS_IN_TABSTOPS,
         _TOKEN_TO_TEXTOBJECT,
+        templates,
     )
     resolve_ambiguity(all_tokens, seen_ts)
     finalize(all_tokens, seen_ts, parent_to)
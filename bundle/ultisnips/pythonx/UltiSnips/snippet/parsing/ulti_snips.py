@@ -4,6 +4,8 @@
 """Parses a UltiSnips snippet definition and launches it into Vim."""
 
 from UltiSnips.snippet.parsing.base import (
+    get_template,
+    split_static_text,
     tokenize_snippet_text,
     finalize,
     resolve_ambiguity,
@@ -66,12 +68,13 @@ def _create_transformations(all_tokens, seen_ts):
             Transformation(parent, seen_ts[token.number], token)
 
 
-def parse_and_instantiate(parent_to, text, indent):
+def parse_and_instantiate(parent_to, text, indent, templates=None):
     """Parses a snippet definition in UltiSnips format from 'text' assuming the
     current 'indent'.
 
     Will instantiate all the objects and link them as children to
-    parent_to. Will also put the initial text into Vim.
+    parent_to. Will also put the initial text into Vim. 'templates' is
+    passed on to tokenize_snippet_text().
 
     """
     all_tokens, seen_ts = tokenize_snippet_text(
@@ -81,7 +84,19 @@ def parse_and_instantiate(parent_to, text, indent):
         __ALLOWED_TOKENS,
         __ALLOWED_TOKENS,
         _TOKEN_TO_TEXTOBJECT,
+        templates,
     )
     resolve_ambiguity(all_tokens, seen_ts)
     _create_transformations(all_tokens, seen_ts)
     finalize(all_tokens, seen_ts, parent_to)
+
+
+def parse_static_text(text, indent, templates=None):
+    """Returns 'text' without its $0 and the position of the $0 if 'text' is a
+    snippet definition in UltiSnips format without any tabstops, code or
+    escaped characters besides a $0 without placeholder text. Returns None
+    otherwise. 'templates' is passed on to get_template().
+
+    """
+    template = get_template(text, indent, __ALLOWED_TOKENS, __ALLOWED_TOKENS, templates)
+    return split_static_text(text, template)
@@ -5,11 +5,27 @@
 
 from collections import defaultdict
 
-from UltiSnips.snippet.source.snippet_dictionary import SnippetDictionary
+from UltiSnips.snippet.source.snippet_dictionary import (  # pylint:disable=unused-import
+    SnippetDictionary,
+    bump_snippet_generation,
+    snippet_generation,
+)
 
 
 class SnippetSource:
-    """See module docstring."""
+    """See module docstring.
+
+    Creating a SnippetDictionary, adding snippets to it, clearing snippets
+    and update_extends() change the snippet generation. Subclasses that
+    change their snippets in another way, like dropping the dictionary of a
+    filetype in refresh(), must call bump_snippet_generation().
+    """
+
+    # Subclasses that override get_snippets(), get_snippet_dictionaries(),
+    # get_clear_priority() or get_cleared() are asked on every lookup, unless
+    # they set this to True to promise that their answers only change along
+    # with the snippet generation.
+    reports_changes = False
 
     def __init__(self):
         self._snippets = defaultdict(SnippetDictionary)
@@ -40,8 +56,7 @@ class SnippetSource:
 
         """
         result = []
-        for ft in self._get_existing_deep_extends(filetypes):
-            snips = self._snippets[ft]
+        for snips in self.get_snippet_dictionaries(filetypes):
             result.extend(
                 snips.get_matching_snippets(
                     before, possible, autotrigger_only, visual_content
@@ -49,6 +64,11 @@ class SnippetSource:
             )
         return result
 
+    def get_snippet_dictionaries(self, filetypes):
+        """Returns the SnippetDictionary s that get_snippets() looks into for
+        'filetypes'."""
+        return [self._snippets[ft] for ft in self._get_existing_deep_extends(filetypes)]
+
     def get_clear_priority(self, filetypes):
         """Get maximum clearsnippets priority without arguments for specified
         filetypes, if any.
@@ -78,6 +98,7 @@ class SnippetSource:
         """Update the extending relation by given child filetype and its parent
         filetypes."""
         self._extends[child_ft].update(parent_fts)
+        bump_snippet_generation()
 
     def get_deep_extends(self, base_filetypes):
         """Get a list of filetypes that is either directed or indirected
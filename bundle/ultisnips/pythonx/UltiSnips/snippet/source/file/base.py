@@ -3,13 +3,15 @@
 
 """Code to provide access to UltiSnips files from disk."""
 
-from collections import defaultdict
+from collections import defaultdict, deque
 import os
 
 from UltiSnips import compatibility
 from UltiSnips import vim_helper
 from UltiSnips.error import PebkacError
-from UltiSnips.snippet.source.base import SnippetSource
+from UltiSnips.snippet.source.base import SnippetSource, bump_snippet_generation
+from UltiSnips.snippet.source.file.watcher import SnippetFileWatcher
+from UltiSnips.snippet.source.snippet_dictionary import SnippetDictionary
 
 
 class SnippetSyntaxError(PebkacError):
@@ -19,19 +21,119 @@ class SnippetSyntaxError(PebkacError):
         RuntimeError.__init__(self, "%s in %s:%d" % (msg, filename, line_index))
 
 
+def _stat_signature(filename):
+    """Returns a cheap signature that changes whenever 'filename' is modified,
+    or None if the file can not be accessed."""
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    return (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+
+_SNIPPET_FILE_WATCHER = None
+
+
+def snippet_file_watcher():
+    """Returns the SnippetFileWatcher shared by all file sources or None if
+    watching is disabled through g:UltiSnipsWatchSnippetFiles."""
+    global _SNIPPET_FILE_WATCHER  # pylint:disable=global-statement
+    if _SNIPPET_FILE_WATCHER is None:
+        enabled = (
+            vim_helper.eval("exists('g:UltiSnipsWatchSnippetFiles')") == "1"
+            and vim_helper.eval("g:UltiSnipsWatchSnippetFiles") == "1"
+        )
+        _SNIPPET_FILE_WATCHER = SnippetFileWatcher() if enabled else False
+    return _SNIPPET_FILE_WATCHER or None
+
+
 class SnippetFileSource(SnippetSource):
-    """Base class that abstracts away 'extends' info and file hashes."""
+    """Base class that abstracts away 'extends' info and file hashes.
+
+    For each filetype we remember the files its snippets came from together
+    with their stat signature and the events parsed from them. A refresh only
+    marks the loaded filetypes as stale, the next 'ensure' then reparses just
+    the files that were added or changed and forgets about deleted ones.
+
+    If a SnippetFileWatcher is enabled, it marks filetypes stale as soon as
+    one of their files or directories changes.
+    """
 
     def __init__(self):
         SnippetSource.__init__(self)
+        # ft -> {filename: stat signature}, in load order.
+        self._file_signatures = {}
+        # (ft, filename) -> list of (event, data) parsed from that file.
+        self._file_events = {}
+        self._stale = set()
+        self._watcher = None
+        # Filled by the watcher thread, consumed in ensure().
+        self._changed_paths = deque()
 
     def ensure(self, filetypes):
-        for ft in self.get_deep_extends(filetypes):
+        self._check_watcher()
+        outdated = [
+            ft for ft in self.get_deep_extends(filetypes) if self._needs_update(ft)
+        ]
+        if outdated:
+            self._update_file_index()
+        for ft in outdated:
             if self._needs_update(ft):
                 self._load_snippets_for(ft)
 
     def refresh(self):
-        self.__init__()
+        self._stale.update(self._snippets)
+        bump_snippet_generation()
+
+    def _check_watcher(self):
+        """Marks all filetypes stale that are affected by changes the watcher
+        reported since the last call."""
+        if self._watcher is None:
+            self._watcher = snippet_file_watcher() or False
+            if self._watcher:
+                self._watcher.add_listener(self._on_changed_paths)
+        if not self._watcher:
+            return
+        self._watcher.poll()
+        while self._changed_paths:
+            paths = self._changed_paths.popleft()
+            if paths is None:
+                self.refresh()
+                continue
+            for ft in self._snippets:
+                if any(self._is_affected_by(ft, path) for path in paths):
+                    self._stale.add(ft)
+
+    def _on_changed_paths(self, paths):
+        """Called by the watcher, possibly from its thread."""
+        self._changed_paths.append(paths)
+        bump_snippet_generation()
+
+    def _is_affected_by(self, ft, path):
+        """Returns true if a change of 'path' might change the snippets of
+        'ft'."""
+        if path in self._file_signatures.get(ft, ()):
+            return True
+        name = self._filetype_file_prefix(ft)
+        basename = os.path.basename(path)
+        return (
+            basename.startswith(name + ".")
+            or basename.startswith(name + "_")
+            or name in path.split(os.sep)
+        )
+
+    def _filetype_file_prefix(self, ft):
+        """Returns the name that files for 'ft' are prefixed with."""
+        return ft
+
+    def _directories_to_watch(self, filenames):
+        """Returns the directories that must be watched to notice changes to
+        'filenames' and to new snippet files."""
+        return {os.path.dirname(fn) for fn in filenames}
+
+    def _update_file_index(self):
+        """Called once before snippet files are looked up in 'ensure'.
+        Subclasses can use this to refresh an index of the snippet files."""
 
     def _get_all_snippet_files_for(self, ft):
         """Returns a set of all files that define snippets for 'ft'."""
@@ -41,50 +143,95 @@ class SnippetFileSource(SnippetSource):
         """Parses 'filedata' as a snippet file and yields events."""
         raise NotImplementedError()
 
+    def _snippet_file_events(self, filename):
+        """Reads 'filename' and returns its events. Subclasses can override
+        this to avoid parsing files again."""
+        with open(filename, "r", encoding="utf-8-sig") as to_read:
+            file_data = to_read.read()
+        return self._parse_snippet_file(file_data, filename)
+
     def _needs_update(self, ft):
-        """Returns true if any files for 'ft' have changed and must be
-        reloaded."""
-        return not (ft in self._snippets)
+        """Returns true if 'ft' was never loaded or might have changed files
+        since it was loaded."""
+        return ft not in self._snippets or ft in self._stale
 
     def _load_snippets_for(self, ft):
-        """Load all snippets for the given 'ft'."""
-        assert ft not in self._snippets
-        for fn in self._get_all_snippet_files_for(ft):
-            self._parse_snippets(ft, fn)
+        """Load all snippets for the given 'ft', reusing the events of files
+        that did not change since the last load."""
+        self._stale.discard(ft)
+        old_signatures = self._file_signatures.get(ft, {})
+        filenames = self._get_all_snippet_files_for(ft)
+        # Keep the order of known files stable and append new ones.
+        ordered = [fn for fn in old_signatures if fn in filenames]
+        ordered.extend(fn for fn in filenames if fn not in old_signatures)
+
+        signatures = {}
+        for fn in ordered:
+            signature = _stat_signature(fn)
+            if signature is not None:
+                signatures[fn] = signature
+        self._file_signatures[ft] = signatures
+        if self._watcher:
+            self._watcher.watch(self._directories_to_watch(signatures))
+
+        changed = ft not in self._snippets or len(signatures) != len(old_signatures)
+        for fn in old_signatures:
+            if fn not in signatures:
+                del self._file_events[(ft, fn)]
+        error = None
+        for fn, signature in signatures.items():
+            if old_signatures.get(fn) == signature and (ft, fn) in self._file_events:
+                continue
+            changed = True
+            try:
+                self._parse_snippets(ft, fn)
+            except SnippetSyntaxError as err:
+                # Parse the file again on the next refresh to report it again.
+                signatures[fn] = None
+                if error is None:
+                    error = err
+        if changed:
+            self._rebuild(ft)
+
         # Now load for the parents
         for parent_ft in self.get_deep_extends([ft]):
             if parent_ft != ft and self._needs_update(parent_ft):
                 self._load_snippets_for(parent_ft)
-        # Make sure the dictionary will exist even if no snippets are found;
-        # this ensures each `ft` is scanned only once, preventing expensive
-        # searches down Vim's 'runtimepath'.
-        self._snippets[ft]
+        if error is not None:
+            raise error
+
+    def _rebuild(self, ft):
+        """Recreates the snippets and 'extends' of 'ft' from the events of
+        all of its files."""
+        bump_snippet_generation()
+        snippets = self._snippets[ft] = SnippetDictionary()
+        self._extends[ft] = set()
+        for fn in self._file_signatures[ft]:
+            for event, data in self._file_events[(ft, fn)]:
+                if event == "clearsnippets":
+                    priority, triggers = data
+                    snippets.clear_snippets(priority, triggers)
+                elif event == "extends":
+                    # TODO(sirver): extends information is more global
+                    # than one snippet source.
+                    (filetypes,) = data
+                    self.update_extends(ft, filetypes)
+                elif event == "snippet":
+                    (snippet,) = data
+                    snippets.add_snippet(snippet)
 
     def _parse_snippets(self, ft, filename):
-        """Parse the 'filename' for the given 'ft'."""
-        with open(filename, "r", encoding="utf-8-sig") as to_read:
-            file_data = to_read.read()
-        self._snippets[ft]  # Make sure the dictionary exists
-        for event, data in self._parse_snippet_file(file_data, filename):
+        """Parse the 'filename' for the given 'ft' and remember its events.
+        If the file has an error, the events before it are kept."""
+        events = self._file_events[(ft, filename)] = []
+        for event, data in self._snippet_file_events(filename):
             if event == "error":
                 msg, line_index = data
                 filename = vim_helper.eval(
                     """fnamemodify(%s, ":~:.")""" % vim_helper.escape(filename)
                 )
                 raise SnippetSyntaxError(filename, line_index, msg)
-            elif event == "clearsnippets":
-                priority, triggers = data
-                self._snippets[ft].clear_snippets(priority, triggers)
-            elif event == "extends":
-                # TODO(sirver): extends information is more global
-                # than one snippet source.
-                (filetypes,) = data
-                self.update_extends(ft, filetypes)
-            elif event == "snippet":
-                (snippet,) = data
-                self._snippets[ft].add_snippet(snippet)
+            elif event in ("clearsnippets", "extends", "snippet"):
+                events.append((event, data))
             else:
                 assert False, "Unhandled %s: %r" % (event, data)
-        # precompile global snippets code for all snipepts we just sourced
-        for snippet in self._snippets[ft]:
-            snippet._precompile_globals()
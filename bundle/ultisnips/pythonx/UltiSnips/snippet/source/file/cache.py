@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+"""Persistent on-disk cache of the events parsed from snippet files.
+
+Each snippet file gets one JSON entry in the cache directory. An entry is only
+used if the path, size, mtime and content hash of the file still match,
+everything else is treated as a miss and the entry is dropped.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+# Bump this whenever the format of the cached events changes.
+CACHE_VERSION = 1
+
+
+class SnippetFileCache:
+    """See module docstring."""
+
+    def __init__(self, directory):
+        self._directory = directory
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def directory(self):
+        """The directory the entries are stored in."""
+        return self._directory
+
+    @property
+    def hit_rate(self):
+        """Fraction of lookups that could be served from the cache."""
+        total = self.hits + self.misses
+        if not total:
+            return 0.0
+        return self.hits / total
+
+    def __repr__(self):
+        return "SnippetFileCache(%r, hits=%i, misses=%i, hit_rate=%.2f)" % (
+            self._directory,
+            self.hits,
+            self.misses,
+            self.hit_rate,
+        )
+
+    def events_for(self, filename, parse):
+        """Returns the list of events for the snippet file 'filename'.
+
+        If the cache has no valid entry, 'parse(file_data, filename)' is
+        called to produce the events, which are then stored unless they
+        contain an error.
+        """
+        with open(filename, "rb") as to_read:
+            stat = os.fstat(to_read.fileno())
+            raw_data = to_read.read()
+        key = {
+            "path": filename,
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "hash": hashlib.sha1(raw_data).hexdigest(),
+        }
+
+        events = self._load(key)
+        if events is not None:
+            self.hits += 1
+            return events
+        self.misses += 1
+
+        events = list(parse(raw_data.decode("utf-8-sig"), filename))
+        if not any(event == "error" for event, _ in events):
+            self._store(key, events)
+        return events
+
+    def _entry_path(self, filename):
+        name = hashlib.sha1(filename.encode("utf-8", "surrogateescape")).hexdigest()
+        return os.path.join(self._directory, name + ".json")
+
+    def _load(self, key):
+        entry_path = self._entry_path(key["path"])
+        try:
+            with open(entry_path, "r", encoding="utf-8") as to_read:
+                entry = json.load(to_read)
+            if entry["version"] == CACHE_VERSION and all(
+                entry[name] == value for name, value in key.items()
+            ):
+                return [(event, data) for event, data in entry["events"]]
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        # Stale or corrupt, we will write a fresh one after parsing.
+        try:
+            os.remove(entry_path)
+        except OSError:
+            pass
+        return None
+
+    def _store(self, key, events):
+        entry = dict(key, version=CACHE_VERSION, events=events)
+        tmp_path = None
+        try:
+            os.makedirs(self._directory, exist_ok=True)
+            handle, tmp_path = tempfile.mkstemp(dir=self._directory, suffix=".tmp")
+            with os.fdopen(handle, "w", encoding="utf-8") as to_write:
+                json.dump(entry, to_write)
+            os.replace(tmp_path, self._entry_path(key["path"]))
+        except (OSError, TypeError, ValueError):
+            # The cache is an optimization only, never fail because of it.
+            if tmp_path is not None:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+"""Index of the snippet files in a list of directories.
+
+Looking up the files for a filetype by globbing every snippet directory is
+expensive with a long runtimepath. The index scans each directory once and
+maps filetypes to the files found in it. The directory list is only computed
+again when the settings it depends on change, and a directory is only scanned
+again when its modification time or the one of a subdirectory that was part
+of the scan changes.
+"""
+
+from collections import defaultdict
+import os
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _mtimes(paths):
+    return tuple(_mtime(path) for path in paths)
+
+
+class SnippetFileIndex:
+    """See module docstring.
+
+    'scan(directory)' must return a dict mapping filetypes to sets of files
+    and a list of the subdirectories that were looked into.
+    """
+
+    def __init__(self, scan):
+        self._scan = scan
+        self._key = None
+        self._directories = []
+        self._scanned = {}  # directory -> (signature, files, subdirectories)
+        self._files = None
+        self.scans = 0
+
+    @property
+    def directories(self):
+        """The directories of the index, in order."""
+        return list(self._directories)
+
+    def update(self, key, get_directories):
+        """Brings the index up to date. 'get_directories()' is only called
+        when 'key' differs from the last call. If it raises, it is called
+        again next time."""
+        if key != self._key:
+            self._directories = list(get_directories())
+            self._key = key
+            self._scanned = {
+                d: v for d, v in self._scanned.items() if d in self._directories
+            }
+            self._files = None
+        for directory in self._directories:
+            scanned = self._scanned.get(directory)
+            if scanned is not None and scanned[0] == _mtimes([directory] + scanned[2]):
+                continue
+            # Take the mtime before scanning, so that changes during the scan
+            # are picked up next time.
+            mtime = _mtime(directory)
+            files, subdirectories = self._scan(directory)
+            self.scans += 1
+            signature = (mtime,) + _mtimes(subdirectories)
+            self._scanned[directory] = (signature, files, subdirectories)
+            self._files = None
+
+    def files_for(self, ft):
+        """Returns the set of all files for 'ft'."""
+        if self._files is None:
+            self._files = defaultdict(set)
+            for directory in self._directories:
+                for name, files in self._scanned[directory][1].items():
+                    self._files[name].update(files)
+        return set(self._files.get(ft, ()))
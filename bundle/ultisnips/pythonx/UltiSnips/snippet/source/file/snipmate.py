@@ -3,13 +3,16 @@
 
 """Parses snipMate files."""
 
+from collections import defaultdict
 import os
 import glob
+import re
 
 from UltiSnips import vim_helper
 from UltiSnips.snippet.definition import SnipMateSnippetDefinition
 from UltiSnips.snippet.source.file.base import SnippetFileSource
 from UltiSnips.snippet.source.file.common import handle_extends, normalize_file_path
+from UltiSnips.snippet.source.file.index import SnippetFileIndex
 from UltiSnips.text import LineIterator, head_tail
 
 
@@ -32,23 +35,65 @@ def _splitall(path):
     return allparts
 
 
+def _snipmate_directories():
+    """Returns the snipMate 'snippets' directories in the runtimepath. Paths
+    with wildcards are expanded to the existing matches, all others are
+    returned no matter if they exist or not."""
+    directories = []
+    for rtp in vim_helper.eval("&runtimepath").split(","):
+        path = normalize_file_path(os.path.expanduser(os.path.join(rtp, "snippets")))
+        # Runtimepath entries may contain wildcards.
+        if glob.has_magic(path):
+            directories.extend(glob.glob(path))
+        else:
+            directories.append(path)
+    return directories
+
+
+def _visible_entries(directory):
+    try:
+        return [e for e in os.scandir(directory) if not e.name.startswith(".")]
+    except OSError:
+        return []
+
+
+def _scan_snipmate_directory(directory):
+    """Returns the files in 'directory' by filetype as needed by
+    SnippetFileIndex. These are 'ft.snippets', 'ft/*.snippets',
+    'ft/*.snippet' and 'ft/*/*.snippet'."""
+    files = defaultdict(set)
+    subdirectories = []
+    for entry in _visible_entries(directory):
+        if entry.name.endswith(".snippets"):
+            files[entry.name[: -len(".snippets")]].add(entry.path)
+        if not entry.is_dir():
+            continue
+        subdirectories.append(entry.path)
+        for sub_entry in _visible_entries(entry.path):
+            if sub_entry.name.endswith((".snippets", ".snippet")):
+                files[entry.name].add(sub_entry.path)
+            if sub_entry.is_dir():
+                subdirectories.append(sub_entry.path)
+                files[entry.name].update(
+                    e.path
+                    for e in _visible_entries(sub_entry.path)
+                    if e.name.endswith(".snippet")
+                )
+    return files, subdirectories
+
+
+_SNIPMATE_FILE_INDEX = SnippetFileIndex(_scan_snipmate_directory)
+
+
+def _update_snipmate_file_index():
+    _SNIPMATE_FILE_INDEX.update(vim_helper.eval("&runtimepath"), _snipmate_directories)
+
+
 def _snipmate_files_for(ft):
     """Returns all snipMate files we need to look at for 'ft'."""
     if ft == "all":
         ft = "_"
-    patterns = [
-        "%s.snippets" % ft,
-        os.path.join(ft, "*.snippets"),
-        os.path.join(ft, "*.snippet"),
-        os.path.join(ft, "*/*.snippet"),
-    ]
-    ret = set()
-    for rtp in vim_helper.eval("&runtimepath").split(","):
-        path = normalize_file_path(os.path.expanduser(os.path.join(rtp, "snippets")))
-        for pattern in patterns:
-            for fn in glob.glob(os.path.join(path, pattern)):
-                ret.add(fn)
-    return ret
+    return _SNIPMATE_FILE_INDEX.files_for(ft)
 
 
 def _parse_snippet_file(content, full_filename):
@@ -69,21 +114,19 @@ def _parse_snippet_file(content, full_filename):
     )
 
 
+# The body of a snippet ends at the first line that is not blank and does not
+# start with a tab.
+_SNIPPET_END = re.compile(r"\n(?!\t)[^\S\n]*\S")
+
+
 def _parse_snippet(line, lines, filename):
     """Parse a snippet definition."""
     start_line_index = lines.line_index
     trigger, description = head_tail(line[len("snippet") :].lstrip())
-    content = ""
-    while True:
-        next_line = lines.peek()
-        if next_line is None:
-            break
-        if next_line.strip() and not next_line.startswith("\t"):
-            break
-        line = next(lines)
-        if line[0] == "\t":
-            line = line[1:]
-        content += line
+    block, _ = lines.read_until(_SNIPPET_END)
+    content = "".join(
+        line[1:] if line[0] == "\t" else line for line in block.splitlines(True)
+    )
     content = content[:-1]  # Chomp the last newline
     return (
         "snippet",
@@ -120,9 +163,22 @@ def _parse_snippets_file(data, filename):
 class SnipMateFileSource(SnippetFileSource):
     """Manages all snipMate snippet definitions found in rtp."""
 
+    def _update_file_index(self):
+        _update_snipmate_file_index()
+
     def _get_all_snippet_files_for(self, ft):
         return _snipmate_files_for(ft)
 
+    def _filetype_file_prefix(self, ft):
+        return "_" if ft == "all" else ft
+
+    def _directories_to_watch(self, filenames):
+        directories = SnippetFileSource._directories_to_watch(self, filenames)
+        directories.update(
+            d for d in _SNIPMATE_FILE_INDEX.directories if os.path.isdir(d)
+        )
+        return directories
+
     def _parse_snippet_file(self, filedata, filename):
         if filename.lower().endswith("snippet"):
             for event, data in _parse_snippet_file(filedata, filename):
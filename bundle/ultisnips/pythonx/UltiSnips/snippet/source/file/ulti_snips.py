@@ -6,12 +6,15 @@
 from collections import defaultdict
 import glob
 import os
+import re
 from typing import Set, List
 
 from UltiSnips import vim_helper
 from UltiSnips.error import PebkacError
 from UltiSnips.snippet.definition import UltiSnipsSnippetDefinition
 from UltiSnips.snippet.source.file.base import SnippetFileSource
+from UltiSnips.snippet.source.file.cache import SnippetFileCache
+from UltiSnips.snippet.source.file.index import SnippetFileIndex
 from UltiSnips.snippet.source.file.common import (
     handle_action,
     handle_context,
@@ -32,15 +35,19 @@ def find_snippet_files(ft, directory: str) -> Set[str]:
     return ret
 
 
-def find_all_snippet_directories() -> List[str]:
-    """Returns a list of the absolute path of all potential snippet
-    directories, no matter if they exist or not."""
-
+def _snippet_directories_settings():
+    """Returns the UltiSnipsSnippetDirectories in effect and &runtimepath."""
     if vim_helper.eval("exists('b:UltiSnipsSnippetDirectories')") == "1":
         snippet_dirs = vim_helper.eval("b:UltiSnipsSnippetDirectories")
     else:
         snippet_dirs = vim_helper.eval("g:UltiSnipsSnippetDirectories")
+    return snippet_dirs, vim_helper.eval("&runtimepath")
+
 
+def _potential_snippet_directories(snippet_dirs, runtimepath) -> List[str]:
+    """Returns the absolute path of all potential snippet directories. Paths
+    with wildcards are expanded to the existing matches, all others are
+    returned no matter if they exist or not."""
     if len(snippet_dirs) == 1:
         # To reduce confusion and increase consistency with
         # `UltiSnipsSnippetsDir`, we expand ~ here too.
@@ -49,8 +56,7 @@ def find_all_snippet_directories() -> List[str]:
             return [full_path]
 
     all_dirs = []
-    check_dirs = vim_helper.eval("&runtimepath").split(",")
-    for rtp in check_dirs:
+    for rtp in runtimepath.split(","):
         for snippet_dir in snippet_dirs:
             if snippet_dir == "snippets":
                 raise PebkacError(
@@ -62,27 +68,83 @@ def find_all_snippet_directories() -> List[str]:
                 os.path.expanduser(os.path.join(rtp, snippet_dir))
             )
             # Runtimepath entries may contain wildcards.
-            all_dirs.extend(glob.glob(pth))
+            if glob.has_magic(pth):
+                all_dirs.extend(glob.glob(pth))
+            else:
+                all_dirs.append(pth)
     return all_dirs
 
 
+def find_all_snippet_directories() -> List[str]:
+    """Returns a list of the absolute path of all potential snippet
+    directories, no matter if they exist or not."""
+    snippet_dirs, runtimepath = _snippet_directories_settings()
+    all_dirs = _potential_snippet_directories(snippet_dirs, runtimepath)
+    if len(snippet_dirs) == 1 and os.path.isabs(os.path.expanduser(snippet_dirs[0])):
+        return all_dirs
+    return [d for d in all_dirs if os.path.lexists(d)]
+
+
+def _scan_snippet_directory(directory):
+    """Returns the files in 'directory' by filetype as needed by
+    SnippetFileIndex. This is the equivalent of globbing for the patterns of
+    find_snippet_files() for every filetype at once."""
+    files = defaultdict(set)
+    subdirectories = []
+    try:
+        entries = list(os.scandir(directory))
+    except OSError:
+        return files, subdirectories
+    for entry in entries:
+        if entry.name.startswith("."):
+            continue
+        path = os.path.join(directory, entry.name)
+        if entry.name.endswith(".snippets"):
+            # 'ft.snippets' and 'ft_*.snippets'.
+            stem = entry.name[: -len(".snippets")]
+            files[stem].add(path)
+            for index, char in enumerate(stem):
+                if char == "_":
+                    files[stem[:index]].add(path)
+        if entry.is_dir():
+            # 'ft/*'
+            subdirectories.append(path)
+            try:
+                names = os.listdir(path)
+            except OSError:
+                continue
+            files[entry.name].update(
+                os.path.join(path, name) for name in names if not name.startswith(".")
+            )
+    return files, subdirectories
+
+
+_SNIPPET_FILE_INDEX = SnippetFileIndex(_scan_snippet_directory)
+
+
+def update_snippet_file_index():
+    """Brings the index used by find_all_snippet_files() up to date."""
+    settings = _snippet_directories_settings()
+    key = (tuple(settings[0]), settings[1])
+    _SNIPPET_FILE_INDEX.update(key, lambda: _potential_snippet_directories(*settings))
+
+
 def find_all_snippet_files(ft) -> Set[str]:
     """Returns all snippet files matching 'ft' in the given runtime path
     directory."""
-    patterns = ["%s.snippets", "%s_*.snippets", os.path.join("%s", "*")]
-    ret = set()
-    for directory in find_all_snippet_directories():
-        if not os.path.isdir(directory):
-            continue
-        for pattern in patterns:
-            for fn in glob.glob(os.path.join(directory, pattern % ft)):
-                ret.add(fn)
-    return ret
+    update_snippet_file_index()
+    return _SNIPPET_FILE_INDEX.files_for(ft)
+
+
+# Match the line ending a snippet or global block, i.e. "endsnippet" or
+# "endglobal" followed only by whitespace.
+_END_PATTERNS = {
+    snip: re.compile(r"\nend%s[^\S\n]*$" % snip, re.MULTILINE)
+    for snip in ("snippet", "global")
+}
 
 
-def _handle_snippet_or_global(
-    filename, line, lines, python_globals, priority, pre_expand, context
-):
+def _handle_snippet_or_global(filename, line, lines, priority, pre_expand, context):
     """Parses the snippet that begins at the current line."""
     start_line_index = lines.line_index
     descr = ""
@@ -119,35 +181,25 @@ def _handle_snippet_or_global(
         if trig[0] != trig[-1]:
             return "error", ("Invalid multiword trigger: '%s'" % trig, lines.line_index)
         trig = trig[1:-1]
-    end = "end" + snip
-    content = ""
-
-    found_end = False
-    for line in lines:
-        if line.rstrip() == end:
-            content = content[:-1]  # Chomp the last newline
-            found_end = True
-            break
-        content += line
-
+    content, found_end = lines.read_until(_END_PATTERNS[snip])
     if not found_end:
         return "error", ("Missing 'endsnippet' for %r" % trig, lines.line_index)
+    next(lines)  # Consume the end line.
+    content = content[:-1]  # Chomp the last newline
 
     if snip == "global":
-        python_globals[trig].append(content)
+        return "global", (trig, content)
     elif snip == "snippet":
-        definition = UltiSnipsSnippetDefinition(
+        return "snippet", (
             priority,
             trig,
             content,
             descr,
             opts,
-            python_globals,
-            "%s:%i" % (filename, start_line_index),
+            start_line_index,
             context,
             pre_expand,
         )
-        return "snippet", (definition,)
     else:
         return "error", ("Invalid snippet type: '%s'" % snip, lines.line_index)
 
@@ -155,11 +207,11 @@ def _handle_snippet_or_global(
 def _parse_snippets_file(data, filename):
     """Parse 'data' assuming it is a snippet file.
 
-    Yields events in the file.
+    Yields events in the file. Snippets and globals are yielded as plain data,
+    see _create_snippets() for turning them into snippet definitions.
 
     """
 
-    python_globals = defaultdict(list)
     lines = LineIterator(data)
     current_priority = 0
     actions = {}
@@ -174,7 +226,6 @@ def _parse_snippets_file(data, filename):
                 filename,
                 line,
                 lines,
-                python_globals,
                 current_priority,
                 actions,
                 context,
@@ -210,12 +261,76 @@ def _parse_snippets_file(data, filename):
             yield "error", ("Invalid line %r" % line.rstrip(), lines.line_index)
 
 
+def _create_snippets(events, filename):
+    """Turns the 'events' of _parse_snippets_file() into the events expected by
+    SnippetFileSource, i.e. creates the snippet definitions."""
+    python_globals = defaultdict(list)
+    for event, data in events:
+        if event == "global":
+            trig, content = data
+            python_globals[trig].append(content)
+        elif event == "snippet":
+            priority, trig, content, descr, opts, line_index, context, actions = data
+            definition = UltiSnipsSnippetDefinition(
+                priority,
+                trig,
+                content,
+                descr,
+                opts,
+                python_globals,
+                "%s:%i" % (filename, line_index),
+                context,
+                actions,
+            )
+            yield "snippet", (definition,)
+        else:
+            yield event, data
+
+
+_SNIPPET_FILE_CACHE = None
+
+
+def snippet_file_cache():
+    """Returns the SnippetFileCache used for UltiSnips files or None if
+    caching is disabled through g:UltiSnipsCacheDir."""
+    global _SNIPPET_FILE_CACHE  # pylint:disable=global-statement
+    if _SNIPPET_FILE_CACHE is None:
+        if vim_helper.eval("exists('g:UltiSnipsCacheDir')") == "1":
+            directory = os.path.expanduser(vim_helper.eval("g:UltiSnipsCacheDir"))
+        else:
+            cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+                os.path.expanduser("~"), ".cache"
+            )
+            directory = os.path.join(cache_home, "ultisnips")
+        _SNIPPET_FILE_CACHE = SnippetFileCache(directory)
+    if not _SNIPPET_FILE_CACHE.directory:
+        return None
+    return _SNIPPET_FILE_CACHE
+
+
 class UltiSnipsFileSource(SnippetFileSource):
     """Manages all snippets definitions found in rtp for ultisnips."""
 
+    def _update_file_index(self):
+        update_snippet_file_index()
+
     def _get_all_snippet_files_for(self, ft):
-        return find_all_snippet_files(ft)
+        return _SNIPPET_FILE_INDEX.files_for(ft)
+
+    def _directories_to_watch(self, filenames):
+        directories = SnippetFileSource._directories_to_watch(self, filenames)
+        directories.update(
+            d for d in _SNIPPET_FILE_INDEX.directories if os.path.isdir(d)
+        )
+        return directories
 
     def _parse_snippet_file(self, filedata, filename):
-        for event, data in _parse_snippets_file(filedata, filename):
-            yield event, data
+        return _create_snippets(_parse_snippets_file(filedata, filename), filename)
+
+    def _snippet_file_events(self, filename):
+        cache = snippet_file_cache()
+        if cache is None:
+            return SnippetFileSource._snippet_file_events(self, filename)
+        return _create_snippets(
+            cache.events_for(filename, _parse_snippets_file), filename
+        )
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+"""Watches snippet directories so that snippet sources learn which files
+changed without having to stat them.
+
+On Linux this uses inotify through ctypes and a background thread. Bursts of
+events are debounced into one notification. If inotify is not available, the
+watcher falls back to telling its listeners that anything might have changed,
+at most once every 'poll_interval' seconds, so that they stat their files.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import time
+
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+
+_WATCH_MASK = (
+    _IN_MODIFY
+    | _IN_ATTRIB
+    | _IN_CLOSE_WRITE
+    | _IN_MOVED_FROM
+    | _IN_MOVED_TO
+    | _IN_CREATE
+    | _IN_DELETE
+    | _IN_DELETE_SELF
+    | _IN_MOVE_SELF
+    | _IN_ONLYDIR
+)
+
+# struct inotify_event without the trailing name.
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class _Inotify:
+    """Thin ctypes wrapper around the inotify syscalls."""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        # Raises AttributeError if the libc has no inotify.
+        self._inotify_add_watch = libc.inotify_add_watch
+        self._inotify_add_watch.argtypes = [
+            ctypes.c_int,
+            ctypes.c_char_p,
+            ctypes.c_uint32,
+        ]
+        self._inotify_add_watch.restype = ctypes.c_int
+        self.fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+    def add_watch(self, directory):
+        """Returns the watch descriptor for 'directory' or None if it can not
+        be watched."""
+        wd = self._inotify_add_watch(self.fd, os.fsencode(directory), _WATCH_MASK)
+        if wd < 0:
+            return None
+        return wd
+
+    def read_events(self):
+        """Returns a list of (wd, mask, name) for all pending events."""
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            events.append((wd, mask, os.fsdecode(name)))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class SnippetFileWatcher:
+    """See module docstring.
+
+    Listeners are called with a set of paths that changed, or with None if
+    anything might have changed. With inotify, they are called from the
+    watcher thread, so they must not talk to Vim.
+    """
+
+    def __init__(self, debounce=0.1, poll_interval=2.0, use_inotify=True):
+        self._debounce = debounce
+        self._poll_interval = poll_interval
+        self._last_poll = None
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._directories = {}  # wd -> directory
+        self._watched = set()
+        self._inotify = None
+        if use_inotify:
+            try:
+                self._inotify = _Inotify()
+            except (OSError, AttributeError, TypeError):
+                self._inotify = None
+        if self._inotify is not None:
+            self._wakeup_read, self._wakeup_write = os.pipe()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    @property
+    def uses_inotify(self):
+        """True if changes are pushed by inotify instead of polled."""
+        return self._inotify is not None
+
+    def add_listener(self, listener):
+        """Registers 'listener' to be told about changes."""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def watch(self, directories):
+        """Starts watching all of 'directories' that are not yet watched."""
+        if self._inotify is None:
+            return
+        for directory in directories:
+            if directory in self._watched:
+                continue
+            wd = self._inotify.add_watch(directory)
+            if wd is None:
+                continue
+            with self._lock:
+                self._watched.add(directory)
+                self._directories[wd] = directory
+
+    def poll(self):
+        """Without inotify, tells the listeners that anything might have
+        changed if 'poll_interval' seconds passed since the last time. Does
+        nothing with inotify."""
+        if self._inotify is not None:
+            return
+        now = time.monotonic()
+        if self._last_poll is not None and now - self._last_poll < self._poll_interval:
+            return
+        self._last_poll = now
+        self._notify(None)
+
+    def close(self):
+        """Stops the watcher thread."""
+        if self._inotify is None:
+            return
+        os.write(self._wakeup_write, b"x")
+        self._thread.join()
+        self._inotify.close()
+        os.close(self._wakeup_read)
+        os.close(self._wakeup_write)
+        self._inotify = None
+
+    def _notify(self, paths):
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(paths)
+
+    def _wait(self, timeout):
+        """Returns true if inotify has events, false on timeout and None if
+        the watcher was closed."""
+        readable, _, _ = select.select(
+            [self._inotify.fd, self._wakeup_read], [], [], timeout
+        )
+        if self._wakeup_read in readable:
+            return None
+        return bool(readable)
+
+    def _collect(self, paths):
+        """Adds the paths of all pending events to 'paths'. Returns None if
+        events were lost."""
+        for wd, mask, name in self._inotify.read_events():
+            if mask & _IN_Q_OVERFLOW:
+                return None
+            with self._lock:
+                directory = self._directories.get(wd)
+                if mask & _IN_IGNORED:
+                    # The directory is gone, it is watched again once it
+                    # shows up in a snippet source.
+                    self._directories.pop(wd, None)
+                    self._watched.discard(directory)
+            if directory is None:
+                continue
+            paths.add(os.path.join(directory, name) if name else directory)
+        return paths
+
+    def _run(self):
+        while self._wait(None):
+            paths = self._collect(set())
+            while True:
+                ready = self._wait(self._debounce)
+                if ready is None:
+                    return
+                if not ready:
+                    break
+                if paths is not None:
+                    paths = self._collect(paths)
+                else:
+                    self._inotify.read_events()
+            if paths is None or paths:
+                self._notify(paths)
@@ -1,28 +1,270 @@
 #!/usr/bin/env python3
 # encoding: utf-8
 
-"""Implements a container for parsed snippets."""
+"""Implements a container for parsed snippets.
+
+Asking every snippet whether it matches gets slow with many snippets, so the
+dictionary keeps indexes over the triggers and only asks the snippets that
+can possibly match:
+
+- Snippets without the 'r', 'w' or 'i' option match when the last words
+  before the cursor equal their trigger. They are looked up by trigger.
+- Snippets with the 'w' or 'i' option match when the last words end with
+  their trigger. They are looked up by every suffix of the last words.
+- For could_match(), a trigger must start with the last words. All triggers
+  are kept sorted, so the candidates are a contiguous range in that list.
+- Regular expression triggers are combined into end anchored alternations,
+  one of all of them and one for each chunk of them. Only the snippets of
+  chunks whose alternation matches are asked, and usually none does. Patterns
+  that can not be combined are always asked.
+- Snippets that override matches() or could_match() are always asked.
+
+The candidates are then asked in the order they were added, so the results
+and the side effects of matches() and could_match() on the returned
+snippets are the same as when asking all snippets.
+"""
+
+from bisect import bisect_left
+from collections import defaultdict
+import re
+
+from UltiSnips.snippet.definition.base import (
+    SnippetDefinition,
+    _words_for_line,
+    end_anchored,
+    split_at_whitespace,
+)
+
+# Group references only work as long as the groups keep their numbers.
+_GROUP_REFERENCE = re.compile(r"\\[1-9]|\(\?P=|\(\?\(")
+
+# When the alternation of all regular expressions matches, the alternations of
+# chunks of this many expressions find out which ones need to be asked.
+_REGEX_CHUNK_SIZE = 32
+
+_GENERATION = 0
+
+
+def snippet_generation():
+    """Returns a number that changes whenever a snippet source changes its
+    snippets or might have to reload them."""
+    return _GENERATION
+
+
+def bump_snippet_generation():
+    """Tells users of snippet_generation() that a snippet source changed."""
+    global _GENERATION  # pylint:disable=global-statement
+    _GENERATION += 1
+
+
+def _uses_default_matching(snippet):
+    """True if 'snippet' uses the matching of SnippetDefinition."""
+    return (
+        isinstance(snippet, SnippetDefinition)
+        and type(snippet).matches is SnippetDefinition.matches
+        and type(snippet).could_match is SnippetDefinition.could_match
+    )
+
+
+def _matches(snippet, before, visual_content, keyword_chars):
+    """Asks 'snippet' whether it matches 'before'. Overrides of matches() might
+    not take 'keyword_chars'."""
+    if _uses_default_matching(snippet):
+        return snippet.matches(before, visual_content, keyword_chars)
+    return snippet.matches(before, visual_content)
+
+
+def _could_match(snippet, before, keyword_chars):
+    """Asks 'snippet' whether it could match 'before', see _matches()."""
+    if _uses_default_matching(snippet):
+        return snippet.could_match(before, keyword_chars)
+    return snippet.could_match(before)
+
+
+def _compile_alternation(patterns):
+    """Compiles the alternation of 'patterns' or returns None."""
+    try:
+        return re.compile("|".join(patterns))
+    except (re.error, RecursionError, OverflowError):
+        return None
+
+
+def _combine_regexes(patterns):
+    """Combines the (index, pattern) pairs in 'patterns' into alternations
+    that match at the end of a text if one of their patterns does.
+
+    Returns an alternation of all patterns, a list of (alternation, indexes)
+    for chunks of _REGEX_CHUNK_SIZE patterns, and the indexes of the patterns
+    that are not part of any alternation.
+    """
+    combinable = []
+    group_names = set()
+    uncombined = []
+    for index, pattern in patterns:
+        compiled = None
+        if not _GROUP_REFERENCE.search(pattern):
+            compiled = end_anchored(pattern)
+        if compiled is None or group_names.intersection(compiled.groupindex):
+            uncombined.append(index)
+            continue
+        group_names.update(compiled.groupindex)
+        combinable.append((index, compiled.pattern))
+
+    combined = _compile_alternation([pattern for _, pattern in combinable])
+    if combined is None:
+        return None, [], [index for index, _ in patterns]
+    chunks = []
+    for start in range(0, len(combinable), _REGEX_CHUNK_SIZE):
+        chunk = combinable[start : start + _REGEX_CHUNK_SIZE]
+        indexes = [index for index, _ in chunk]
+        compiled = _compile_alternation([pattern for _, pattern in chunk])
+        if compiled is None:
+            uncombined.extend(indexes)
+        else:
+            chunks.append((compiled, indexes))
+    return combined, chunks, uncombined
 
 
 class SnippetDictionary:
     """See module docstring."""
 
     def __init__(self):
+        bump_snippet_generation()
         self._snippets = []
         self._cleared = {}
         self._clear_priority = float("-inf")
 
+        # The indexes below store positions in self._snippets. Triggers are
+        # grouped by their number of words, since that defines which words
+        # before the cursor are compared with them.
+        self._by_trigger = defaultdict(list)  # (num_words, trigger) -> indexes
+        self._by_suffix = defaultdict(list)  # (num_words, trigger) -> indexes
+        self._trigger_word_counts = set()
+        self._suffix_lengths = {}  # num_words -> longest trigger
+        self._sorted_triggers = defaultdict(list)  # num_words -> [(trigger, index)]
+        self._sorted = True
+        self._scanned = []  # indexes
+        self._regexes = []  # indexes
+        self._combined_regex = None
+        self._regex_chunks = []  # (alternation, indexes)
+        self._uncombined_regexes = []  # indexes
+        self._regexes_combined = True
+        self._autotrigger_triggers = set()
+        self._autotrigger_unknown = False
+
     def add_snippet(self, snippet):
         """Add 'snippet' to this dictionary."""
+        bump_snippet_generation()
+        index = len(self._snippets)
         self._snippets.append(snippet)
+        if snippet.has_option("A"):
+            if (
+                _uses_default_matching(snippet)
+                and not snippet.has_option("r")
+                and snippet.trigger
+            ):
+                self._autotrigger_triggers.add(snippet.trigger)
+            else:
+                self._autotrigger_unknown = True
+        if not _uses_default_matching(snippet):
+            self._scanned.append(index)
+            return
+        if snippet.has_option("r"):
+            self._regexes.append(index)
+            self._regexes_combined = False
+            return
+        trigger = snippet.trigger
+        num_words = len(split_at_whitespace(trigger))
+        if snippet.has_option("w") or snippet.has_option("i"):
+            self._by_suffix[num_words, trigger].append(index)
+            self._suffix_lengths[num_words] = max(
+                len(trigger), self._suffix_lengths.get(num_words, 0)
+            )
+        else:
+            self._by_trigger[num_words, trigger].append(index)
+            self._trigger_word_counts.add(num_words)
+        self._sorted_triggers[num_words].append((trigger, index))
+        self._sorted = False
+
+    def _regex_candidates(self, before):
+        """Indexes of the snippets with regex triggers that might match
+        'before'."""
+        if not self._regexes_combined:
+            (
+                self._combined_regex,
+                self._regex_chunks,
+                self._uncombined_regexes,
+            ) = _combine_regexes(
+                [(index, self._snippets[index].trigger) for index in self._regexes]
+            )
+            self._regexes_combined = True
+        if self._combined_regex is None:
+            return self._regexes
+        indexes = list(self._uncombined_regexes)
+        if self._combined_regex.search(before):
+            for alternation, chunk in self._regex_chunks:
+                if alternation.search(before):
+                    indexes.extend(chunk)
+        return indexes
+
+    def _candidates_for_match(self, before):
+        """Indexes of all snippets that might match 'before'."""
+        indexes = self._scanned + self._regex_candidates(before)
+        for num_words in self._trigger_word_counts:
+            words = _words_for_line("", before, num_words)
+            indexes.extend(self._by_trigger.get((num_words, words), ()))
+        for num_words, longest in self._suffix_lengths.items():
+            words = _words_for_line("", before, num_words)
+            for start in range(max(0, len(words) - longest), len(words) + 1):
+                indexes.extend(self._by_suffix.get((num_words, words[start:]), ()))
+        return indexes
+
+    def _candidates_for_could_match(self, before):
+        """Indexes of all snippets that might could_match() 'before'."""
+        indexes = list(self._scanned)
+        # Mirrors the handling of whitespace in could_match().
+        if before and before[-1] in (" ", "\t"):
+            before = ""
+        if before and before.rstrip() != before:
+            return indexes
+        indexes.extend(self._regex_candidates(before))
+        if not self._sorted:
+            for triggers in self._sorted_triggers.values():
+                triggers.sort()
+            self._sorted = True
+        for num_words, triggers in self._sorted_triggers.items():
+            words = _words_for_line("", before, num_words)
+            position = bisect_left(triggers, (words,))
+            while position < len(triggers):
+                trigger, index = triggers[position]
+                if not trigger.startswith(words):
+                    break
+                indexes.append(index)
+                position += 1
+        return indexes
+
+    def autotrigger_triggers(self):
+        """Returns the triggers of the snippets with the 'A' option. Text
+        before the cursor must end with one of them, not counting trailing
+        whitespace, for one of these snippets to match.
+
+        Returns None if that does not hold for all of them, for example for
+        regular expression triggers.
+        """
+        if self._autotrigger_unknown:
+            return None
+        return self._autotrigger_triggers
 
     def get_matching_snippets(
-        self, trigger, potentially, autotrigger_only, visual_content
+        self, trigger, potentially, autotrigger_only, visual_content, keyword_chars=None
     ):
         """Returns all snippets matching the given trigger.
 
         If 'potentially' is true, returns all that could_match().
 
+        'keyword_chars' is the KeywordChars of the current buffer. If it is
+        None, snippets with the 'w' option look it up themselves.
+
         If 'autotrigger_only' is true, function will return only snippets which
         are marked with flag 'A' (should be automatically expanded without
         trigger key press).
@@ -31,14 +273,23 @@ class SnippetDictionary:
         made in insert mode.
 
         """
-        all_snippets = self._snippets
+        if not potentially:
+            indexes = self._candidates_for_match(trigger)
+        else:
+            indexes = self._candidates_for_could_match(trigger)
+        indexes.sort()
+        candidates = [self._snippets[index] for index in indexes]
         if autotrigger_only:
-            all_snippets = [s for s in all_snippets if s.has_option("A")]
+            candidates = [s for s in candidates if s.has_option("A")]
 
         if not potentially:
-            return [s for s in all_snippets if s.matches(trigger, visual_content)]
+            return [
+                s
+                for s in candidates
+                if _matches(s, trigger, visual_content, keyword_chars)
+            ]
         else:
-            return [s for s in all_snippets if s.could_match(trigger)]
+            return [s for s in candidates if _could_match(s, trigger, keyword_chars)]
 
     def clear_snippets(self, priority, triggers):
         """Clear the snippets by mark them as cleared.
@@ -47,6 +298,7 @@ class SnippetDictionary:
         instead.
 
         """
+        bump_snippet_generation()
         if not triggers:
             if self._clear_priority is None or priority > self._clear_priority:
                 self._clear_priority = priority
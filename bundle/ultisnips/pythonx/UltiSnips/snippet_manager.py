@@ -14,7 +14,10 @@ from UltiSnips import vim_helper
 from UltiSnips import err_to_scratch_buffer
 from UltiSnips.diff import diff, guess_edit
 from UltiSnips.position import Position, JumpDirection
-from UltiSnips.snippet.definition import UltiSnipsSnippetDefinition
+from UltiSnips.snippet.definition import (
+    AnonymousSnippetCache,
+    UltiSnipsSnippetDefinition,
+)
 from UltiSnips.snippet.source import (
     AddedSnippetsSource,
     SnipMateFileSource,
@@ -23,6 +26,8 @@ from UltiSnips.snippet.source import (
     find_all_snippet_files,
     find_snippet_files,
 )
+from UltiSnips.snippet.source.base import SnippetSource, snippet_generation
+from UltiSnips.snippet.source.file.base import snippet_file_watcher
 from UltiSnips.snippet.source.file.common import (
     normalize_file_path,
 )
@@ -106,6 +111,133 @@ def _get_potential_snippet_filenames_to_edit(
     return potentials
 
 
+class _AutotriggerFilter:
+    """Knows the last characters and the triggers of all snippets with the
+    'A' option in some snippet dictionaries, so that most keystrokes can be
+    ruled out without asking any snippet."""
+
+    def __init__(self, lookups):
+        self._match_all = False
+        self._triggers = set()
+        for _, dictionaries in lookups:
+            if dictionaries is None:
+                self._match_all = True
+                return
+            for dictionary in dictionaries:
+                triggers = dictionary.autotrigger_triggers()
+                if triggers is None:
+                    self._match_all = True
+                    return
+                self._triggers.update(triggers)
+        self._last_chars = {trigger[-1] for trigger in self._triggers}
+        self._lengths = sorted({len(trigger) for trigger in self._triggers})
+
+    def might_match(self, before):
+        """Returns False if none of the snippets can match 'before'."""
+        if self._match_all:
+            return True
+        before = before.rstrip()
+        if not before or before[-1] not in self._last_chars:
+            return False
+        return any(before[-length:] in self._triggers for length in self._lengths)
+
+
+# The methods of SnippetSource whose answers a _SnippetView keeps.
+_VIEW_METHODS = (
+    "get_snippets",
+    "get_snippet_dictionaries",
+    "get_clear_priority",
+    "get_cleared",
+)
+
+
+def _can_cache_view(source):
+    """True if a _SnippetView may keep the answers of 'source' until the
+    snippet generation changes."""
+    if source.reports_changes:
+        return True
+    return all(
+        getattr(type(source), name) is getattr(SnippetSource, name)
+        for name in _VIEW_METHODS
+    )
+
+
+class _SnippetView:
+    """What the snippet sources know about a list of filetypes: the cleared
+    snippets and where to look for snippets. It stays valid as long as the
+    snippet generation does not change."""
+
+    def __init__(self, sources, filetypes):
+        self.clear_priority = None
+        self.cleared = {}
+        for _, source in sources:
+            sclear_priority = source.get_clear_priority(filetypes)
+            if sclear_priority is not None and (
+                self.clear_priority is None or sclear_priority > self.clear_priority
+            ):
+                self.clear_priority = sclear_priority
+            for key, value in source.get_cleared(filetypes).items():
+                if key not in self.cleared or value > self.cleared[key]:
+                    self.cleared[key] = value
+
+        # For each source, its snippet dictionaries or None if it creates
+        # snippets on the fly in get_snippets().
+        self._lookups = []
+        for _, source in sources:
+            dictionaries = None
+            if type(source).get_snippets is SnippetSource.get_snippets:
+                dictionaries = source.get_snippet_dictionaries(filetypes)
+            self._lookups.append((source, dictionaries))
+        self._autotriggers = None
+        self._autotriggers_sizes = None
+
+    def _dictionary_sizes(self):
+        return [
+            len(dictionary)
+            for _, dictionaries in self._lookups
+            for dictionary in dictionaries or ()
+        ]
+
+    def might_autotrigger(self, before):
+        """Returns False if no snippet with the 'A' option can match 'before'.
+        This is cheap enough to be called on every keystroke."""
+        sizes = self._dictionary_sizes()
+        if self._autotriggers is None or sizes != self._autotriggers_sizes:
+            self._autotriggers = _AutotriggerFilter(self._lookups)
+            self._autotriggers_sizes = sizes
+        return self._autotriggers.might_match(before)
+
+    def get_snippets(
+        self,
+        filetypes,
+        before,
+        possible,
+        autotrigger_only,
+        visual_content,
+        keyword_chars,
+    ):
+        """Yields the snippets matching 'before' for each source. Only the
+        snippet dictionaries are given 'keyword_chars'."""
+        for source, dictionaries in self._lookups:
+            if dictionaries is None:
+                yield source.get_snippets(
+                    filetypes, before, possible, autotrigger_only, visual_content
+                )
+                continue
+            snippets = []
+            for dictionary in dictionaries:
+                snippets.extend(
+                    dictionary.get_matching_snippets(
+                        before,
+                        possible,
+                        autotrigger_only,
+                        visual_content,
+                        keyword_chars,
+                    )
+                )
+            yield snippets
+
+
 # TODO(sirver): This class is still too long. It should only contain public
 # facing methods, most of the private methods should be moved outside of it.
 class SnippetManager:
@@ -129,12 +261,16 @@ class SnippetManager:
         self._visual_content = VisualContentPreserver()
 
         self._snippet_sources = []
+        # tuple of filetypes -> _SnippetView, valid for one snippet generation.
+        self._snippet_views = {}
+        self._snippet_views_generation = None
 
         self._snip_expanded_in_action = False
         self._inside_action = False
 
         self._last_change = ("", Position(-1, -1))
 
+        self._anonymous_snippets = AnonymousSnippetCache()
         self._added_snippets_source = AddedSnippetsSource()
         self.register_snippet_source("ultisnips_files", UltiSnipsFileSource())
         self.register_snippet_source("added", self._added_snippets_source)
@@ -320,8 +456,8 @@ class SnippetManager:
     ):
         """Expand an anonymous snippet right here."""
         before = vim_helper.buf.line_till_cursor
-        snip = UltiSnipsSnippetDefinition(
-            0, trigger, value, description, options, {}, "", context, actions
+        snip = self._anonymous_snippets.definition_for(
+            value, trigger, description, options, context, actions
         )
 
         if not trigger or snip.matches(before, self._visual_content):
@@ -329,6 +465,11 @@ class SnippetManager:
             return True
         return False
 
+    @property
+    def anonymous_snippet_cache(self):
+        """The AnonymousSnippetCache used by expand_anon()."""
+        return self._anonymous_snippets
+
     def register_snippet_source(self, name, snippet_source):
         """Registers a new 'snippet_source' with the given 'name'.
 
@@ -337,6 +478,7 @@ class SnippetManager:
 
         """
         self._snippet_sources.append((name, snippet_source))
+        self._snippet_views.clear()
 
     def unregister_snippet_source(self, name):
         """Unregister the source with the given 'name'.
@@ -349,14 +491,15 @@ class SnippetManager:
                 self._snippet_sources = (
                     self._snippet_sources[:index] + self._snippet_sources[index + 1 :]
                 )
+                self._snippet_views.clear()
                 break
 
     def get_buffer_filetypes(self):
-        return (
-            self._added_buffer_filetypes[vim_helper.buf.number]
-            + vim_helper.buf.filetypes
-            + ["all"]
-        )
+        return self._buffer_filetypes(vim_helper.buf.filetypes)
+
+    def _buffer_filetypes(self, filetypes):
+        """get_buffer_filetypes() for the 'filetypes' of the current buffer."""
+        return self._added_buffer_filetypes[vim_helper.buf.number] + filetypes + ["all"]
 
     def add_buffer_filetypes(self, filetypes: str):
         """'filetypes' is a dotted filetype list, for example 'cuda.cpp'"""
@@ -373,12 +516,13 @@ class SnippetManager:
                 idx += 1
 
     @err_to_scratch_buffer.wrap
+    @vim_helper.counts_round_trips
     def _cursor_moved(self):
         """Called whenever the cursor moved."""
         self._should_update_textobjects = False
 
         self._vstate.remember_position()
-        if vim_helper.eval("mode()") not in "in":
+        if self._vstate.pos.mode not in "in":
             return
 
         if self._ignore_movements:
@@ -386,46 +530,7 @@ class SnippetManager:
             return
 
         if self._active_snippets:
-            cstart = self._active_snippets[0].start.line
-            cend = (
-                self._active_snippets[0].end.line + self._vstate.diff_in_buffer_length
-            )
-            ct = vim_helper.buf[cstart : cend + 1]
-            lt = self._vstate.remembered_buffer
-            pos = vim_helper.buf.cursor
-
-            lt_span = [0, len(lt)]
-            ct_span = [0, len(ct)]
-            initial_line = cstart
-
-            # Cut down on lines searched for changes. Start from behind and
-            # remove all equal lines. Then do the same from the front.
-            if lt and ct:
-                while (
-                    lt[lt_span[1] - 1] == ct[ct_span[1] - 1]
-                    and self._vstate.ppos.line < initial_line + lt_span[1] - 1
-                    and pos.line < initial_line + ct_span[1] - 1
-                    and (lt_span[0] < lt_span[1])
-                    and (ct_span[0] < ct_span[1])
-                ):
-                    ct_span[1] -= 1
-                    lt_span[1] -= 1
-                while (
-                    lt_span[0] < lt_span[1]
-                    and ct_span[0] < ct_span[1]
-                    and lt[lt_span[0]] == ct[ct_span[0]]
-                    and self._vstate.ppos.line >= initial_line
-                    and pos.line >= initial_line
-                ):
-                    ct_span[0] += 1
-                    lt_span[0] += 1
-                    initial_line += 1
-            ct_span[0] = max(0, ct_span[0] - 1)
-            lt_span[0] = max(0, lt_span[0] - 1)
-            initial_line = max(cstart, initial_line - 1)
-
-            lt = lt[lt_span[0] : lt_span[1]]
-            ct = ct[ct_span[0] : ct_span[1]]
+            initial_line, lt, ct = self._vstate.changed_text(self._active_snippets[0])
 
             try:
                 rv, es = guess_edit(initial_line, lt, ct, self._vstate)
@@ -491,6 +596,7 @@ class SnippetManager:
         vim_helper.command(
             "silent doautocmd <nomodeline> User UltiSnipsEnterFirstSnippet"
         )
+        self._vstate.start_tracking_changes()
         self._inner_state_up = True
 
     def _teardown_inner_state(self):
@@ -515,6 +621,7 @@ class SnippetManager:
             # are back in our buffer
             pass
         finally:
+            self._vstate.stop_tracking_changes()
             self._inner_state_up = False
 
     @err_to_scratch_buffer.wrap
@@ -686,35 +793,66 @@ class SnippetManager:
         elif feedkey:
             vim_helper.command("return %s" % vim_helper.escape(feedkey))
 
+    def _snippet_view(self, filetypes):
+        """Returns the _SnippetView for 'filetypes', computing it only if a
+        snippet source changed since the last time. It is computed every
+        time if a source does not report its changes."""
+        # Taken before ensure(), so that a change that is reported while
+        # ensure() runs invalidates the view computed now.
+        generation = snippet_generation()
+        for _, source in self._snippet_sources:
+            source.ensure(filetypes)
+        if not all(_can_cache_view(source) for _, source in self._snippet_sources):
+            self._snippet_views.clear()
+            return _SnippetView(self._snippet_sources, filetypes)
+        if generation != self._snippet_views_generation:
+            self._snippet_views.clear()
+            self._snippet_views_generation = generation
+        key = tuple(filetypes)
+        view = self._snippet_views.get(key)
+        if view is None:
+            view = self._snippet_views[key] = _SnippetView(
+                self._snippet_sources, filetypes
+            )
+        return view
+
+    def _might_autotrigger(self, before):
+        """Returns False if no autotrigger snippet can match 'before'. Uses
+        the snippet view of the last lookup if no snippet source changed
+        since, without asking the sources."""
+        if self._snippet_views_generation != snippet_generation():
+            return True
+        watcher = snippet_file_watcher()
+        if watcher and not watcher.uses_inotify:
+            # Changes are only noticed when the sources are asked.
+            return True
+        view = self._snippet_views.get(tuple(self.get_buffer_filetypes()[::-1]))
+        if view is None:
+            return True
+        return view.might_autotrigger(before)
+
     def _snips(self, before, partial, autotrigger_only=False):
         """Returns all the snippets for the given text before the cursor.
 
         If partial is True, then get also return partial matches.
 
         """
-        filetypes = self.get_buffer_filetypes()[::-1]
+        # 'iskeyword' is read once here rather than by every snippet with the
+        # 'w' option that is asked.
+        filetype, iskeyword = vim_helper.eval_all(["&filetype", "&iskeyword"])
+        filetypes = self._buffer_filetypes(vim_helper.split_filetypes(filetype))[::-1]
+        view = self._snippet_view(filetypes)
+        clear_priority = view.clear_priority
+        cleared = view.cleared
         matching_snippets = defaultdict(list)
-        clear_priority = None
-        cleared = {}
-        for _, source in self._snippet_sources:
-            source.ensure(filetypes)
-
-        # Collect cleared information from sources.
-        for _, source in self._snippet_sources:
-            sclear_priority = source.get_clear_priority(filetypes)
-            if sclear_priority is not None and (
-                clear_priority is None or sclear_priority > clear_priority
-            ):
-                clear_priority = sclear_priority
-            for key, value in source.get_cleared(filetypes).items():
-                if key not in cleared or value > cleared[key]:
-                    cleared[key] = value
-
-        for _, source in self._snippet_sources:
-            possible_snippets = source.get_snippets(
-                filetypes, before, partial, autotrigger_only, self._visual_content
-            )
-
+        for possible_snippets in view.get_snippets(
+            filetypes,
+            before,
+            partial,
+            autotrigger_only,
+            self._visual_content,
+            vim_helper.keyword_chars(iskeyword),
+        ):
             for snippet in possible_snippets:
                 if (clear_priority is None or snippet.priority > clear_priority) and (
                     snippet.trigger not in cleared
@@ -745,8 +883,6 @@ class SnippetManager:
     def _do_snippet(self, snippet, before):
         """Expands the given snippet, and handles everything that needs to be
         done with it."""
-        self._setup_inner_state()
-
         self._snip_expanded_in_action = False
         self._should_update_textobjects = False
 
@@ -755,6 +891,11 @@ class SnippetManager:
         if snippet.matched:
             text_before = before[: -len(snippet.matched)]
 
+        if self._expand_static_snippet(snippet, text_before, before):
+            return
+
+        self._setup_inner_state()
+
         with use_proxy_buffer(self._active_snippets, self._vstate):
             with self._action_context():
                 cursor_set_in_action = snippet.do_pre_expand(
@@ -814,6 +955,52 @@ class SnippetManager:
             if self._inside_action:
                 self._snip_expanded_in_action = True
 
+    def _expand_static_snippet(self, snippet, text_before, before):
+        """Expands 'snippet' without a SnippetInstance if it is static and no
+        other snippet is active, see SnippetDefinition.static_text(). Does the
+        same as _do_snippet() followed by the jump to the $0, but nothing is
+        tracked afterwards.
+
+        Returns False if the snippet has to be expanded by _do_snippet().
+
+        """
+        if self._active_snippets or self._inside_action:
+            return False
+        static_text = snippet.static_text(text_before)
+        if static_text is None:
+            return False
+
+        vim_helper.command(
+            "silent doautocmd <nomodeline> User UltiSnipsEnterFirstSnippet"
+        )
+        start = Position(vim_helper.buf.cursor.line, len(text_before))
+        end = Position(vim_helper.buf.cursor.line, len(before))
+        final_tabstop = snippet.launch_static(static_text, start, end)
+        # Open any folds this might have created
+        vim_helper.command("normal! zv")
+        self._visual_content.reset()
+
+        with vim_helper.option_set_to("ve", "onemore"):
+            if snippet.has_option("s"):
+                lineno = vim_helper.buf.cursor.line
+                vim_helper.buf[lineno] = vim_helper.buf[lineno].rstrip()
+            vim_helper.select(final_tabstop, final_tabstop)
+            if snippet.has_option("s") and final_tabstop.line == lineno:
+                # Like update_textobjects() does for a SnippetInstance, move
+                # the cursor back into the line if the $0 was in the stripped
+                # whitespace.
+                length = len(vim_helper.buf[lineno])
+                if start.col <= length < final_tabstop.col:
+                    vim_helper.buf.cursor = Position(lineno, length)
+            self._should_reset_visual = False
+            vim_helper.command("normal! zv")
+            vim_helper.command(
+                "silent doautocmd <nomodeline> User UltiSnipsExitLastSnippet"
+            )
+            self._vstate.remember_unnamed_register("")
+            self._ignore_movements = True
+        return True
+
     def _can_expand(self, autotrigger_only=False):
         before = vim_helper.buf.line_till_cursor
         return before, self._snips(before, False, autotrigger_only)
@@ -947,30 +1134,43 @@ class SnippetManager:
             self._inside_action = old_flag
 
     @err_to_scratch_buffer.wrap
+    @vim_helper.counts_round_trips
     def _track_change(self):
         self._should_update_textobjects = True
 
         try:
-            inserted_char = vim_helper.eval("v:char")
+            inserted_char, before, line = vim_helper.eval_all(
+                ["v:char", "strpart(getline('.'), 0, col('.') - 1)", "line('.')"]
+            )
         except UnicodeDecodeError:
-            return
+            # Only a v:char that cannot be decoded ends the tracking. The text
+            # before the cursor is read through the buffer then.
+            try:
+                inserted_char = vim_helper.eval("v:char")
+            except UnicodeDecodeError:
+                return
+            before = None
 
         if isinstance(inserted_char, bytes):
             return
-
+        if before is None or isinstance(before, bytes):
+            before = vim_helper.buf.line_till_cursor
+            cursor = vim_helper.buf.cursor
+        else:
+            cursor = Position(int(line) - 1, len(before))
         try:
             if inserted_char == "":
-                before = vim_helper.buf.line_till_cursor
-
                 if (
                     self._autotrigger
                     and before
                     and self._last_change[0] != ""
                     and before[-1] == self._last_change[0]
+                    and self._might_autotrigger(before)
                 ):
                     self._try_expand(autotrigger_only=True)
+                    cursor = vim_helper.buf.cursor
         finally:
-            self._last_change = (inserted_char, vim_helper.buf.cursor)
+            self._last_change = (inserted_char, cursor)
 
         if self._should_reset_visual and self._visual_content.mode == "":
             self._visual_content.reset()
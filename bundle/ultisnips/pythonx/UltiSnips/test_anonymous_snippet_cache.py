@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+# pylint: skip-file
+
+import unittest
+
+from UltiSnips.snippet.definition import AnonymousSnippetCache
+
+
+def _lookup(cache, value, options="", actions=None):
+    return cache.definition_for(value, "", "", options, None, actions)
+
+
+class AnonymousSnippetCache_HitAfterMiss(unittest.TestCase):
+    def runTest(self):
+        cache = AnonymousSnippetCache()
+        first = _lookup(cache, "${1:a}")
+        self.assertIs(_lookup(cache, "${1:a}"), first)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(cache.hit_rate, 0.5)
+
+
+class AnonymousSnippetCache_KeyedByAllArguments(unittest.TestCase):
+    def runTest(self):
+        cache = AnonymousSnippetCache()
+        definitions = [
+            _lookup(cache, "a"),
+            _lookup(cache, "a", options="b"),
+            _lookup(cache, "a", actions={"post_jump": "pass"}),
+            _lookup(cache, "a", actions={"post_jump": "x = 1"}),
+            cache.definition_for("a", "t", "", "", None, None),
+            cache.definition_for("a", "", "", "", "True", None),
+        ]
+        self.assertEqual(len(set(map(id, definitions))), len(definitions))
+        self.assertIs(
+            _lookup(cache, "a", actions={"post_jump": "pass"}), definitions[2]
+        )
+
+
+class AnonymousSnippetCache_DropsLeastRecentlyUsed(unittest.TestCase):
+    def runTest(self):
+        cache = AnonymousSnippetCache(max_size=2)
+        a = _lookup(cache, "a")
+        _lookup(cache, "b")
+        _lookup(cache, "a")
+        _lookup(cache, "c")
+        self.assertEqual(len(cache), 2)
+        self.assertIs(_lookup(cache, "a"), a)
+        _lookup(cache, "b")
+        self.assertEqual((cache.hits, cache.misses), (2, 4))
+
+
+class AnonymousSnippetCache_ForgetsMatch(unittest.TestCase):
+    def runTest(self):
+        cache = AnonymousSnippetCache()
+        definition = cache.definition_for("a", "t", "", "", None, None)
+        definition.matches("t")
+        self.assertEqual(definition._matched, "t")
+        cache.definition_for("a", "t", "", "", None, None)
+        self.assertIsNone(definition._matched)
+        self.assertIsNone(definition.context)
+
+
+if __name__ == "__main__":
+    unittest.main()
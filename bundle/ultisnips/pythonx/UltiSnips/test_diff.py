@@ -3,9 +3,10 @@
 
 # pylint: skip-file
 
+import random
 import unittest
 
-from diff import diff, guess_edit
+from diff import common_prefix_length, diff, guess_edit, is_complete_edit
 from position import Position
 from typing import List
 
@@ -171,6 +172,77 @@ class MultiLine(_Base, unittest.TestCase):
     )
 
 
+class LongTextWithFewChanges(_Base, unittest.TestCase):
+    a = "line\n" * 20000 + "end"
+    b = "line\n" * 10000 + "new line\n" + "line\n" * 10000 + "ends"
+    wanted = (
+        ("I", 10000, 0, "new line"),
+        ("I", 10000, 8, "\n"),
+        ("I", 20001, 3, "s"),
+    )
+
+
+class TooManyChangesToSearch(_Base, unittest.TestCase):
+    a = "a" * 1000 + "b" * 1000
+    b = "b" * 1000 + "a" * 1000
+    wanted = (("D", 0, 0, a), ("I", 0, 0, b))
+
+
+class IsCompleteEdit_SplitsAndJoinsLines(unittest.TestCase):
+    def runTest(self):
+        original = ["first", "second", "third"]
+        cmds = (
+            ("I", 10, 5, "a\nb"),
+            ("D", 11, 1, "\n"),
+            ("D", 11, 4, "ond"),
+            ("D", 11, 4, "\n"),
+            ("I", 11, 9, "\n"),
+        )
+        wanted = ["firsta", "bsecthird", ""]
+        self.assertTrue(is_complete_edit(10, original, wanted, cmds))
+        self.assertFalse(is_complete_edit(10, original, wanted[:-1], cmds))
+        self.assertFalse(is_complete_edit(10, original, ["x"] + wanted[1:], cmds))
+        self.assertEqual(original, ["first", "second", "third"])
+
+
+class IsCompleteEdit_DeletingEverythingLeavesOneLine(unittest.TestCase):
+    def runTest(self):
+        cmds = (("D", 0, 0, "a"), ("D", 0, 0, "\n"), ("D", 0, 0, "\n"))
+        self.assertTrue(is_complete_edit(0, ["a", ""], [""], cmds))
+
+
+class CommonPrefixLength(unittest.TestCase):
+    def runTest(self):
+        lines = ["line %i" % i for i in range(100)]
+        for length in (0, 1, 2, 3, 37, 64, 99):
+            changed = lines[:length] + ["other"] + lines[length + 1 :]
+            self.assertEqual(common_prefix_length(lines, changed), length)
+        self.assertEqual(common_prefix_length(lines, lines[:50]), 50)
+        self.assertEqual(common_prefix_length("abcdef", "xxcdex", 2, 2), 3)
+        self.assertEqual(common_prefix_length("abc", "abc", 3, 3), 0)
+
+
+class FuzzDiff(unittest.TestCase):
+    def runTest(self):
+        rng = random.Random(42)
+        for _ in range(2000):
+            a = "".join(rng.choice("ab \n") for _ in range(rng.randint(0, 20)))
+            b = list(a)
+            for _ in range(rng.randint(1, 4)):
+                position = rng.randint(0, len(b))
+                if rng.random() < 0.5:
+                    b[position:position] = rng.choice(["a", "ba", "\n", " b\n"])
+                else:
+                    del b[position : position + rng.randint(1, 5)]
+            b = "".join(b)
+            initial_line = rng.randint(0, 3)
+            es = diff(a, b, initial_line)
+            self.assertTrue(
+                is_complete_edit(initial_line, a.split("\n"), b.split("\n"), es),
+                (a, b, es),
+            )
+
+
 if __name__ == "__main__":
     unittest.main()
     # k = TestEditScript()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+# pylint: skip-file
+
+import random
+import unittest
+
+from UltiSnips.edit_source import merge_changes
+
+
+def _change_lines(lines, rng):
+    first = rng.randint(0, len(lines))
+    old_end = rng.randint(first, min(len(lines), first + 3))
+    new_lines = ["x%i" % rng.randint(0, 9) for _ in range(rng.randint(0, 3))]
+    lines[first:old_end] = new_lines
+    return first, old_end, first + len(new_lines)
+
+
+class MergeChanges_NoChanges(unittest.TestCase):
+    def runTest(self):
+        self.assertIsNone(merge_changes([]))
+
+
+class MergeChanges_InsertAfterDelete(unittest.TestCase):
+    def runTest(self):
+        # Delete lines 2 and 3, then insert a line before the old line 6.
+        self.assertEqual(merge_changes([(2, 4, 2), (3, 3, 4)]), (2, 5, 4))
+
+
+class MergeChanges_CoversAllDifferences(unittest.TestCase):
+    def runTest(self):
+        rng = random.Random(19)
+        for _ in range(2000):
+            old = ["l%i" % i for i in range(rng.randint(0, 8))]
+            new = list(old)
+            changes = [_change_lines(new, rng) for _ in range(rng.randint(1, 4))]
+            first, old_end, new_end = merge_changes(changes)
+            self.assertEqual(len(old) - old_end, len(new) - new_end, changes)
+            self.assertEqual(old[:first], new[:first], changes)
+            self.assertEqual(old[old_end:], new[new_end:], changes)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+# pylint: skip-file
+
+import unittest
+
+from keyword_chars import KeywordChars, parse_iskeyword
+
+_DEFAULT = "@,48-57,_,192-255"
+
+
+def _chars(text):
+    return frozenset(map(ord, text))
+
+
+class ParseIskeyword_Default(unittest.TestCase):
+    def runTest(self):
+        keyword = parse_iskeyword(_DEFAULT)
+        self.assertTrue(_chars("azAZ09_\xb5\xc0\xd7\xdf\xff") <= keyword)
+        self.assertFalse(_chars("-@#\xa0\xaa\xbf") & keyword)
+
+
+class ParseIskeyword_RangesAndExclusions(unittest.TestCase):
+    def runTest(self):
+        self.assertEqual(parse_iskeyword("a-e,^c"), _chars("abde"))
+        self.assertEqual(parse_iskeyword("48-50,-"), _chars("012-"))
+        self.assertEqual(parse_iskeyword("@-@"), _chars("@"))
+        self.assertEqual(parse_iskeyword("^,,,"), _chars(","))
+        self.assertEqual(parse_iskeyword("^a"), frozenset())
+        self.assertEqual(parse_iskeyword("a, b"), _chars("ab"))
+
+
+class KeywordChars_CharClass(unittest.TestCase):
+    def runTest(self):
+        chars = KeywordChars(_DEFAULT)
+        classes = [chars.char_class(c) for c in " \t\xa0-a 、中\U0001f600"]
+        self.assertEqual(classes, [0, 0, 0, 1, 2, 0, 1, 0x4E00, 3])
+        self.assertEqual(KeywordChars(_DEFAULT + ",-").char_class("-"), 2)
+
+
+class KeywordChars_WordStarts(unittest.TestCase):
+    def runTest(self):
+        chars = KeywordChars(_DEFAULT)
+        self.assertTrue(chars.is_word_start("-a", 1))
+        self.assertTrue(chars.is_word_start("a中", 1))
+        self.assertTrue(chars.is_word_start("a", 0))
+        self.assertFalse(chars.is_word_start("ab", 1))
+        self.assertFalse(chars.is_word_start("a-", 1))
+        # A composing character belongs to the character before it.
+        self.assertFalse(chars.is_word_start("á", 1))
+        self.assertTrue(chars.is_word_start("-́a", 2))
+        self.assertFalse(chars.is_word_start("áb", 2))
+
+
+class KeywordChars_LastWordStart(unittest.TestCase):
+    def runTest(self):
+        chars = KeywordChars(_DEFAULT)
+        self.assertEqual(chars.last_word_start("foo-bar"), 4)
+        self.assertEqual(chars.last_word_start("foo-"), 0)
+        self.assertEqual(chars.last_word_start("a"), 0)
+        self.assertEqual(chars.last_word_start(""), 0)
+        self.assertEqual(chars.last_word_start("xあア"), 2)
+        self.assertEqual(KeywordChars(_DEFAULT + ",-").last_word_start("a-b"), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+# pylint: skip-file
+
+import unittest
+
+from UltiSnips.position import Position
+from UltiSnips.snippet.parsing.lexer import (
+    tokenize,
+    EscapeCharToken,
+    VisualToken,
+    TransformationToken,
+    ChoicesToken,
+    TabStopToken,
+    MirrorToken,
+    PythonCodeToken,
+    VimLCodeToken,
+    ShellCodeToken,
+)
+
+_ALL_TOKENS = [
+    EscapeCharToken,
+    VisualToken,
+    TransformationToken,
+    ChoicesToken,
+    TabStopToken,
+    MirrorToken,
+    PythonCodeToken,
+    VimLCodeToken,
+    ShellCodeToken,
+]
+
+
+def _tokens(text, indent="", offset=Position(0, 0), allowed=_ALL_TOKENS):
+    return [
+        (type(token).__name__, token.start, token.end)
+        for token in tokenize(text, indent, offset, allowed)
+    ]
+
+
+class Tokenize_PositionsOnOneLine(unittest.TestCase):
+    def runTest(self):
+        self.assertEqual(
+            _tokens(r"a ${1:b} \$ $1 `!p snip.rv = 1`", offset=Position(2, 3)),
+            [
+                ("TabStopToken", Position(2, 5), Position(2, 11)),
+                ("EscapeCharToken", Position(2, 12), Position(2, 14)),
+                ("MirrorToken", Position(2, 15), Position(2, 17)),
+                ("PythonCodeToken", Position(2, 18), Position(2, 34)),
+                ("EndOfTextToken", Position(2, 34), Position(2, 34)),
+            ],
+        )
+
+
+class Tokenize_PositionsOverLines(unittest.TestCase):
+    def runTest(self):
+        for newline in ("\n", "\r\n"):
+            text = "a\n${1:b%sc}%s  $2" % (newline, newline)
+            self.assertEqual(
+                _tokens(text, offset=Position(0, 4)),
+                [
+                    ("TabStopToken", Position(1, 0), Position(2, 2)),
+                    ("MirrorToken", Position(3, 2), Position(3, 4)),
+                    ("EndOfTextToken", Position(3, 4), Position(3, 4)),
+                ],
+            )
+            tabstop = next(tokenize(text, "", Position(0, 4), _ALL_TOKENS))
+            self.assertEqual(tabstop.initial_text, "b%sc" % newline)
+
+
+class Tokenize_NestedAndEscapedBraces(unittest.TestCase):
+    def runTest(self):
+        tokens = list(tokenize(r"${1:a${2:\}}b\{}c", "", Position(0, 0), _ALL_TOKENS))
+        self.assertEqual(tokens[0].number, 1)
+        self.assertEqual(tokens[0].initial_text, r"a${2:\}}b\{")
+        self.assertEqual(tokens[0].end, Position(0, 16))
+
+
+class Tokenize_Transformation(unittest.TestCase):
+    def runTest(self):
+        token = next(tokenize(r"${1/a\/b/c/g}", "", Position(0, 0), _ALL_TOKENS))
+        self.assertIsInstance(token, TransformationToken)
+        self.assertEqual(
+            (token.number, token.search, token.replace, token.options),
+            (1, r"a\/b", "c", "g"),
+        )
+
+
+class Tokenize_OnlyAllowedTokensInGivenOrder(unittest.TestCase):
+    def runTest(self):
+        self.assertEqual(
+            [name for name, _, _ in _tokens("`!p x` ${1}", allowed=[ShellCodeToken])],
+            ["ShellCodeToken", "EndOfTextToken"],
+        )
+        self.assertEqual(
+            [name for name, _, _ in _tokens("`!p x`", allowed=[PythonCodeToken])],
+            ["PythonCodeToken", "EndOfTextToken"],
+        )
+
+
+class Tokenize_UnterminatedToken(unittest.TestCase):
+    def runTest(self):
+        self.assertEqual(
+            _tokens("x $1 ${2:abc\nde"),
+            [
+                ("MirrorToken", Position(0, 2), Position(0, 4)),
+                ("EndOfTextToken", Position(1, 2), Position(1, 2)),
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
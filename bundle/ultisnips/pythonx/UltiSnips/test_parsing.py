@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+# pylint: skip-file
+
+import unittest
+
+from UltiSnips.position import Position
+from UltiSnips.snippet.parsing.ulti_snips import parse_static_text
+
+
+class ParseStaticText_PlainText(unittest.TestCase):
+    def runTest(self):
+        self.assertEqual(
+            parse_static_text("if x:\n    pass", ""),
+            ("if x:\n    pass", Position(1, 8)),
+        )
+
+
+class ParseStaticText_FinalTabstop(unittest.TestCase):
+    def runTest(self):
+        for final_tabstop in ("$0", "${0}", "${0:}"):
+            self.assertEqual(
+                parse_static_text("(\n\t%s\n)" % final_tabstop, ""),
+                ("(\n\t\n)", Position(1, 1)),
+            )
+
+
+class ParseStaticText_OtherTokens(unittest.TestCase):
+    def runTest(self):
+        for text in (
+            "$1",
+            "${1:a}$0",
+            "${0:a}",
+            "$0$0",
+            "\\$",
+            "`!p snip.rv = 1`",
+            "`!v 1`",
+            "${VISUAL}",
+        ):
+            self.assertIsNone(parse_static_text(text, ""), text)
+
+
+class ParseStaticText_KeepsTemplate(unittest.TestCase):
+    def runTest(self):
+        templates = {}
+        parse_static_text("a$0b", "  ", templates)
+        self.assertEqual(list(templates), [("a$0b", "  ")])
+
+
+if __name__ == "__main__":
+    unittest.main()
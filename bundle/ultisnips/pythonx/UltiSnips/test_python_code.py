@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+# pylint: skip-file
+
+import unittest
+
+from UltiSnips.text_objects.python_code import (
+    _imports,
+    _loaded_names,
+    _names_defined_once,
+    _names_read_first,
+    _untracked_names,
+    exec_globals,
+)
+
+
+def _compile(code):
+    return compile(code, "<test>", "exec")
+
+
+class LoadedNames_SkipsAttributesAndConstants(unittest.TestCase):
+    def runTest(self):
+        code = _compile("x = a.upper(b, 'c')\nsnip.rv = x")
+        self.assertEqual(_loaded_names(code), {"a", "b", "x", "snip"})
+
+
+class LoadedNames_NestedCode(unittest.TestCase):
+    def runTest(self):
+        code = _compile(
+            "def f():\n"
+            "    return a\n"
+            "g = lambda: b\n"
+            "snip.rv = [c + d for d in e]"
+        )
+        self.assertTrue({"a", "b", "c", "d", "e", "snip"} <= _loaded_names(code))
+
+
+class NamesReadFirst_RebindingBeforeReading(unittest.TestCase):
+    def runTest(self):
+        code = _compile("x = t[1]\nsnip.rv = x + y")
+        self.assertEqual(_names_read_first(code) - {"t", "snip"}, {"y"})
+
+
+class NamesReadFirst_ReadingBeforeRebinding(unittest.TestCase):
+    def runTest(self):
+        code = _compile("x = x.upper()\nsnip.rv = x")
+        self.assertIn("x", _names_read_first(code))
+
+
+class NamesReadFirst_LoopsReadAllNames(unittest.TestCase):
+    def runTest(self):
+        code = _compile("for c in t[1]:\n    x = c\n    snip.rv += x")
+        self.assertTrue({"c", "x"} <= _names_read_first(code))
+
+
+class NamesReadFirst_ComprehensionsReadAllNames(unittest.TestCase):
+    def runTest(self):
+        code = _compile("x = 1\nsnip.rv = [x + y for y in z]")
+        self.assertTrue({"x", "y", "z"} <= _names_read_first(code))
+
+
+class NamesReadFirst_NestedFunctionsReadAllNames(unittest.TestCase):
+    def runTest(self):
+        code = _compile("x = 1\ndef f():\n    return x + y\nsnip.rv = f()")
+        names = _names_read_first(code)
+        self.assertTrue({"x", "y"} <= names)
+        self.assertNotIn("f", names)
+
+
+class Imports_FindsImportsInNestedCode(unittest.TestCase):
+    def runTest(self):
+        self.assertFalse(_imports(_compile("snip.rv = re.sub('a', 'b', t[1])")))
+        self.assertTrue(_imports(_compile("import time")))
+        self.assertTrue(_imports(_compile("def f():\n    from os import path")))
+
+
+class UntrackedNames_ImportedCallables(unittest.TestCase):
+    def runTest(self):
+        code = (
+            "import re, os\n"
+            "from os.path import join\n"
+            "SEP = '/'\n"
+            "def plain():\n"
+            "    return t[1] + SEP\n"
+            "def joined():\n"
+            "    return join(plain(), 'a')\n"
+            "def calls_joined():\n"
+            "    return joined()\n"
+        )
+        exec_globals(code, {})
+        names = _untracked_names(code)
+        self.assertTrue({"os", "join", "joined", "calls_joined", "vim"} <= names)
+        self.assertTrue(names.isdisjoint({"re", "SEP", "plain"}))
+        self.assertIsNone(_untracked_names("import time\nstamp = time.time()"))
+
+
+class GlobalsDefinedOnce_PlainDefinitions(unittest.TestCase):
+    def runTest(self):
+        code = (
+            '"""Helpers."""\n'
+            "import re, os.path\n"
+            "from string import ascii_letters as letters\n"
+            "NAME = 'a'\n"
+            "SIZE: int = -2 * 3\n"
+            "LONGEST = max\n"
+            "FIRST, (SECOND, THIRD) = 1, (NAME, os.sep)\n"
+            "def upper(text, sep=NAME, *, size: int = 1) -> str:\n"
+            "    return time.time()\n"
+        )
+        self.assertEqual(
+            _names_defined_once(code),
+            {
+                "re",
+                "os",
+                "letters",
+                "NAME",
+                "SIZE",
+                "LONGEST",
+                "FIRST",
+                "SECOND",
+                "THIRD",
+                "upper",
+            },
+        )
+
+
+class GlobalsDefinedOnce_RunEveryTime(unittest.TestCase):
+    def runTest(self):
+        for code in [
+            "import time\nstamp = time.time()",
+            "import vim\nft = vim.eval('&ft')",
+            "import vim\nbuffer = vim.current.buffer",
+            "name = snip.basename",
+            "names = ['a']",
+            "names = (name for name in 'ab')",
+            "def twice(f):\n    return f\n@twice\ndef f():\n    pass",
+            "def f(x=[]):\n    pass",
+            "def f(x=t):\n    pass",
+            "class Helper:\n    pass",
+            "if True:\n    NAME = 'a'",
+            "print('loaded')",
+            "NAME = 'a'\n# ultisnips: rerun",
+            "def f(:",
+        ]:
+            self.assertIsNone(_names_defined_once(code), code)
+
+
+class ExecGlobals_RunsOnce(unittest.TestCase):
+    def runTest(self):
+        code = (
+            "from types import SimpleNamespace as Namespace\n"
+            "NAME = 'a'\n"
+            "def first():\n"
+            "    return t[0]\n"
+        )
+        first = {"t": ["one"]}
+        exec_globals(code, first)
+        self.assertEqual((first["NAME"], first["first"]()), ("a", "one"))
+
+        second = {"t": ["two"]}
+        exec_globals(code, second)
+        self.assertEqual((second["NAME"], second["first"]()), ("a", "two"))
+        self.assertIs(second["Namespace"], first["Namespace"])
+        self.assertEqual(first["first"](), "one")
+
+
+class ExecGlobals_RunsEveryTime(unittest.TestCase):
+    def runTest(self):
+        code = "calls.append(len(calls))\nCOUNT = len(calls)"
+        calls = []
+        for count in (1, 2):
+            namespace = {"calls": calls}
+            exec_globals(code, namespace)
+            self.assertEqual(namespace["COUNT"], count)
+
+
+class ExecGlobals_FailureRunsAgain(unittest.TestCase):
+    def runTest(self):
+        code = "from os import path\nfrom missing_module_for_test import name"
+        for _ in range(2):
+            with self.assertRaises(ImportError):
+                exec_globals(code, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
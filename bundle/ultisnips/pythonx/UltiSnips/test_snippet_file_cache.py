@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+# pylint: skip-file
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from UltiSnips.snippet.source.file.cache import SnippetFileCache
+
+
+def _parse(data, filename):
+    _parse.calls += 1
+    for line in data.splitlines():
+        head, _, tail = line.partition(" ")
+        if head == "error":
+            yield "error", (tail, 1)
+        else:
+            yield head, (tail,)
+
+
+class _CacheBase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmp, "all.snippets")
+        self.cache = SnippetFileCache(os.path.join(self.tmp, "cache"))
+        _parse.calls = 0
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def write(self, content, mtime=None):
+        with open(self.filename, "w") as f:
+            f.write(content)
+        if mtime is not None:
+            os.utime(self.filename, ns=(mtime, mtime))
+
+    def events(self):
+        return self.cache.events_for(self.filename, _parse)
+
+    def entries(self):
+        return [f for f in os.listdir(self.cache.directory) if f.endswith(".json")]
+
+
+class SnippetFileCache_HitAfterMiss(_CacheBase):
+    def runTest(self):
+        self.write("snippet a\nextends b")
+        first = self.events()
+        second = self.events()
+        self.assertEqual(first, [("snippet", ("a",)), ("extends", ("b",))])
+        self.assertEqual(
+            [(e, tuple(d)) for e, d in second], [(e, tuple(d)) for e, d in first]
+        )
+        self.assertEqual(_parse.calls, 1)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+        self.assertEqual(self.cache.hit_rate, 0.5)
+
+
+class SnippetFileCache_ChangedContentIsStale(_CacheBase):
+    def runTest(self):
+        self.write("snippet a", mtime=10**9)
+        self.events()
+        # Same size and mtime, only the hash differs.
+        self.write("snippet b", mtime=10**9)
+        self.assertEqual(self.events(), [("snippet", ("b",))])
+        self.assertEqual(_parse.calls, 2)
+        self.assertEqual(len(self.entries()), 1)
+
+
+class SnippetFileCache_CorruptEntryIsDropped(_CacheBase):
+    def runTest(self):
+        self.write("snippet a")
+        self.events()
+        (entry,) = self.entries()
+        with open(os.path.join(self.cache.directory, entry), "w") as f:
+            f.write("{not json")
+        self.assertEqual(self.events(), [("snippet", ("a",))])
+        self.assertEqual(_parse.calls, 2)
+        self.assertEqual(self.cache.hits, 0)
+
+
+class SnippetFileCache_ErrorsAreNotCached(_CacheBase):
+    def runTest(self):
+        self.write("snippet a\nerror broken")
+        self.events()
+        self.events()
+        self.assertEqual(_parse.calls, 2)
+        self.assertFalse(os.path.exists(self.cache.directory) and self.entries())
+
+
+if __name__ == "__main__":
+    unittest.main()
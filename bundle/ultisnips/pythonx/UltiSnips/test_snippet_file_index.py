@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+# pylint: skip-file
+
+from collections import defaultdict
+import os
+import shutil
+import tempfile
+import unittest
+
+from UltiSnips.snippet.source.file.index import SnippetFileIndex
+
+
+def _scan(directory):
+    files = defaultdict(set)
+    subdirectories = []
+    if os.path.isdir(directory):
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if os.path.isdir(path):
+                subdirectories.append(path)
+                files[name].update(os.path.join(path, n) for n in os.listdir(path))
+            else:
+                files[name.split(".")[0]].add(path)
+    return files, subdirectories
+
+
+class _IndexBase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.dirs = [os.path.join(self.tmp, d) for d in ("one", "two")]
+        for d in self.dirs:
+            os.mkdir(d)
+        self.index = SnippetFileIndex(_scan)
+        self.directory_calls = 0
+        self.mtime = 10**9
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def directories(self):
+        self.directory_calls += 1
+        return self.dirs
+
+    def update(self, key="rtp"):
+        self.index.update(key, self.directories)
+
+    def touch(self, *parts):
+        path = os.path.join(self.tmp, *parts)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        open(path, "w").close()
+        # Make sure the mtime of the directory changes even on file systems
+        # with coarse timestamps.
+        self.mtime += 10**9
+        os.utime(os.path.dirname(path), ns=(self.mtime, self.mtime))
+        return path
+
+
+class SnippetFileIndex_ScansOnlyOnce(_IndexBase):
+    def runTest(self):
+        a = self.touch("one", "c.snippets")
+        b = self.touch("two", "c", "x.snippets")
+        self.update()
+        self.update()
+        self.assertEqual(self.index.files_for("c"), {a, b})
+        self.assertEqual(self.index.files_for("python"), set())
+        self.assertEqual(self.index.scans, 2)
+        self.assertEqual(self.directory_calls, 1)
+
+
+class SnippetFileIndex_RescansChangedDirectory(_IndexBase):
+    def runTest(self):
+        a = self.touch("one", "c.snippets")
+        self.update()
+        b = self.touch("two", "c", "x.snippets")
+        self.update()
+        self.assertEqual(self.index.files_for("c"), {a, b})
+        self.assertEqual(self.index.scans, 3)
+        c = self.touch("two", "c", "y.snippets")
+        self.update()
+        self.assertEqual(self.index.files_for("c"), {a, b, c})
+        self.assertEqual(self.index.scans, 4)
+
+
+class SnippetFileIndex_NewKeyRecomputesDirectories(_IndexBase):
+    def runTest(self):
+        a = self.touch("one", "c.snippets")
+        b = self.touch("two", "c.snippets")
+        self.update()
+        self.dirs = self.dirs[:1]
+        self.update("other rtp")
+        self.assertEqual(self.index.files_for("c"), {a})
+        self.assertEqual(self.index.directories, self.dirs)
+        self.assertEqual(self.directory_calls, 2)
+        # 'one' was already scanned and did not change.
+        self.assertEqual(self.index.scans, 2)
+
+
+class SnippetFileIndex_RaisingDirectoriesAreComputedAgain(_IndexBase):
+    def runTest(self):
+        def raising():
+            self.directory_calls += 1
+            raise ValueError("bad setting")
+
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                self.index.update("rtp", raising)
+        self.assertEqual(self.directory_calls, 2)
+        self.update()
+        self.assertEqual(self.index.directories, self.dirs)
+
+
+if __name__ == "__main__":
+    unittest.main()
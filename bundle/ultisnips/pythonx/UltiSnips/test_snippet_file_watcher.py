@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+# pylint: skip-file
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from UltiSnips.snippet.source.file.watcher import SnippetFileWatcher
+
+
+class _WatcherBase(unittest.TestCase):
+    use_inotify = True
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.watcher = SnippetFileWatcher(
+            debounce=0.2, poll_interval=60, use_inotify=self.use_inotify
+        )
+        self.notifications = []
+        self.notified = threading.Event()
+        self.watcher.add_listener(self.listener)
+
+    def tearDown(self):
+        self.watcher.close()
+        shutil.rmtree(self.tmp)
+
+    def listener(self, paths):
+        self.notifications.append(paths)
+        self.notified.set()
+
+    def write(self, name, content="snippet a\n"):
+        path = os.path.join(self.tmp, name)
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+
+class _InotifyBase(_WatcherBase):
+    def setUp(self):
+        _WatcherBase.setUp(self)
+        if not self.watcher.uses_inotify:
+            self.skipTest("inotify is not available")
+        self.watcher.watch([self.tmp])
+
+
+class SnippetFileWatcher_ReportsChangedFile(_InotifyBase):
+    def runTest(self):
+        path = self.write("all.snippets")
+        self.assertTrue(self.notified.wait(5))
+        self.assertEqual(self.notifications, [{path}])
+
+
+class SnippetFileWatcher_DebouncesBursts(_InotifyBase):
+    def runTest(self):
+        paths = {self.write("a%i.snippets" % i) for i in range(20)}
+        os.remove(self.write("gone.snippets"))
+        self.assertTrue(self.notified.wait(5))
+        self.assertEqual(len(self.notifications), 1)
+        self.assertEqual(
+            self.notifications[0], paths | {os.path.join(self.tmp, "gone.snippets")}
+        )
+
+
+class SnippetFileWatcher_FallsBackToPolling(_WatcherBase):
+    use_inotify = False
+
+    def runTest(self):
+        self.assertFalse(self.watcher.uses_inotify)
+        self.watcher.watch([self.tmp])
+        self.watcher.poll()
+        self.watcher.poll()  # Too soon, so nothing happens.
+        self.assertEqual(self.notifications, [None])
+
+
+if __name__ == "__main__":
+    unittest.main()
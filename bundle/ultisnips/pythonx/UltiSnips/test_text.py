@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+
+# pylint: skip-file
+
+import re
+import unittest
+
+from text import LineIterator
+
+_END = re.compile(r"\nend[^\S\n]*$", re.MULTILINE)
+
+
+class _LineIteratorBase:
+    text = ""
+
+    def test_lines_like_splitlines(self):
+        lines = LineIterator(self.text)
+        self.assertEqual(list(lines), self.text.splitlines(True))
+        self.assertEqual(lines.line_index, len(self.text.splitlines()))
+
+    def test_read_until(self):
+        lines = LineIterator(self.text)
+        self.assertEqual(next(lines).rstrip(), "start")
+        block, found = lines.read_until(_END)
+        self.assertTrue(found)
+        self.assertEqual(block, "".join(self.text.splitlines(True)[1:4]))
+        self.assertEqual(lines.line_index, 4)
+        self.assertEqual(next(lines).rstrip(), "end")
+        self.assertEqual(lines.line_index, 5)
+
+    def test_read_until_without_match(self):
+        lines = LineIterator(self.text)
+        for _ in range(5):
+            next(lines)
+        block, found = lines.read_until(_END)
+        self.assertFalse(found)
+        self.assertEqual(block, "".join(self.text.splitlines(True)[5:]))
+        self.assertEqual(lines.line_index, len(self.text.splitlines()))
+        self.assertIsNone(lines.peek())
+
+
+class LineIterator_Newlines(_LineIteratorBase, unittest.TestCase):
+    text = "start\none\n endnot\nend x\nend  \nlast\nno newline"
+
+
+class LineIterator_CarriageReturnNewlines(_LineIteratorBase, unittest.TestCase):
+    text = "start\r\none\r\n endnot\r\nend x\r\nend  \r\nlast\r\n"
+
+
+class LineIterator_OtherLineBreaks(_LineIteratorBase, unittest.TestCase):
+    text = "start\rone\x0c endnot\u2028end x\nend \x85last\r\nno newline"
+
+
+if __name__ == "__main__":
+    unittest.main()
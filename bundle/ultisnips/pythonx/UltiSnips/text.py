@@ -3,29 +3,23 @@
 
 """Utilities to deal with text."""
 
+import re
+
+_ESCAPED_CHAR = re.compile(r"\\(.)", re.DOTALL)
+
 
 def unescape(text):
     """Removes '\\' escaping from 'text'."""
-    rv = ""
-    i = 0
-    while i < len(text):
-        if i + 1 < len(text) and text[i] == "\\":
-            rv += text[i + 1]
-            i += 1
-        else:
-            rv += text[i]
-        i += 1
-    return rv
+    if "\\" not in text:
+        return text
+    return _ESCAPED_CHAR.sub(r"\1", text)
 
 
 def escape(text, chars):
     """Escapes all characters in 'chars' in text using backspaces."""
-    rv = ""
-    for char in text:
-        if char in chars:
-            rv += "\\"
-        rv += char
-    return rv
+    if not chars:
+        return text
+    return re.sub("([%s])" % re.escape(chars), r"\\\1", text)
 
 
 def fill_in_whitespace(text):
@@ -41,42 +35,95 @@ def fill_in_whitespace(text):
 def head_tail(line):
     """Returns the first word in 'line' and the rest of 'line' or None if the
     line is too short."""
-    generator = (t.strip() for t in line.split(None, 1))
-    head = next(generator).strip()
-    tail = ""
-    try:
-        tail = next(generator).strip()
-    except StopIteration:
-        pass
-    return head, tail
+    parts = line.split(None, 1)
+    if len(parts) == 1:
+        return parts[0], ""
+    return parts[0], parts[1].strip()
+
+
+# Everything str.splitlines() splits on, besides "\n" and "\r".
+_OTHER_LINE_BREAKS = "\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029"
+_LINE_BREAK = re.compile("\r\n|[\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]")
 
 
 class LineIterator:
-    """Convenience class that keeps track of line numbers in files."""
+    """Convenience class that keeps track of line numbers in files.
+
+    Lines are split like str.splitlines(True) does, but the text is never
+    copied into a list of lines. Instead we keep the offset of the next line,
+    so that blocks of lines can be sliced out of the text in one go.
+    """
 
     def __init__(self, text):
-        self._line_index = -1
-        self._lines = list(text.splitlines(True))
+        self._text = text
+        self._offset = 0
+        self._line_index = 0
+        # Most files only contain "\n" line breaks, which we can find and
+        # count without regular expressions.
+        self._only_newlines = not any(
+            char in text for char in _OTHER_LINE_BREAKS
+        ) and text.count("\r") == text.count("\r\n")
 
     def __iter__(self):
         return self
 
+    def _line_end(self, offset):
+        if self._only_newlines:
+            return self._text.find("\n", offset) + 1 or len(self._text)
+        match = _LINE_BREAK.search(self._text, offset)
+        return len(self._text) if match is None else match.end()
+
     def __next__(self):
         """Returns the next line."""
-        if self._line_index + 1 < len(self._lines):
-            self._line_index += 1
-            return self._lines[self._line_index]
-        raise StopIteration()
+        start = self._offset
+        text = self._text
+        if start >= len(text):
+            raise StopIteration()
+        if self._only_newlines:
+            end = text.find("\n", start) + 1 or len(text)
+        else:
+            end = self._line_end(start)
+        self._offset = end
+        self._line_index += 1
+        return text[start:end]
 
     @property
     def line_index(self):
         """The 1 based line index in the current file."""
-        return self._line_index + 1
+        return self._line_index
 
     def peek(self):
         """Returns the next line (if there is any, otherwise None) without
         advancing the iterator."""
-        try:
-            return self._lines[self._line_index + 1]
-        except IndexError:
+        if self._offset >= len(self._text):
             return None
+        return self._text[self._offset : self._line_end(self._offset)]
+
+    def read_until(self, pattern):
+        """Advances to the next line matching the compiled regular expression
+        'pattern' without consuming it. Returns the text of all lines that were
+        skipped and whether a matching line was found.
+
+        'pattern' must match a newline followed by the line, so that the regular
+        expression engine can quickly skip to candidates, and must not match
+        across further line breaks.
+        """
+        start = self._offset
+        text = self._text
+        if self._only_newlines and start:
+            # text[start - 1] is the "\n" ending the current line.
+            match = pattern.search(text, start - 1)
+            end = len(text) if match is None else match.start() + 1
+            block = text[start:end]
+            self._line_index += block.count("\n")
+            if block and block[-1] != "\n":
+                self._line_index += 1
+            self._offset = end
+            return block, match is not None
+        while True:
+            line = self.peek()
+            if line is None:
+                return text[start:], False
+            if pattern.match("\n" + line):
+                return text[start : self._offset], True
+            next(self)
@@ -3,6 +3,8 @@
 
 """Base classes for all text objects."""
 
+from bisect import bisect_left, bisect_right, insort
+
 from UltiSnips import vim_helper
 from UltiSnips.position import Position
 
@@ -36,6 +38,30 @@ def _replace_text(buf, start, end, text):
     return new_end
 
 
+def _count_starting_before(objects, pos, or_at=False):
+    """Returns how many of the text 'objects', which are sorted by their start,
+    start before 'pos' or, if 'or_at' is True, at 'pos'."""
+    low, high = 0, len(objects)
+    while low < high:
+        middle = (low + high) // 2
+        start = objects[middle]._start
+        if start < pos or (or_at and start == pos):
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+def _move_all(objects, pivot, diff):
+    """Move the text 'objects', which are sorted by their start, by 'diff'
+    while 'pivot' is the point of change."""
+    for obj in objects:
+        # A change within a line does not move objects on later lines.
+        if not diff.line and obj._start.line > pivot.line:
+            break
+        obj._move(pivot, diff)
+
+
 # These classes use their subclasses a lot and we really do not want to expose
 # their functions more globally.
 # pylint: disable=protected-access
@@ -67,34 +93,14 @@ class TextObject:
         self._end.move(pivot, diff)
 
     def __lt__(self, other):
-        me_tuple = (
-            self.start.line,
-            self.start.col,
-            self._tiebreaker.line,
-            self._tiebreaker.col,
-        )
-        other_tuple = (
-            other._start.line,
-            other._start.col,
-            other._tiebreaker.line,
-            other._tiebreaker.col,
-        )
-        return me_tuple < other_tuple
+        if self._start != other._start:
+            return self._start < other._start
+        return self._tiebreaker < other._tiebreaker
 
     def __le__(self, other):
-        me_tuple = (
-            self._start.line,
-            self._start.col,
-            self._tiebreaker.line,
-            self._tiebreaker.col,
-        )
-        other_tuple = (
-            other._start.line,
-            other._start.col,
-            other._tiebreaker.line,
-            other._tiebreaker.col,
-        )
-        return me_tuple <= other_tuple
+        if self._start != other._start:
+            return self._start < other._start
+        return self._tiebreaker <= other._tiebreaker
 
     def __repr__(self):
         ct = ""
@@ -159,6 +165,38 @@ class TextObject:
         """
         raise NotImplementedError("Must be implemented by subclasses.")
 
+    def _needs_update(self, text_of):
+        """Return True if this object has to be updated in this edit cycle.
+
+        'text_of' maps text objects to their current text.
+
+        """
+        return True
+
+    def _is_stale(self, text_of):
+        """Return True if text this object was updated from has changed since,
+        so that it has to be updated again in this edit cycle.
+
+        Objects that do not keep track of this return False and are updated
+        until _update() returns True instead.
+
+        """
+        return False
+
+    def _dependencies(self):
+        """Text objects whose text this object read when it was last
+        updated."""
+        return ()
+
+    def _reads_locals(self):
+        """True if this object might read the python locals set by the
+        objects before it in the text that return True here."""
+        return False
+
+    def _describe(self):
+        """A short description of this object for error messages."""
+        return self.__class__.__name__
+
 
 class EditableTextObject(TextObject):
     """This base class represents any object in the text that can be changed by
@@ -167,7 +205,9 @@ class EditableTextObject(TextObject):
     def __init__(self, *args, **kwargs):
         TextObject.__init__(self, *args, **kwargs)
         self._children = []
+        self._editable = None
         self._tabstops = {}
+        self._tabstop_index = None
 
     ##############
     # Properties #
@@ -180,16 +220,21 @@ class EditableTextObject(TextObject):
     @property
     def _editable_children(self):
         """List of all children that are EditableTextObjects."""
-        return [
-            child for child in self._children if isinstance(child, EditableTextObject)
-        ]
+        if self._editable is None:
+            self._editable = [
+                child
+                for child in self._children
+                if isinstance(child, EditableTextObject)
+            ]
+        return self._editable
 
     ####################
     # Public Functions #
     ####################
     def find_parent_for_new_to(self, pos):
         """Figure out the parent object for something at 'pos'."""
-        for children in self._editable_children:
+        candidates = self._editable_children
+        for children in candidates[: _count_starting_before(candidates, pos, True)]:
             if children._start <= pos < children._end:
                 return children.find_parent_for_new_to(pos)
             if children._start == pos and pos == children._end:
@@ -205,13 +250,24 @@ class EditableTextObject(TextObject):
         assert ("\n" not in text) or (text == "\n")
         pos = Position(line, col)
 
+        # Children that start after the edit cannot take it.
+        if ctype == "I":
+            candidates = _count_starting_before(self._children, pos, True)
+        else:
+            delend = (
+                Position(line, col + len(text))
+                if text != "\n"
+                else Position(line + 1, 0)
+            )
+            candidates = _count_starting_before(self._children, delend)
+
         to_kill = set()
         new_cmds = []
-        for child in self._children:
+        for child in self._children[:candidates]:
             if ctype == "I":  # Insertion
-                if child._start < pos < Position(
-                    child._end.line, child._end.col
-                ) and isinstance(child, NoneditableTextObject):
+                if child._start < pos < child._end and isinstance(
+                    child, NoneditableTextObject
+                ):
                     to_kill.add(child)
                     new_cmds.append(cmd)
                     break
@@ -227,11 +283,6 @@ class EditableTextObject(TextObject):
                     child._do_edit(cmd, ctab)
                     return
             else:  # Deletion
-                delend = (
-                    pos + Position(0, len(text))
-                    if text != "\n"
-                    else Position(line + 1, 0)
-                )
                 if (child._start <= pos < child._end) and (
                     child._start < delend <= child._end
                 ):
@@ -280,26 +331,22 @@ class EditableTextObject(TextObject):
                 return
             delta.line *= -1
             delta.col *= -1
-        pivot = Position(line, col)
         idx = -1
-        for cidx, child in enumerate(self._children):
-            if child._start < pivot <= child._end:
+        for cidx in range(_count_starting_before(self._children, pos) - 1, -1, -1):
+            if pos <= self._children[cidx]._end:
                 idx = cidx
-        self._child_has_moved(idx, pivot, delta)
+                break
+        self._child_has_moved(idx, pos, delta)
 
     def _move(self, pivot, diff):
         TextObject._move(self, pivot, diff)
-
-        for child in self._children:
-            child._move(pivot, diff)
+        _move_all(self._children, pivot, diff)
 
     def _child_has_moved(self, idx, pivot, diff):
         """Called when a the child with 'idx' has moved behind 'pivot' by
         'diff'."""
         self._end.move(pivot, diff)
-
-        for child in self._children[idx + 1 :]:
-            child._move(pivot, diff)
+        _move_all(self._children[idx + 1 :], pivot, diff)
 
         if self._parent:
             self._parent._child_has_moved(
@@ -308,51 +355,50 @@ class EditableTextObject(TextObject):
 
     def _get_next_tab(self, number):
         """Returns the next tabstop after 'number'."""
-        if not len(self._tabstops.keys()):
-            return
-        tno_max = max(self._tabstops.keys())
-
-        possible_sol = []
-        i = number + 1
-        while i <= tno_max:
-            if i in self._tabstops:
-                possible_sol.append((i, self._tabstops[i]))
-                break
-            i += 1
-
-        child = [c._get_next_tab(number) for c in self._editable_children]
-        child = [c for c in child if c]
-
-        possible_sol += child
-
-        if not len(possible_sol):
+        numbers, tabstops = self._get_tabstop_index()
+        idx = bisect_right(numbers, number)
+        if idx == len(numbers):
             return None
-
-        return min(possible_sol)
+        number = numbers[idx]
+        return number, min(tabstops[number])
 
     def _get_prev_tab(self, number):
         """Returns the previous tabstop before 'number'."""
-        if not len(self._tabstops.keys()):
-            return
-        tno_min = min(self._tabstops.keys())
-
-        possible_sol = []
-        i = number - 1
-        while i >= tno_min and i > 0:
-            if i in self._tabstops:
-                possible_sol.append((i, self._tabstops[i]))
-                break
-            i -= 1
-
-        child = [c._get_prev_tab(number) for c in self._editable_children]
-        child = [c for c in child if c]
+        numbers, tabstops = self._get_tabstop_index()
+        idx = bisect_left(numbers, number) - 1
+        if idx < 0 or numbers[idx] <= 0:
+            return None
+        number = numbers[idx]
+        return number, max(tabstops[number])
 
-        possible_sol += child
+    def _get_tabstop_index(self):
+        """Returns the sorted numbers of the tabstops that can be jumped to in
+        this object and a dict mapping each number to the tabstops with it.
 
-        if not len(possible_sol):
-            return None
+        The tabstops of children are only reachable if this object has
+        tabstops of its own.
+        """
+        if self._tabstop_index is None:
+            tabstops = {}
+            self._collect_tabstops(tabstops)
+            self._tabstop_index = sorted(tabstops), tabstops
+        return self._tabstop_index
+
+    def _collect_tabstops(self, tabstops):
+        """Adds the tabstops reachable from this object to 'tabstops'."""
+        if not self._tabstops:
+            return
+        for number, tabstop in self._tabstops.items():
+            tabstops.setdefault(number, []).append(tabstop)
+        for child in self._editable_children:
+            child._collect_tabstops(tabstops)
 
-        return max(possible_sol)
+    def _tabstops_changed(self):
+        """Forgets the tabstop index of this object and all its parents."""
+        obj = self
+        while obj is not None:
+            obj._tabstop_index = None
+            obj = obj._parent
 
     def _get_tabstop(self, requester, number):
         """Returns the tabstop 'number'.
@@ -379,13 +425,23 @@ class EditableTextObject(TextObject):
 
     def _add_child(self, child):
         """Add 'child' as a new child of this text object."""
-        self._children.append(child)
-        self._children.sort()
+        insort(self._children, child)
+        self._editable = None
+        if isinstance(child, EditableTextObject):
+            self._tabstops_changed()
+
+    def _add_tabstop(self, tabstop):
+        """Makes 'tabstop' reachable under its number from this object."""
+        self._tabstops[tabstop.number] = tabstop
+        self._tabstops_changed()
 
     def _del_child(self, child):
         """Delete this 'child'."""
         child._parent = None
         self._children.remove(child)
+        self._editable = None
+        if isinstance(child, EditableTextObject):
+            self._tabstops_changed()
 
         # If this is a tabstop, delete it. Might have been deleted already if
         # it was nested.
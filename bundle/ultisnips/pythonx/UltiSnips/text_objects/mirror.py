@@ -12,6 +12,7 @@ class Mirror(NoneditableTextObject):
     def __init__(self, parent, tabstop, token):
         NoneditableTextObject.__init__(self, parent, token)
         self._ts = tabstop
+        self._ts_text = None  # The text of the tabstop when last updated.
 
     def _update(self, done, buf):
         if self._ts.is_killed:
@@ -22,13 +23,29 @@ class Mirror(NoneditableTextObject):
         if self._ts not in done:
             return False
 
-        self.overwrite(buf, self._get_text())
+        self._ts_text = self._ts.current_text
+        self.overwrite(buf, self._get_text(self._ts_text))
         return True
 
-    def _get_text(self):
-        """Returns the text used for mirroring.
+    def _needs_update(self, text_of):
+        return self._ts_text is None or self._is_stale(text_of)
+
+    def _is_stale(self, text_of):
+        if self._ts_text is None or self._parent is None:
+            return False
+        return self._ts.is_killed or text_of[self._ts] != self._ts_text
+
+    def _dependencies(self):
+        return (self._ts,)
+
+    def _describe(self):
+        return "mirror of $%i" % self._ts.number
+
+    def _get_text(self, text):
+        """Returns the text used for mirroring 'text', the text of the
+        tabstop.
 
         Overwritten by base classes.
 
         """
-        return self._ts.current_text
+        return text
@@ -3,8 +3,13 @@
 
 """Implements `!p ` interpolation."""
 
+import ast
+import builtins
+import dis
 import os
+import re
 from collections import namedtuple
+from types import CodeType, FunctionType, ModuleType
 
 from UltiSnips import vim_helper
 from UltiSnips.indent_util import IndentUtil
@@ -22,17 +27,321 @@ def cached_compile(*args):
     return compile(*args)
 
 
+# Global blocks containing this line are executed every time instead of once.
+_RERUN_GLOBALS = re.compile(r"^[ \t]*#[ \t]*ultisnips:[ \t]*rerun[ \t]*$", re.MULTILINE)
+
+# Python code using one of these names might read anything, so it runs after
+# every change instead of only when the tabstops it read have changed.
+_UNTRACKED_NAMES = frozenset(["vim", "eval", "exec", "globals", "locals", "vars"])
+
+# Modules whose functions only depend on their arguments. Python code may use
+# them and still only run when the tabstops it read have changed.
+_PURE_MODULES = frozenset(["re", "string"])
+
+# Names that are set before each run of python code.
+_RUN_NAMES = frozenset(["t", "fn", "path", "cur", "res", "snip"])
+
+_MISSING = object()
+
+
+def _differ(old, new):
+    """True if the values 'old' and 'new' of a name are not the same."""
+    if old is new:
+        return False
+    if old is _MISSING or new is _MISSING:
+        return True
+    try:
+        return bool(old != new)
+    except Exception:  # pylint:disable=broad-except
+        return True
+
+
+@lru_cache(maxsize=None)
+def _loaded_names(code):
+    """The names that 'code' and the code nested in it read, not counting
+    attributes."""
+    names = set()
+    for instruction in dis.get_instructions(code):
+        opname = instruction.opname
+        if (
+            not opname.startswith("LOAD")
+            or opname.startswith("LOAD_CONST")
+            or "ATTR" in opname
+            or "METHOD" in opname
+        ):
+            continue
+        argval = instruction.argval
+        if isinstance(argval, str):
+            names.add(argval)
+        elif isinstance(argval, tuple):
+            names.update(name for name in argval if isinstance(name, str))
+    for const in code.co_consts:
+        if isinstance(const, CodeType):
+            names.update(_loaded_names(const))
+    return frozenset(names)
+
+
+@lru_cache(maxsize=None)
+def _names_read_first(code):
+    """The names that 'code' might read before it sets them itself. The
+    instructions are walked in order; nested code and loops might read a name
+    at any time, so all their names count."""
+    loaded = _loaded_names(code)
+    stored = set()
+    names = set()
+    for instruction in dis.get_instructions(code):
+        opname = instruction.opname
+        argval = instruction.argval
+        if isinstance(argval, str):
+            argval = (argval,)
+        if (
+            instruction.opcode in dis.hasjrel or instruction.opcode in dis.hasjabs
+        ) and (isinstance(argval, int) and argval < instruction.offset):
+            return loaded
+        if not isinstance(argval, tuple) or "ATTR" in opname:
+            continue
+        if opname.startswith(("STORE", "DELETE")):
+            stored.update(argval)
+        elif opname.startswith("LOAD"):
+            names.update(name for name in argval if name not in stored)
+    for const in code.co_consts:
+        if isinstance(const, CodeType):
+            names.update(_loaded_names(const))
+    return frozenset(names & loaded)
+
+
+# Expressions that might run code or create objects that code could change.
+_UNSAFE_EXPRESSIONS = (
+    ast.Call,
+    ast.Lambda,
+    ast.NamedExpr,
+    ast.List,
+    ast.Set,
+    ast.Dict,
+    ast.ListComp,
+    ast.SetComp,
+    ast.DictComp,
+    ast.GeneratorExp,
+    ast.Await,
+    ast.Yield,
+    ast.YieldFrom,
+)
+
+
+def _is_constant(node, bound):
+    """True if the expression 'node' gives the same value every time, given
+    that the names in 'bound' do. Only names in 'bound' and builtins may be
+    read, except for 'vim'."""
+    if node is None:
+        return True
+    for child in ast.walk(node):
+        if isinstance(child, _UNSAFE_EXPRESSIONS):
+            return False
+        if isinstance(child, ast.Name) and (
+            child.id == "vim"
+            or (child.id not in bound and not hasattr(builtins, child.id))
+        ):
+            return False
+    return True
+
+
+def _is_plain_function(node, bound):
+    """True if defining the function 'node' does not run any code."""
+    arguments = node.args
+    annotations = [node.returns] + [
+        argument.annotation
+        for argument in arguments.posonlyargs
+        + arguments.args
+        + arguments.kwonlyargs
+        + [arguments.vararg, arguments.kwarg]
+        if argument is not None
+    ]
+    return not node.decorator_list and all(
+        _is_constant(expression, bound)
+        for expression in annotations + arguments.defaults + arguments.kw_defaults
+    )
+
+
+def _target_names(target):
+    """The names assigned by 'target' or None if it assigns anything else."""
+    if isinstance(target, ast.Name):
+        return [target.id]
+    if isinstance(target, (ast.Tuple, ast.List)):
+        names = []
+        for element in target.elts:
+            element_names = _target_names(element)
+            if element_names is None:
+                return None
+            names.extend(element_names)
+        return names
+    return None
+
+
+@lru_cache(maxsize=None)
+def _names_defined_once(code):
+    """The names that the top level of the globals 'code' defines if they are
+    the same every time it runs, so that it only needs to run once. That is
+    the case if it only imports, defines functions without decorators and
+    assigns constants. None if 'code' has to run every time because it calls
+    code or reads 'vim' at the top level, or asks for it."""
+    if _RERUN_GLOBALS.search(code):
+        return None
+    try:
+        module = ast.parse(code)
+    except SyntaxError:
+        return None
+    bound = set()
+    for statement in module.body:
+        if isinstance(statement, (ast.Import, ast.ImportFrom)):
+            bound.update(
+                (alias.asname or alias.name).split(".")[0]
+                for alias in statement.names
+                if alias.name != "*"
+            )
+        elif isinstance(statement, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            if not _is_plain_function(statement, bound):
+                return None
+            bound.add(statement.name)
+        elif isinstance(statement, (ast.Assign, ast.AnnAssign)):
+            targets = getattr(statement, "targets", None) or [statement.target]
+            names = [_target_names(target) for target in targets]
+            if None in names or not _is_constant(statement.value, bound):
+                return None
+            if isinstance(statement, ast.AnnAssign) and not _is_constant(
+                statement.annotation, bound
+            ):
+                return None
+            bound.update(name for target_names in names for name in target_names)
+        elif isinstance(statement, ast.Expr):
+            if not isinstance(statement.value, ast.Constant):
+                return None
+        elif not isinstance(statement, ast.Pass):
+            return None
+    return frozenset(bound)
+
+
+# Globals code that runs once -> the names it defined and their values, and
+# the names of the functions among them.
+_globals_runs = {}
+
+
+def _globals_names(code):
+    """The names that the globals 'code' defined when it ran, if it runs once
+    and has run."""
+    return _globals_runs[code][0]
+
+
+def exec_globals(code, namespace):
+    """Updates the dict 'namespace' as if the globals 'code', the content of
+    the global !p blocks, was executed in it.
+
+    If _names_defined_once() knows the names of 'code', it only runs the first
+    time. Afterwards the names it defined are copied over, and the functions
+    it defined are recreated so that they see the names in 'namespace', like
+    't' and 'snip'.
+    """
+    if code not in _globals_runs:
+        names = _names_defined_once(code)
+        before = None if names is None else dict(namespace)
+        exec(cached_compile(code, "<global-snippets>", "exec"), namespace)
+        if names is None:
+            return
+        # The names of star imports are only known now.
+        defined = {
+            name: value
+            for name, value in namespace.items()
+            if name in names
+            or (
+                name != "__builtins__"
+                and (name not in before or value is not before[name])
+            )
+        }
+        functions = tuple(
+            name
+            for name, value in defined.items()
+            if isinstance(value, FunctionType) and value.__globals__ is namespace
+        )
+        _globals_runs[code] = (defined, functions)
+        return
+    defined, functions = _globals_runs[code]
+    namespace.update(defined)
+    for name in functions:
+        function = defined[name]
+        rebound = FunctionType(
+            function.__code__,
+            namespace,
+            function.__name__,
+            function.__defaults__,
+            function.__closure__,
+        )
+        rebound.__kwdefaults__ = function.__kwdefaults__
+        rebound.__qualname__ = function.__qualname__
+        rebound.__doc__ = function.__doc__
+        rebound.__dict__.update(function.__dict__)
+        namespace[name] = rebound
+
+
+@lru_cache(maxsize=None)
+def _untracked_names(code):
+    """The names that make python code run after every change when the
+    globals 'code' defines them: _UNTRACKED_NAMES, the modules and callables
+    that 'code' got from elsewhere, as they might read anything, and the
+    functions of 'code' that use one of them. Only the modules in
+    _PURE_MODULES are trusted. None if all python code has to run after every
+    change, because 'code' runs every time.
+
+    'code' must have run, see exec_globals()."""
+    if _names_defined_once(code) is None:
+        return None
+    defined, functions = _globals_runs[code]
+    names = set(_UNTRACKED_NAMES)
+    for name, value in defined.items():
+        if name in functions:
+            continue
+        if isinstance(value, ModuleType):
+            if value.__name__ not in _PURE_MODULES:
+                names.add(name)
+        elif callable(value):
+            names.add(name)
+    definitions = [
+        (const.co_name, _loaded_names(const))
+        for const in cached_compile(code, "<global-snippets>", "exec").co_consts
+        if isinstance(const, CodeType)
+    ]
+    changed = True
+    while changed:
+        changed = False
+        for name, loaded in definitions:
+            if name not in names and not names.isdisjoint(loaded):
+                names.add(name)
+                changed = True
+    return frozenset(names)
+
+
+@lru_cache(maxsize=None)
+def _imports(code):
+    """True if 'code' or the code nested in it imports a module."""
+    return any(
+        instruction.opname.startswith("IMPORT")
+        for instruction in dis.get_instructions(code)
+    ) or any(_imports(const) for const in code.co_consts if isinstance(const, CodeType))
+
+
 class _Tabs:
     """Allows access to tabstop content via t[] inside of python code."""
 
     def __init__(self, to):
         self._to = to
+        self.used = {}  # number -> (tabstop or None, its text)
 
     def __getitem__(self, no):
         ts = self._to._get_tabstop(self._to, int(no))  # pylint:disable=protected-access
         if ts is None:
+            self.used[int(no)] = (None, None)
             return ""
-        return ts.current_text
+        text = ts.current_text
+        self.used[int(no)] = (ts, text)
+        return text
 
     def __setitem__(self, no, value):
         ts = self._to._get_tabstop(self._to, int(no))  # pylint:disable=protected-access
@@ -40,6 +349,7 @@ class _Tabs:
             return
         # TODO(sirver): The buffer should be passed into the object on construction.
         ts.overwrite(vim_helper.buf, value)
+        self.used[int(no)] = (ts, ts.current_text)
 
 
 _VisualContent = namedtuple("_VisualContent", ["mode", "text"])
@@ -82,6 +392,8 @@ class SnippetUtil:
         self._cur = cur
         self._rv = ""
         self._changed = False
+        self._reads_c = False
+        self._reads_vim = False
         self.reset_indent()
 
     def shift(self, amount=1):
@@ -133,13 +445,15 @@ class SnippetUtil:
 
     # Utility methods
     @property
-    def fn(self):  # pylint:disable=no-self-use,invalid-name
+    def fn(self):  # pylint:disable=invalid-name
         """The filename."""
+        self._reads_vim = True
         return vim_helper.eval('expand("%:t")') or ""
 
     @property
-    def basename(self):  # pylint:disable=no-self-use
+    def basename(self):
         """The filename without extension."""
+        self._reads_vim = True
         return vim_helper.eval('expand("%:t:r")') or ""
 
     @property
@@ -170,6 +484,7 @@ class SnippetUtil:
     @property
     def c(self):  # pylint:disable=invalid-name
         """The current text of the placeholder."""
+        self._reads_c = True
         return self._cur
 
     @property
@@ -179,6 +494,7 @@ class SnippetUtil:
 
     @property
     def p(self):
+        self._reads_vim = True
         if self._parent.current_placeholder:
             return self._parent.current_placeholder
         return _Placeholder("", 0, 0)
@@ -187,8 +503,9 @@ class SnippetUtil:
     def context(self):
         return self._context
 
-    def opt(self, option, default=None):  # pylint:disable=no-self-use
+    def opt(self, option, default=None):
         """Gets a Vim variable."""
+        self._reads_vim = True
         if vim_helper.eval("exists('%s')" % option) == "1":
             try:
                 return vim_helper.eval(option)
@@ -215,6 +532,7 @@ class SnippetUtil:
         """
         Returns start of the snippet in format (line, column).
         """
+        self._reads_vim = True
         return self._start
 
     @property
@@ -222,10 +540,12 @@ class SnippetUtil:
         """
         Returns end of the snippet in format (line, column).
         """
+        self._reads_vim = True
         return self._end
 
     @property
     def buffer(self):
+        self._reads_vim = True
         return vim_helper.buf
 
 
@@ -247,27 +567,30 @@ class PythonCode(NoneditableTextObject):
                 snippet = snippet._parent  # pylint:disable=protected-access
         self._snip = SnippetUtil(token.indent, mode, text, context, snippet)
 
-        self._codes = (
-            "import re, os, vim, string, random\n"
-            + "\n".join(snippet.globals.get("!p", [])).replace("\r\n", "\n"),
-            token.code.replace("\\`", "`"),
-        )
-        self._compiled_codes = (
-            snippet._compiled_globals
-            or cached_compile(self._codes[0], "<exec-globals>", "exec"),
-            cached_compile(
-                token.code.replace("\\`", "`"), "<exec-interpolation-code>", "exec"
-            ),
+        self._globals_code = "import re, os, vim, string, random\n" + "\n".join(
+            snippet.globals.get("!p", [])
+        ).replace("\r\n", "\n")
+        self._code = token.code.replace("\\`", "`")
+        self._compiled_code = cached_compile(
+            self._code, "<exec-interpolation-code>", "exec"
         )
 
+        # What the last run read, to know when to run again.
+        self._has_run = False
+        self._untracked = True
+        self._tabs_used = {}
+        self._own_text = None
+        self._locals_read = {}
+
         NoneditableTextObject.__init__(self, parent, token)
 
     def _update(self, done, buf):
         path = vim_helper.eval('expand("%")') or ""
         ct = self.current_text
+        tabs = _Tabs(self._parent)
         self._locals.update(
             {
-                "t": _Tabs(self._parent),
+                "t": tabs,
                 "fn": os.path.basename(path),
                 "path": path,
                 "cur": ct,
@@ -277,18 +600,89 @@ class PythonCode(NoneditableTextObject):
         )
         self._snip._reset(ct)  # pylint:disable=protected-access
 
-        for code, compiled_code in zip(self._codes, self._compiled_codes):
-            try:
-                exec(compiled_code, self._locals)  # pylint:disable=exec-used
-            except Exception as exception:
-                exception.snippet_code = code
-                raise
+        try:
+            exec_globals(self._globals_code, self._locals)
+        except Exception as exception:
+            exception.snippet_code = self._globals_code
+            raise
+        before = dict(self._locals)
+        try:
+            exec(self._compiled_code, self._locals)  # pylint:disable=exec-used
+        except Exception as exception:
+            exception.snippet_code = self._code
+            raise
 
         rv = str(
             self._snip.rv if self._snip._rv_changed else self._locals["res"]
         )  # pylint:disable=protected-access
+        self._remember_run(tabs, ct, before)
 
         if ct != rv:
             self.overwrite(buf, rv)
+            return not self._untracked
+        return True
+
+    def _remember_run(self, tabs, ct, before):
+        """Remembers what the run that just finished read. 'ct' was the text
+        of this object and 'before' a copy of the locals before the run."""
+        # pylint:disable=protected-access
+        self._has_run = True
+        loaded = _loaded_names(self._compiled_code)
+        untracked = _untracked_names(self._globals_code)
+        self._untracked = (
+            untracked is None
+            or self._snip._reads_vim
+            or not untracked.isdisjoint(loaded)
+            or _imports(self._compiled_code)
+        )
+        self._tabs_used = tabs.used
+        self._own_text = None
+        if self._snip._reads_c or "cur" in loaded or "res" in loaded:
+            self._own_text = ct
+        self._locals_read = {}
+        if self._untracked:
+            return
+        globals_names = _globals_names(self._globals_code)
+        read_first = _names_read_first(self._compiled_code)
+        for name in loaded - _RUN_NAMES:
+            if name in globals_names:
+                continue
+            new = self._locals.get(name, _MISSING)
+            # Names this run has set before reading them are not read from
+            # other blocks. The value after the run is remembered, so that a
+            # block rebinding a name it read only runs again when another
+            # block changes the name.
+            if name in read_first or not _differ(before.get(name, _MISSING), new):
+                self._locals_read[name] = new
+
+    def _needs_update(self, text_of):
+        return not self._has_run or self._untracked or self._is_stale(text_of)
+
+    def _is_stale(self, text_of):
+        if not self._has_run or self._untracked or self._parent is None:
             return False
+        if self._own_text is not None and text_of[self] != self._own_text:
+            return True
+        for number, (ts, text) in self._tabs_used.items():
+            # pylint:disable=protected-access
+            if self._parent._get_tabstop(self._parent, number) is not ts:
+                return True
+            if ts is not None and text_of[ts] != text:
+                return True
+        return any(
+            _differ(old, self._locals.get(name, _MISSING))
+            for name, old in self._locals_read.items()
+        )
+
+    def _dependencies(self):
+        dependencies = [ts for ts, _ in self._tabs_used.values() if ts is not None]
+        if self._own_text is not None:
+            dependencies.append(self)
+        return dependencies
+
+    def _reads_locals(self):
         return True
+
+    def _describe(self):
+        lines = self._code.strip().splitlines() or [""]
+        return "`!p %s%s`" % (lines[0], " ..." if len(lines) > 1 else "")
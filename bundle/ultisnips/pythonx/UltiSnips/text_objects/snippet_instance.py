@@ -9,18 +9,112 @@ also a TextObject.
 
 """
 
+from heapq import heapify, heappop, heappush
+
 from UltiSnips import vim_helper
 from UltiSnips.error import PebkacError
 from UltiSnips.position import Position, JumpDirection
 from UltiSnips.text_objects.base import EditableTextObject, NoneditableTextObject
 from UltiSnips.text_objects.tabstop import TabStop
 
+# pylint:disable=protected-access
+
+
+class _TextCache(dict):
+    """Maps text objects to their current text, reading each only once."""
+
+    def __missing__(self, obj):
+        try:
+            text = obj.current_text
+        except IndexError:
+            text = None
+        self[obj] = text
+        return text
+
+
+def _dependency_graph(objects):
+    """Maps each of 'objects' to the ones that have to be updated after it:
+    its parent, which contains its text, the objects that read its text and
+    the next python code, which might read its locals."""
+    graph = {obj: [] for obj in objects}
+    for obj in objects:
+        if obj._parent in graph:
+            graph[obj].append(obj._parent)
+        for dependency in obj._dependencies():
+            if dependency in graph:
+                graph[dependency].append(obj)
+    readers = sorted(obj for obj in objects if obj._reads_locals())
+    for obj, next_reader in zip(readers, readers[1:]):
+        graph[obj].append(next_reader)
+    return graph
+
+
+def _in_dependency_order(graph):
+    """Returns the objects of 'graph' so that each comes after the ones it
+    depends on. Ties and cycles are broken by the position in the text."""
+    order = sorted(graph)
+    rank = {obj: idx for idx, obj in enumerate(order)}
+    indegree = dict.fromkeys(order, 0)
+    for obj in order:
+        for successor in graph[obj]:
+            if successor is not obj:
+                indegree[successor] += 1
+    ready = [rank[obj] for obj in order if not indegree[obj]]
+    heapify(ready)
+    emitted = set()
+    first_unemitted = 0
+    rv = []
+    while len(rv) < len(order):
+        if not ready:
+            while order[first_unemitted] in emitted:
+                first_unemitted += 1
+            ready.append(first_unemitted)
+        obj = order[heappop(ready)]
+        emitted.add(obj)
+        rv.append(obj)
+        for successor in graph[obj]:
+            if successor is obj or successor in emitted:
+                continue
+            indegree[successor] -= 1
+            if not indegree[successor]:
+                heappush(ready, rank[successor])
+    return rv
+
+
+def _find_cycle(graph, starts):
+    """Returns a cycle in 'graph' reachable from one of 'starts' as a list of
+    objects that starts and ends with the same object, or None."""
+    visited = set()
+    for start in starts:
+        if start in visited:
+            continue
+        visited.add(start)
+        path = [start]
+        stack = [iter(graph[start])]
+        while stack:
+            for successor in stack[-1]:
+                if successor in path:
+                    cycle = path[path.index(successor) :]
+                    # Start at a tabstop if there is one, that reads best.
+                    for idx, obj in enumerate(cycle):
+                        if isinstance(obj, EditableTextObject):
+                            cycle = cycle[idx:] + cycle[:idx]
+                            break
+                    return cycle + cycle[:1]
+                if successor not in visited:
+                    visited.add(successor)
+                    path.append(successor)
+                    stack.append(iter(graph[successor]))
+                    break
+            else:
+                path.pop()
+                stack.pop()
+    return None
+
 
 class SnippetInstance(EditableTextObject):
     """See module docstring."""
 
-    # pylint:disable=protected-access
-
     def __init__(
         self,
         snippet,
@@ -32,7 +126,6 @@ class SnippetInstance(EditableTextObject):
         last_re,
         globals,
         context,
-        _compiled_globals=None,
     ):
         if start is None:
             start = Position(0, 0)
@@ -42,9 +135,9 @@ class SnippetInstance(EditableTextObject):
         self._cts = 0
 
         self.context = context
+        self.last_re = last_re
         self.locals = {"match": last_re, "context": context}
         self.globals = globals
-        self._compiled_globals = _compiled_globals
         self.visual_content = visual_content
         self.current_placeholder = None
 
@@ -77,12 +170,13 @@ class SnippetInstance(EditableTextObject):
         """
         done = set()
         not_done = set()
+        cursor = vim_helper.buf.cursor
 
         def _find_recursive(obj):
             """Finds all text objects and puts them into 'not_done'."""
             cursorInsideLowest = None
             if isinstance(obj, EditableTextObject):
-                if obj.start <= vim_helper.buf.cursor <= obj.end and not (
+                if obj.start <= cursor <= obj.end and not (
                     isinstance(obj, TabStop) and obj.number == 0
                 ):
                     cursorInsideLowest = obj
@@ -94,19 +188,40 @@ class SnippetInstance(EditableTextObject):
         cursorInsideLowest = _find_recursive(self)
         if cursorInsideLowest is not None:
             vc = _VimCursor(cursorInsideLowest)
+
+        # Objects whose input has not changed since their last update are
+        # left alone. The others are updated in dependency order, and so are
+        # the objects that have become stale by that. Objects that are
+        # independent of each other keep their order in the text, which
+        # matters for python locals.
+        text_of = _TextCache()
+        done.update(obj for obj in not_done if not obj._needs_update(text_of))
         counter = 10
         while (done != not_done) and counter:
-            # Order matters for python locals!
-            for obj in sorted(not_done - done):
+            for obj in _in_dependency_order(_dependency_graph(not_done)):
+                if obj in done:
+                    if not obj._is_stale(text_of):
+                        continue
+                    done.discard(obj)
                 if obj._update(done, buf):
                     done.add(obj)
+                text_of.clear()
+            done.difference_update([obj for obj in done if obj._is_stale(text_of)])
             counter -= 1
         if not counter:
+            cycle = _find_cycle(_dependency_graph(not_done), sorted(not_done - done))
+            if cycle is None:
+                raise PebkacError(
+                    "The snippets content did not converge: Check for Cyclic "
+                    "dependencies or random strings in your snippet. You can "
+                    "use 'if not snip.c' to make sure to only expand random "
+                    "output once."
+                )
             raise PebkacError(
-                "The snippets content did not converge: Check for Cyclic "
-                "dependencies or random strings in your snippet. You can use "
-                "'if not snip.c' to make sure to only expand random output "
-                "once."
+                "The snippets content did not converge because of the cyclic "
+                "dependency %s. You can use 'if not snip.c' to make sure to "
+                "only expand random output once."
+                % " -> ".join(obj._describe() for obj in cycle)
             )
         if cursorInsideLowest is not None:
             vc.to_vim()
@@ -165,6 +280,9 @@ class SnippetInstance(EditableTextObject):
     def get_tabstops(self):
         return self._tabstops
 
+    def _describe(self):
+        return "snippet %r" % self.snippet.trigger
+
 
 class _VimCursor(NoneditableTextObject):
     """Helper class to keep track of the Vim Cursor when text objects expand
@@ -21,7 +21,7 @@ class TabStop(EditableTextObject):
         else:
             self._number = token.number
             EditableTextObject.__init__(self, parent, token)
-        parent._tabstops[self._number] = self  # pylint:disable=protected-access
+        parent._add_tabstop(self)  # pylint:disable=protected-access
 
     @property
     def number(self):
@@ -34,6 +34,9 @@ class TabStop(EditableTextObject):
         no longer jump to it."""
         return self._parent is None
 
+    def _describe(self):
+        return "$%i" % self._number
+
     def __repr__(self):
         try:
             text = self.current_text
@@ -171,5 +171,8 @@ class Transformation(Mirror, TextObjectTransformation):
         Mirror.__init__(self, parent, ts, token)
         TextObjectTransformation.__init__(self, token)
 
-    def _get_text(self):
-        return self._transform(self._ts.current_text)
+    def _get_text(self, text):
+        return self._transform(text)
+
+    def _describe(self):
+        return "transformation of $%i" % self._ts.number
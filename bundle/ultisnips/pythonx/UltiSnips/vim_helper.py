@@ -4,48 +4,100 @@
 """Wrapper functionality around the functions we need from Vim."""
 
 from contextlib import contextmanager
+from functools import wraps
 import os
 import platform
 
 from UltiSnips.compatibility import col2byte, byte2col
 from UltiSnips.error import PebkacError
+from UltiSnips.keyword_chars import KeywordChars
 from UltiSnips.position import Position
 from UltiSnips.snippet.source.file.common import normalize_file_path
 from vim import error  # pylint:disable=import-error,unused-import
 import vim  # pylint:disable=import-error
 
+# Number of round trips to Vim made through this module. The buffer and window
+# accessors below count every access of the vim module they make.
+_round_trips = 0
+_round_trips_per_event = {}  # event -> [times handled, round trips]
+
+
+def _count_round_trips(count=1):
+    global _round_trips  # pylint:disable=global-statement
+    _round_trips += count
+
+
+def counts_round_trips(func):
+    """Decorator that adds the round trips made during a call of 'func' to
+    round_trip_stats() under the name of 'func'."""
+
+    @wraps(func)
+    def wrapper(*args, **kwds):
+        start = _round_trips
+        try:
+            return func(*args, **kwds)
+        finally:
+            stats = _round_trips_per_event.setdefault(func.__name__, [0, 0])
+            stats[0] += 1
+            stats[1] += _round_trips - start
+
+    return wrapper
+
+
+def round_trip_stats():
+    """Returns a dict mapping the names of the functions decorated with
+    counts_round_trips() to how often they were called and the round trips to
+    Vim they made in total."""
+    return {event: tuple(stats) for event, stats in _round_trips_per_event.items()}
+
+
+def reset_round_trip_stats():
+    """Forgets the counts of round_trip_stats()."""
+    _round_trips_per_event.clear()
+
+
+def split_filetypes(filetype):
+    """Returns the filetypes in the dotted 'filetype' value."""
+    return [ft for ft in filetype.split(".") if ft]
+
 
 class VimBuffer:
     """Wrapper around the current Vim buffer."""
 
     def __getitem__(self, idx):
+        _count_round_trips()
         return vim.current.buffer[idx]
 
     def __setitem__(self, idx, text):
+        _count_round_trips()
         vim.current.buffer[idx] = text
 
     def __len__(self):
+        _count_round_trips()
         return len(vim.current.buffer)
 
     # This is a workaround for a bug in Neovim's Python layer. See here for
     # context https://github.com/SirVer/ultisnips/issues/1041
     def __iter__(self):
+        _count_round_trips()
         return iter(vim.current.buffer)
 
     @property
     def line_till_cursor(self):  # pylint:disable=no-self-use
         """Returns the text before the cursor."""
         _, col = self.cursor
+        _count_round_trips()
         return vim.current.line[:col]
 
     @property
     def number(self):  # pylint:disable=no-self-use
         """The bufnr() of the current buffer."""
+        _count_round_trips()
         return vim.current.buffer.number
 
     @property
     def filetypes(self):
-        return [ft for ft in vim.eval("&filetype").split(".") if ft]
+        return split_filetypes(eval("&filetype"))
 
     @property
     def cursor(self):  # pylint:disable=no-self-use
@@ -55,6 +107,8 @@ class VimBuffer:
         different from Vim's cursor.
 
         """
+        # Converting the column reads the line and 'encoding'.
+        _count_round_trips(3)
         line, nbyte = vim.current.window.cursor
         col = byte2col(line, nbyte)
         return Position(line - 1, col)
@@ -62,6 +116,7 @@ class VimBuffer:
     @cursor.setter
     def cursor(self, pos):  # pylint:disable=no-self-use
         """See getter."""
+        _count_round_trips(3)
         nbyte = col2byte(pos.line + 1, pos.col)
         vim.current.window.cursor = pos.line + 1, nbyte
 
@@ -119,21 +174,54 @@ def escape(inp):
 
 def command(cmd):
     """Wraps vim.command."""
+    _count_round_trips()
     return vim.command(cmd)
 
 
 def eval(text):
     """Wraps vim.eval."""
+    _count_round_trips()
     # Replace null bytes with newlines, as vim raises a ValueError and neovim
     # treats it as a terminator for the entire command.
     text = text.replace("\x00", "\n")
     return vim.eval(text)
 
 
+def eval_all(expressions):
+    """Evaluates all 'expressions' with one round trip to Vim and returns
+    their values in a list, as eval() would return them one by one."""
+    return eval("[%s]" % ", ".join(expressions))
+
+
+# 'iskeyword' value -> KeywordChars. Keyed by the value rather than the
+# buffer, because filetype plugins change 'iskeyword' without triggering
+# OptionSet.
+_keyword_chars = {}
+
+# At most this many parsed 'iskeyword' values are kept.
+_MAX_KEYWORD_CHARS = 32
+
+
+def keyword_chars(iskeyword=None):
+    """The KeywordChars for the 'iskeyword' of the current buffer. Callers
+    that already read the option pass its value as 'iskeyword'."""
+    if iskeyword is None:
+        iskeyword = eval("&iskeyword")
+    chars = _keyword_chars.get(iskeyword)
+    if chars is None:
+        if len(_keyword_chars) >= _MAX_KEYWORD_CHARS:
+            _keyword_chars.clear()
+        chars = KeywordChars(iskeyword)
+        _keyword_chars[iskeyword] = chars
+    return chars
+
+
 def bindeval(text):
     """Wraps vim.bindeval."""
+    _count_round_trips()
     rv = vim.bindeval(text)
     if not isinstance(rv, (dict, list)):
+        _count_round_trips()
         return rv.decode(vim.eval("&encoding"), "replace")
     return rv
 
@@ -7,6 +7,8 @@ from collections import deque, namedtuple
 
 from UltiSnips import vim_helper
 from UltiSnips.compatibility import byte2col
+from UltiSnips.diff import common_prefix_length
+from UltiSnips.edit_source import EditSource
 from UltiSnips.position import Position
 
 _Placeholder = namedtuple("_FrozenPlaceholder", ["current_text", "start", "end"])
@@ -34,6 +36,11 @@ class VimState:
     def __init__(self):
         self._poss = deque(maxlen=5)
         self._lvb = None
+        self._lvb_start = 0
+        # True while the buffer only differs from the remembered one in the
+        # lines reported by the edit source.
+        self._lvb_is_current = False
+        self._edit_source = EditSource()
 
         self._text_to_expect = ""
         self._unnamed_reg_cached = False
@@ -73,10 +80,104 @@ class VimState:
         """Remember the current position as a previous pose."""
         self._poss.append(VimPosition())
 
+    def start_tracking_changes(self):
+        """Let Vim report the lines that change in the current buffer, if it
+        can."""
+        self._edit_source.start()
+
+    def stop_tracking_changes(self):
+        """Stop tracking the changes to the buffer."""
+        self._edit_source.stop()
+        self._lvb_is_current = False
+
+    def _update_remembered_lines(self, changed, first=None, extra_lines=0):
+        """Copies the lines of the buffer that replaced the remembered ones in
+        the merged change 'changed', extended to start at 'first' and by
+        'extra_lines' after its end.
+
+        Returns (first, old lines, new lines) or None if the change is not
+        within the remembered lines.
+        """
+        changed_first, old_end, new_end = changed
+        if first is None:
+            first = changed_first
+        start = self._lvb_start
+        end = start + len(self._lvb)
+        if changed_first < start or old_end > end:
+            return None
+        first = max(start, min(first, changed_first))
+        extra_lines = min(extra_lines, end - old_end)
+        old_end += extra_lines
+        new_end += extra_lines
+        old_lines = self._lvb[first - start : old_end - start]
+        new_lines = vim_helper.buf[first:new_end]
+        self._lvb[first - start : old_end - start] = new_lines
+        return first, old_lines, new_lines
+
+    def changed_text(self, to):
+        """Returns (initial line, old lines, new lines) for the lines of 'to'
+        changed since the buffer was remembered. This includes the lines of
+        the last two cursor positions and one line before the changes.
+
+        Only the lines that changed are read from the buffer if Vim reports
+        them, otherwise the text of 'to' is compared with the remembered one.
+        """
+        changed = self._edit_source.changed_lines()
+        if self._lvb_is_current and self._edit_source.tracking:
+            if changed is None:
+                return self.pos.line, [], []
+            _, old_end, new_end = changed
+            rv = self._update_remembered_lines(
+                changed,
+                min(self.ppos.line, self.pos.line) - 1,
+                max(0, self.ppos.line + 1 - old_end, self.pos.line + 1 - new_end),
+            )
+            if rv is not None:
+                return rv
+        self._lvb_is_current = False
+        return self._compare_with_buffer(to)
+
+    def _compare_with_buffer(self, to):
+        """Compares the text of 'to' with the remembered lines, see
+        changed_text()."""
+        cstart = to.start.line
+        cend = to.end.line + self.diff_in_buffer_length
+        ct = vim_helper.buf[cstart : cend + 1]
+        lt = self._lvb
+        lt_end, ct_end = len(lt), len(ct)
+        first = 0
+
+        # Cut down on lines searched for changes. Remove all equal lines from
+        # behind, then from the front, but keep the lines of the cursor
+        # positions. Only the remaining lines are copied.
+        if lt and ct:
+            suffix = min(
+                common_prefix_length(lt[::-1], ct[::-1]),
+                cstart + lt_end - 1 - self.ppos.line,
+                cstart + ct_end - 1 - self.pos.line,
+            )
+            lt_end -= max(0, suffix)
+            ct_end -= max(0, suffix)
+            first = min(
+                common_prefix_length(lt[:lt_end], ct[:ct_end]),
+                min(self.ppos.line, self.pos.line) - cstart + 1,
+            )
+        first = max(0, first - 1)
+        return cstart + first, lt[first:lt_end], ct[first:ct_end]
+
     def remember_buffer(self, to):
         """Remember the content of the buffer and the position."""
-        self._lvb = vim_helper.buf[to.start.line : to.end.line + 1]
+        changed = self._edit_source.changed_lines()
+        if not (
+            self._lvb_is_current
+            and (changed is None or self._update_remembered_lines(changed))
+            and self._lvb_start == to.start.line
+            and len(self._lvb) == to.end.line + 1 - to.start.line
+        ):
+            self._lvb = vim_helper.buf[to.start.line : to.end.line + 1]
+            self._lvb_start = to.start.line
         self._lvb_len = len(vim_helper.buf)
+        self._lvb_is_current = self._edit_source.tracking
         self.remember_position()
 
     @property
@@ -95,11 +196,6 @@ class VimState:
         """The second to last remembered position."""
         return self._poss[-2]
 
-    @property
-    def remembered_buffer(self):
-        """The content of the remembered buffer."""
-        return self._lvb[:]
-
 
 class VisualContentPreserver:
     """Saves the current visual selection and the selection mode it was done in
@@ -116,19 +212,23 @@ class VisualContentPreserver:
 
     def conserve(self):
         """Save the last visual selection and the mode it was made in."""
-        sl, sbyte = map(
-            int, (vim_helper.eval("""line("'<")"""), vim_helper.eval("""col("'<")"""))
-        )
-        el, ebyte = map(
-            int, (vim_helper.eval("""line("'>")"""), vim_helper.eval("""col("'>")"""))
+        sl, sbyte, el, ebyte, self._mode, selection = vim_helper.eval_all(
+            [
+                """line("'<")""",
+                """col("'<")""",
+                """line("'>")""",
+                """col("'>")""",
+                "visualmode()",
+                "&selection",
+            ]
         )
+        sl, sbyte, el, ebyte = map(int, (sl, sbyte, el, ebyte))
         sc = byte2col(sl, sbyte - 1)
         ec = byte2col(el, ebyte - 1)
-        self._mode = vim_helper.eval("visualmode()")
 
         # When 'selection' is 'exclusive', the > mark is one column behind the
         # actual content being copied, but never before the < mark.
-        if vim_helper.eval("&selection") == "exclusive":
+        if selection == "exclusive":
             if not (sl == el and sbyte == ebyte):
                 ec -= 1
 
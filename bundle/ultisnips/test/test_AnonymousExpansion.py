@@ -63,3 +63,27 @@ class Anon_Trigger_Opts(_AnonBase):
     args = '"simple expand", ".*abc", "desc", "r"'
     keys = "blah blah abc" + EA
     wanted = "simple expand"
+
+
+class Anon_Nested_ActionsSeeTheirOwnMatch(_VimTest):
+    keys = "x1" + EA + "x2" + EA + JF + JF + JF + JF + ESC + ":put =g:matches\n"
+    wanted = "<<a> b> b\n122211"
+
+    def _extra_vim_config(self, vim_config):
+        self._create_file(
+            "expand_anon.py",
+            r"""
+from UltiSnips import UltiSnips_Manager
+
+def expand_anon_with_action():
+    UltiSnips_Manager.expand_anon(
+        "<${1:a}> ${2:b}", r"x(\d)", "", "r", None,
+        {"post_jump": "vim.command(\"let g:matches .= '%s'\" % match.group(1))"})
+    return ""
+""",
+        )
+        vim_config.append("py3file %s" % (self.name_temp("expand_anon.py")))
+        vim_config.append("let g:matches = ''")
+        vim_config.append(
+            "inoremap <silent> %s <C-R>=py3eval('expand_anon_with_action()')<cr>" % EA
+        )
@@ -90,3 +90,19 @@ class Autotrigger_GlobalDisableThenToggle(_VimTest):
         """}
     keys = "a" + ESC + ":call UltiSnips#ToggleAutoTrigger()\n" + "o" + "a"
     wanted = "a\nautotriggered"
+
+
+class Autotrigger_SnippetAddedAfterTyping(_VimTest):
+    files = {"us/all.snippets": r"""
+        snippet xy "desc" A
+        autotriggered
+        endsnippet
+        """}
+    keys = (
+        "ab xy"
+        + ESC
+        + ':call UltiSnips#AddSnippetWithPriority("ab", "added", "", "A", "all", 0)\n'
+        + "o"
+        + "ab xy"
+    )
+    wanted = "ab autotriggered\nadded autotriggered"
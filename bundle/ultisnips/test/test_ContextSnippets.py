@@ -132,6 +132,21 @@ class ContextSnippets_ReportError(_VimTest):
     expected_error = r"NameError: name 'Tru' is not defined"
 
 
+class ContextSnippets_BrokenContextOfOtherSnippetIsNotCompiled(_VimTest):
+    files = {"us/all.snippets": r"""
+        snippet e "desc" "if (" e
+        error
+        endsnippet
+
+        snippet f "desc"
+        fine
+        endsnippet
+        """}
+
+    keys = "f" + EX
+    wanted = "fine"
+
+
 class ContextSnippets_ReportErrorOnIndexOutOfRange(_VimTest):
     # Working around: https://github.com/neovim/python-client/issues/128.
     skip_if = lambda self: "Bug in Neovim." if self.vim_flavor == "neovim" else None
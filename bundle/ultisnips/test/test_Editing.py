@@ -97,6 +97,12 @@ class DeleteCurrentTabStop3_JumpAround(_VimTest):
     wanted = "hello\nendworld"
 
 
+class SubstituteAcrossLines_TabStopsSurvive(_VimTest):
+    snippets = ("test", "${1:ab}\n\n${2:cd} ${3:e}\n")
+    keys = "test" + EX + ESC + ":3s/d \\(e\\)\\n/\\1/\n" + "i" + JF + JF + "X"
+    wanted = "ab\n\ncX"
+
+
 # Test for Bug #774917
 
 
@@ -16,6 +16,12 @@ class SimpleExpandTwice_ExpectCorrectResult(_SimpleExpands):
     wanted = "Hallo Welt!\nHallo Welt!"
 
 
+class ExpandTwiceAtOtherPosition_ExpectCorrectResult(_VimTest):
+    snippets = ("test", "(${1:b} $1 ${1/b/c/} ${2:d})")
+    keys = "test" + EX + JF + JF + " xx test" + EX + "e" + JF + "f"
+    wanted = "(b b c d) xx (e e e f)"
+
+
 class SimpleExpandNewLineAndBackspae_ExpectCorrectResult(_SimpleExpands):
     keys = "hallo" + EX + "\nHallo Welt!\n\n\b\b\b\b\b"
     wanted = "Hallo Welt!\nHallo We"
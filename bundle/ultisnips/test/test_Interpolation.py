@@ -442,6 +442,63 @@ snip.rv = "nothing"` `!p snip.rv = a
     wanted = """hi nothing test End"""
 
 
+class PythonCode_Locals_FollowChanges(_VimTest):
+    snippets = ("test", r"""${1:a} `!p b = t[1]` `!p snip.rv = b.upper()`""")
+    keys = "test" + EX + "hi"
+    wanted = "hi  HI"
+
+
+class PythonCode_Locals_ReadAndRebound(_VimTest):
+    snippets = ("test", r"""${1:a} `!p x = t[1]` `!p x = x.upper(); snip.rv = x`""")
+    keys = "test" + EX + "hi"
+    wanted = "hi  HI"
+
+
+class PythonCode_Locals_UntrackedRunsAfterEarlierBlocks(_VimTest):
+    snippets = ("test", r"""`!p a = t[1]` `!p snip.rv = a.upper() + snip.ft` ${1:x}""")
+    keys = "test" + EX + "hi"
+    wanted = " HI hi"
+
+
+class PythonCode_RunsOnlyWhenUsedTabstopsChange(_VimTest):
+    snippets = (
+        "test",
+        r"""${1:a} ${2:b} `!p snip.runs = getattr(snip, "runs", 0) + 1
+snip.rv = t[1] + str(snip.runs)`""",
+    )
+    keys = "test" + EX + JF + "hello"
+    wanted = "a hello a1"
+
+
+class PythonCode_ImportedHelper_RunsAfterEveryChange(_VimTest):
+    files = {"us/all.snippets": r"""
+        global !p
+        from os import getenv
+        endglobal
+
+        snippet test
+        ${1:a} `!p snip.rv = getenv("ULTISNIPS_TEST_VALUE")`
+        endsnippet
+        """}
+    keys = (
+        ESC
+        + ":let $ULTISNIPS_TEST_VALUE = 'one'\n"
+        + "itest"
+        + EX
+        + "b"
+        + ESC
+        + ":let $ULTISNIPS_TEST_VALUE = 'two'\n"
+        + "ac"
+    )
+    wanted = "bc two"
+
+
+class PythonCode_CyclicDependency_ReportsCycle(_VimTest):
+    snippets = ("test", r"""${1:`!p snip.rv = t[1] + "x"`}""")
+    keys = "test" + EX
+    expected_error = r'cyclic dependency \$1 -> `!p snip.rv = t\[1\] \+ "x"` -> \$1'
+
+
 class PythonCode_LongerTextThanSource_Chars(_VimTest):
     snippets = ("test", r"""hi`!p snip.rv = "a" * 100`end""")
     keys = """test""" + EX + "ups"
@@ -68,3 +68,14 @@ class Multiple_ManySnippetsOneTrigger_ECR(_VimTest):
     )
     keys = "test" + EX + " " + ESC + ESC + "ahi"
     wanted = "testhi"
+
+
+class Multiple_DifferentOptionsKeepDefinitionOrder_ECR(_VimTest):
+    snippets = (
+        ("test", "Case1", "This is Case 1", "i"),
+        ("test", "Case2", "This is Case 2"),
+        ("test", "Case3", "This is Case 3", "w"),
+        ("t(es)t", "Case4", "This is Case 4", "r"),
+    )
+    keys = "test" + EX + "2\n"
+    wanted = "Case2"
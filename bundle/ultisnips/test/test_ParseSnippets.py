@@ -273,6 +273,123 @@ endsnippet
     wanted = "x first a bob b y"
 
 
+class ParseSnippets_Global_Python_SeesLocals(_VimTest):
+    files = {"us/all.snippets": r"""
+        global !p
+        def upper_first():
+            return t[1].upper()
+        endglobal
+
+        snippet ab
+        $1 `!p snip.rv = upper_first()`
+        endsnippet
+        """}
+    keys = "ab" + EX + "hi"
+    wanted = "hi HI"
+
+
+class ParseSnippets_Global_Python_ClassSeesLocals(_VimTest):
+    files = {"us/all.snippets": r"""
+        global !p
+        class Helper:
+            @staticmethod
+            def upper_first():
+                return t[1].upper()
+        endglobal
+
+        snippet ab
+        $1 `!p snip.rv = Helper.upper_first()`
+        endsnippet
+        """}
+    keys = "ab" + EX + "hi"
+    wanted = "hi HI"
+
+
+class ParseSnippets_Global_Python_DecoratedFunctionSeesLocals(_VimTest):
+    files = {"us/all.snippets": r"""
+        global !p
+        def twice(function):
+            def wrapper():
+                return function() * 2
+            return wrapper
+
+        @twice
+        def upper_first():
+            return t[1].upper()
+        endglobal
+
+        snippet ab
+        $1 `!p snip.rv = upper_first()`
+        endsnippet
+        """}
+    keys = "ab" + EX + "hi"
+    wanted = "hi HIHI"
+
+
+class ParseSnippets_Global_Python_RunsOnce(_VimTest):
+    files = {"us/all.snippets": r"""
+        global !p
+        from os import path
+        NAME = "name"
+        def upper_first():
+            return t[1].upper()
+        endglobal
+
+        snippet ab
+        $1 `!p snip.rv = NAME + upper_first()`
+        endsnippet
+        """}
+    keys = "ab" + EX + "one" + ESC + "oab" + EX + "two"
+    wanted = "one nameONE\ntwo nameTWO"
+
+
+class ParseSnippets_Global_Python_CallsRunEveryTime(_VimTest):
+    files = {"us/all.snippets": r"""
+        global !p
+        NAME = vim.eval("g:global_name")
+        endglobal
+
+        snippet ab
+        `!p snip.rv = NAME`
+        endsnippet
+        """}
+    keys = (
+        ESC
+        + ":let g:global_name = 'one'\n"
+        + "iab"
+        + EX
+        + ESC
+        + ":let g:global_name = 'two'\n"
+        + "oab"
+        + EX
+    )
+    wanted = "one\ntwo"
+
+
+class ParseSnippets_Global_Python_Rerun(_VimTest):
+    files = {"us/all.snippets": r"""
+        global !p
+        # ultisnips: rerun
+        NAME = vim.eval("g:rerun_name")
+        endglobal
+
+        snippet ab
+        `!p snip.rv = NAME`
+        endsnippet
+        """}
+    keys = (
+        ESC
+        + ":let g:rerun_name = 'one'\n"
+        + "iab"
+        + EX
+        + ESC
+        + ":let g:rerun_name = 'two'\n"
+        + "oab"
+        + EX
+    )
+    wanted = "one\ntwo"
+
+
 class ParseSnippets_PrintPythonStacktrace(_VimTest):
     files = {"us/all.snippets": r"""
         snippet test
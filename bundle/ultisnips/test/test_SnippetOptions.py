@@ -102,6 +102,79 @@ class SnippetOptions_ExpandWordSnippets_ExpandSuffix3(
     wanted = "[[Expand me!"
 
 
+class SnippetOptions_ExpandWordSnippets_IskeywordChanged(
+    _SnippetOptions_ExpandWordSnippets
+):
+    keys = "a-test" + EX + ESC + ":setlocal iskeyword+=-\n" + "oa-test" + EX
+    wanted = "a-Expand me!\na-test" + EX
+
+
+class SnippetOptions_ExpandWordSnippets_IskeywordChangedByFiletype(
+    _SnippetOptions_ExpandWordSnippets
+):
+    keys = "a-test" + EX + ESC + ":set filetype=dashed\n" + "oa-test" + EX
+    wanted = "a-Expand me!\na-test" + EX
+
+    def _extra_vim_config(self, vim_config):
+        # OptionSet is not triggered for options set by autocommands.
+        vim_config.append("autocmd FileType dashed setlocal iskeyword+=-")
+
+
+class SnippetOptions_ExpandWordSnippets_BoundariesLikeVim(_VimTest):
+    """Compares the word boundaries UltiSnips finds with the ones of Vim."""
+
+    keys = ESC + ":py3 compare_keyword_chars()\n"
+    wanted = "ok"
+
+    def _extra_vim_config(self, vim_config):
+        self._create_file(
+            "compare_keyword_chars.py",
+            r"""
+import random
+
+import vim
+from UltiSnips import vim_helper
+
+ISKEYWORDS = [
+    "@,48-57,_,192-255",
+    "@,48-57,_,-,#",
+    "a-z,^e,48-57",
+    "@-@,^_,@",
+    "1-255,^ ,^,",
+    "@,128-167,224-235",
+]
+CHARS = (
+    "aZ09_-#@,.( \t\xa0\xb5\xbf\xc0\xd7\xdf\xe9\xf7\xff"
+    "\u0101\u037e\u0391\u2000\u2028\u2070\u2080\u2122\u2800"
+    "\u3000\u3001\u3042\u30a2\u4e2d\uac00\u0301\u0308\u0903"
+    "\u20dd\u200d\ufe0f\U0001f600\U0001f44d\U0001f3fd\U00020000"
+)
+
+def compare_keyword_chars():
+    rand = random.Random(0)
+    texts = [a + b for a in CHARS for b in CHARS]
+    texts += ["".join(rand.choice(CHARS) for _ in range(rand.randint(0, 8)))
+              for _ in range(500)]
+    errors = []
+    for iskeyword in ISKEYWORDS:
+        vim.vars["ultisnips_iskeyword"] = iskeyword
+        vim.command("let &l:iskeyword = g:ultisnips_iskeyword")
+        chars = vim_helper.keyword_chars()
+        for text in texts:
+            vim.vars["ultisnips_text"] = text
+            start = vim.eval(r"g:ultisnips_text =~# '\v.<.'") != "0"
+            suffix = vim.eval(
+                r"substitute(g:ultisnips_text, '\v^.+<(.+)', '\1', '')")
+            if len(text) == 2 and start != chars.is_word_start(text, 1):
+                errors.append("%r %r: start" % (iskeyword, text))
+            if suffix != text[chars.last_word_start(text):]:
+                errors.append("%r %r: %r" % (iskeyword, text, suffix))
+    vim.current.buffer[:] = errors[:20] or ["ok"]
+""",
+        )
+        vim_config.append("py3file %s" % (self.name_temp("compare_keyword_chars.py")))
+
+
 class _No_Tab_Expand(_VimTest):
     snippets = ("test", "\t\tExpand\tme!\t", "", "t")
 
@@ -262,6 +335,27 @@ class SnippetOptions_Regex_PythonBlockNoMatch(_VimTest):
     wanted = "test No match"
 
 
+class SnippetOptions_Regex_GroupReferences(_VimTest):
+    snippets = (
+        (
+            r"(?P<word>\w+)-(?P=word)",
+            r"""`!p snip.rv = match.group("word") * 3`""",
+            "",
+            "r",
+        ),
+        (r"(?P<word>\d+)x", "number", "", "r"),
+        (r"(\d)\1", "double", "", "r"),
+    )
+    keys = "ab-ab" + EX + " 7x" + EX + " 33" + EX
+    wanted = "ababab number double"
+
+
+class SnippetOptions_Regex_MatchesDoNotOverlap(_VimTest):
+    snippets = ("aa", "Expand me!", "", "r")
+    keys = "aaa" + EX
+    wanted = "aaa" + EX
+
+
 # Tests for Bug #691575
 
 
@@ -23,6 +23,24 @@ class AddFunc_Opt(_AddFuncBase):
     wanted = "simple expand"
 
 
+class AddFunc_AfterExpansion(_VimTest):
+    snippets = ("test", "from file")
+    keys = (
+        "test"
+        + EX
+        + ESC
+        + ':call UltiSnips#AddSnippetWithPriority("test", "added", "", "", "all", 1)\n'
+        + ':call UltiSnips#AddSnippetWithPriority("new", "new ft", "", "", "new", 0)\n'
+        + ":set ft=new\n"
+        + "o"
+        + "test"
+        + EX
+        + " new"
+        + EX
+    )
+    wanted = "from file\nadded new ft"
+
+
 # Test for bug 501727 #
 
 
@@ -167,3 +185,151 @@ class MySnippetSource(SnippetSource):
 """,
         )
         vim_config.append("py3file %s" % (self.name_temp("snippet_source.py")))
+
+
+class SnippetSource_ClearsSnippetsOfExistingFiletype(_VimTest):
+    snippets = ("test", "from file")
+    keys = (
+        ":py3 UltiSnips_Manager.register_snippet_source('temp', clearing_source)\n"
+        + "itest"
+        + EX
+        + ESC
+        + ":py3 clearing_source.clear('test')\n"
+        + "otest"
+        + EX
+    )
+    wanted = "from file\ntest" + EX
+
+    def _extra_vim_config(self, vim_config):
+        self._create_file(
+            "snippet_source.py",
+            """
+from UltiSnips.snippet.source import SnippetSource
+
+class ClearingSnippetSource(SnippetSource):
+  def __init__(self):
+    SnippetSource.__init__(self)
+    self._snippets["all"]
+
+  def clear(self, trigger):
+    self._snippets["all"].clear_snippets(0, [trigger])
+
+clearing_source = ClearingSnippetSource()
+""",
+        )
+        vim_config.append("py3file %s" % (self.name_temp("snippet_source.py")))
+
+
+class SnippetSource_OverridesGetCleared(_VimTest):
+    snippets = ("test", "from file")
+    keys = (
+        ":py3 UltiSnips_Manager.register_snippet_source('temp', clearing_source)\n"
+        + "itest"
+        + EX
+        + ESC
+        + ":py3 clearing_source.cleared['test'] = 0\n"
+        + "otest"
+        + EX
+    )
+    wanted = "from file\ntest" + EX
+
+    def _extra_vim_config(self, vim_config):
+        self._create_file(
+            "snippet_source.py",
+            """
+from UltiSnips.snippet.source import SnippetSource
+
+class ClearingSnippetSource(SnippetSource):
+  def __init__(self):
+    SnippetSource.__init__(self)
+    self.cleared = {}
+
+  def get_cleared(self, filetypes):
+    return self.cleared
+
+clearing_source = ClearingSnippetSource()
+""",
+        )
+        vim_config.append("py3file %s" % (self.name_temp("snippet_source.py")))
+
+
+class _RefreshSnippetsBase(_VimTest):
+    def _extra_vim_config(self, vim_config):
+        vim_config.append('let g:snippet_dir="%s"' % self.name_temp("us"))
+
+
+class RefreshSnippets_ChangedFileIsReloaded(_RefreshSnippetsBase):
+    files = {
+        "us/all.snippets": r"""
+        snippet a
+        old
+        endsnippet
+        """,
+        "us/all_other.snippets": r"""
+        snippet b
+        other
+        endsnippet
+        """,
+    }
+    keys = (
+        "a"
+        + EX
+        + ESC
+        + ':call writefile(["snippet a", "new", "endsnippet"], g:snippet_dir . "/all.snippets")\n'
+        + ":call UltiSnips#RefreshSnippets()\n"
+        + "o"
+        + "a"
+        + EX
+        + " b"
+        + EX
+    )
+    wanted = "old\nnew other"
+
+
+class RefreshSnippets_DeletedFileIsDropped(_RefreshSnippetsBase):
+    files = {
+        "us/all.snippets": r"""
+        snippet a
+        all
+        endsnippet
+        """,
+        "us/python.snippets": r"""
+        extends all
+        snippet a
+        python
+        endsnippet
+        """,
+    }
+    keys = (
+        ESC
+        + ":set ft=python\n"
+        + ':call delete(g:snippet_dir . "/python.snippets")\n'
+        + ":call UltiSnips#RefreshSnippets()\n"
+        + "i"
+        + "a"
+        + EX
+    )
+    wanted = "all"
+
+
+class WatchSnippetFiles_ChangedFileIsReloaded(_RefreshSnippetsBase):
+    files = {"us/all.snippets": r"""
+        snippet a
+        old
+        endsnippet
+        """}
+    keys = (
+        "a"
+        + EX
+        + ESC
+        + ':call writefile(["snippet a", "new", "endsnippet"], g:snippet_dir . "/all.snippets")\n'
+        + ":sleep 500m\n"
+        + "o"
+        + "a"
+        + EX
+    )
+    wanted = "old\nnew"
+
+    def _extra_vim_config(self, vim_config):
+        _RefreshSnippetsBase._extra_vim_config(self, vim_config)
+        vim_config.append("let g:UltiSnipsWatchSnippetFiles=1")
@@ -152,6 +152,7 @@ class VimTestCase(unittest.TestCase, TempFileManager):
             vim_config.append("silent! python3 1")
 
         vim_config.append('let g:UltiSnipsSnippetDirectories=["us"]')
+        vim_config.append('let g:UltiSnipsCacheDir="%s"' % self.name_temp("cache"))
         if self.python_host_prog:
             vim_config.append('let g:python3_host_prog="%s"' % self.python_host_prog)
 